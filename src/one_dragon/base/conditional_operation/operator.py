@@ -2,7 +2,7 @@ import time
 from abc import abstractmethod
 from concurrent.futures import Future, ThreadPoolExecutor
 from functools import cached_property
-from threading import Lock
+from threading import Condition, Lock
 from typing import Optional
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
@@ -22,6 +22,9 @@ from one_dragon.utils.log_utils import log
 # 当前运行的场景一个 打断的新场景一个 处理事件更新状态一个
 _od_conditional_op_executor = ThreadPoolExecutor(thread_name_prefix='od_conditional_op', max_workers=4)
 
+# 主循环最长的等待时间 状态更新和时间区间变化都会唤醒主循环 这里只是兜底
+_NORMAL_SCENE_MAX_WAIT_SECONDS: float = 0.5
+
 
 class ConditionalOperator(ConditionalOperatorLoader):
 
@@ -55,6 +58,8 @@ class ConditionalOperator(ConditionalOperatorLoader):
         
         self._inited: bool = False
         self._task_lock: Lock = Lock()
+        self._normal_scene_cond: Condition = Condition()  # 唤醒主循环
+        self._normal_scene_dirty: bool = True  # 主循环用到的状态是否有变化 需要重新判断
 
     def init(self) -> None:
         """
@@ -127,17 +132,23 @@ class ConditionalOperator(ConditionalOperatorLoader):
     def _normal_scene_loop(self) -> None:
         """
         主循环
+        只在以下情况重新判断 其余时间等待
+        - 主循环用到的状态有更新
+        - 状态的时间区间开始或者结束
+        - 其它场景的指令执行完毕
         :return:
         """
         normal_scene_id = id(self.normal_scene)
+        self._mark_normal_scene_dirty()
         while self.is_running:
             if self.running_executor_cnt.get() > 0:
-                # 有其它场景在运行 等待
-                time.sleep(0.02)
+                # 有其它场景在运行 等待运行结束
+                self._wait_running_task_done()
                 continue
 
             # log.debug('开始等待新的主循环')
-            to_sleep: Optional[float] = None
+            to_sleep: Optional[float] = None  # 冷却时间
+            to_wait: Optional[float] = None  # 没有命中时 等待状态变化的时间
 
             # 上锁后确保运行状态不会被篡改
             with self._task_lock:
@@ -151,6 +162,9 @@ class ConditionalOperator(ConditionalOperatorLoader):
                 if past_time < self.normal_scene.interval_seconds:
                     to_sleep = self.normal_scene.interval_seconds - past_time
                 else:
+                    with self._normal_scene_cond:
+                        # 先清除标记再判断 判断期间的状态更新会重新标记
+                        self._normal_scene_dirty = False
                     new_execution_info = self.normal_scene.match_execution(trigger_time)
                     if new_execution_info is not None:
                         log.debug(f'当前场景 主循环 当前条件 {new_execution_info.expr_display}')
@@ -171,12 +185,51 @@ class ConditionalOperator(ConditionalOperatorLoader):
                         self.running_executor_cnt.inc()
                         future = self.running_executor.run_async()
                         future.add_done_callback(self._on_task_done)
+                    else:
+                        to_wait = _NORMAL_SCENE_MAX_WAIT_SECONDS
+                        next_change_time = self.normal_scene.next_time_range_change(trigger_time)
+                        if next_change_time is not None:
+                            to_wait = min(to_wait, next_change_time - trigger_time)
 
+            # 等待时间不能写在锁里 要尽快释放锁
             if to_sleep is not None:
-                # 等待时间不能写在锁里 要尽快释放锁
-                time.sleep(to_sleep)
-            else:  # 没有命中的状态 或者 提交执行了 那就自旋等待
-                time.sleep(0.02)
+                self._wait_normal_scene(to_sleep, wake_on_dirty=False)
+            elif to_wait is not None:
+                self._wait_normal_scene(to_wait, wake_on_dirty=True)
+            # 提交执行了 下一轮等待执行完毕
+
+    def _wait_normal_scene(self, timeout: float, wake_on_dirty: bool) -> None:
+        """
+        主循环等待
+        :param timeout: 最长等待时间
+        :param wake_on_dirty: 状态有变化时是否提前结束等待
+        :return:
+        """
+        with self._normal_scene_cond:
+            self._normal_scene_cond.wait_for(
+                lambda: (not self.is_running) or (wake_on_dirty and self._normal_scene_dirty),
+                timeout=max(timeout, 0.001),
+            )
+
+    def _wait_running_task_done(self) -> None:
+        """
+        主循环等待其它场景的指令执行完毕
+        :return:
+        """
+        with self._normal_scene_cond:
+            self._normal_scene_cond.wait_for(
+                lambda: (not self.is_running) or self.running_executor_cnt.get() <= 0,
+                timeout=_NORMAL_SCENE_MAX_WAIT_SECONDS,
+            )
+
+    def _mark_normal_scene_dirty(self) -> None:
+        """
+        标记主循环需要重新判断 并唤醒主循环
+        :return:
+        """
+        with self._normal_scene_cond:
+            self._normal_scene_dirty = True
+            self._normal_scene_cond.notify_all()
 
     def _trigger_scene(self, state_name: str) -> None:
         """
@@ -249,6 +302,7 @@ class ConditionalOperator(ConditionalOperatorLoader):
         with self._task_lock:
             self.is_running = False
             self._stop_running_task()
+        self._mark_normal_scene_dirty()
 
     def _stop_running_task(self) -> None:
         """
@@ -262,6 +316,7 @@ class ConditionalOperator(ConditionalOperatorLoader):
                 # 如果 finish=True 则计数器已经在 _on_task_done 减少了 这里就不减了
                 # 如果 finish=False 则代表还有操作在继续。在这里要减少计数器而不是等_on_task_done 让无触发器场景尽早运行
                 self.running_executor_cnt.dec()
+                self._mark_normal_scene_dirty()
             self.running_executor = None
 
     def _on_task_done(self, future: Future) -> None:
@@ -275,6 +330,8 @@ class ConditionalOperator(ConditionalOperatorLoader):
                     self.running_executor_cnt.dec()
             except Exception:  # run_async里有callback打印日志
                 pass
+        # 执行完毕后 主循环需要重新判断
+        self._mark_normal_scene_dirty()
 
     @cached_property
     def usage_states(self) -> set[str]:
@@ -305,6 +362,9 @@ class ConditionalOperator(ConditionalOperatorLoader):
         if not self.is_running:
             return
 
+        if self._is_normal_scene_affected(state_records):
+            self._mark_normal_scene_dirty()
+
         top_priority_scene: Optional[Scene] = None
         top_priority_state: Optional[str] = None
 
@@ -359,6 +419,26 @@ class ConditionalOperator(ConditionalOperatorLoader):
                         ttl_seconds=30.0,
                     )
 
+    def _is_normal_scene_affected(self, state_records: list[StateRecord]) -> bool:
+        """
+        状态更新是否会影响主循环的判断 包括被互斥清除的状态
+        :param state_records: 状态记录列表
+        :return:
+        """
+        if self.normal_scene is None:
+            return False
+        usage_states = self.normal_scene.usage_states
+        for state_record in state_records:
+            if state_record.state_name in usage_states:
+                return True
+            state_recorder = self.state_record_service.get_state_recorder(state_record.state_name)
+            if state_recorder is None or state_recorder.mutex_list is None:
+                continue
+            for mutex_state in state_recorder.mutex_list:
+                if mutex_state in usage_states:
+                    return True
+        return False
+
     def _emit_overlay_decision(
         self,
         trigger: str,
@@ -4,6 +4,7 @@ from typing import Any, Callable
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.execution_info import ExecutionInfo
 from one_dragon.base.conditional_operation.operation_def import OperationDef
+from one_dragon.base.conditional_operation.state_cal_tree import StateCalSlots
 from one_dragon.base.conditional_operation.state_handler import StateHandler
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 
@@ -22,6 +23,7 @@ class Scene:
             StateHandler(i)
             for i in data.get("handlers", [])
         ]
+        self.state_cal_slots: StateCalSlots | None = None  # 所有处理器共用的状态记录器槽位 构建后才有
 
         # TODO 调试代码 后续删除
         for k in data.keys():
@@ -52,6 +54,12 @@ class Scene:
                 op_getter=op_getter,
             )
 
+        # 所有处理器的状态判断 编译到同一组槽位上 判断时只需要读取一次状态
+        slots = StateCalSlots()
+        for handler in self.handlers:
+            handler.compile_states(slots)
+        self.state_cal_slots = slots
+
     @cached_property
     def usage_states(self) -> set[str]:
         """
@@ -66,6 +74,24 @@ class Scene:
 
         return states
 
+    def next_time_range_change(self, now: float) -> float | None:
+        """
+        状态没有更新的情况下 下一次匹配结果可能变化的时间
+        即某个 [state, min, max] 的时间区间开始或者结束的时间
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            不会再变化时返回None
+        """
+        result: float | None = None
+        for handler in self.handlers:
+            handler_time = handler.next_time_range_change(now)
+            if handler_time is not None and (result is None or handler_time < result):
+                result = handler_time
+        return result
+
     def match_execution(self, trigger_time: float) -> ExecutionInfo | None:
         """
         根据触发时间和优先级 获取符合条件的场景下的执行信息
@@ -76,7 +102,8 @@ class Scene:
         Returns:
             符合条件的场景下的执行信息
         """
+        snapshot = self.state_cal_slots.snapshot() if self.state_cal_slots is not None else None
         for handler in self.handlers:
-            info = handler.match_execution(trigger_time)
+            info = handler.match_execution(trigger_time, snapshot)
             if info is not None:
                 return info
\ No newline at end of file
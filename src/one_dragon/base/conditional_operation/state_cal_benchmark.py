@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any, List, Optional
+
+import yaml
+
+from one_dragon.base.conditional_operation.state_cal_tree import (
+    StateCalNode,
+    StateCalSlots,
+    compile_state_cal_tree,
+    construct_state_cal_tree,
+)
+from one_dragon.base.conditional_operation.state_recorder import StateRecord, StateRecorder
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+
+# 没有找到配置时使用的表达式
+_SAMPLE_EXPR_LIST: List[str] = [
+    '',
+    '[按键-普通攻击]',
+    '[前台-血量扣减, 0, 1] & ![按键-闪避, 0, 0.5]',
+    '([自定义-连携换人, 0, 10] | [自定义-快速支援换人, 0, 10]) & ![自定义-动作不打断, 0, 999]',
+    '[前台-能量]{80, 120} & ![按键-特殊攻击, 0, 0.3] & ([自定义-站场, 2, 999] | [前台-终结技可用])',
+    '(([状态A, 0, 1] & [状态B, 1, 3]) | ([状态C]{1, 3} & ![状态D, 0, 2])) & !([状态E, 0, 0.5] | [状态F, 5, 10])',
+]
+
+
+def list_template_path(base_dir: Optional[str] = None) -> List[str]:
+    """
+    找出目录下所有 包含场景配置 的yml文件
+    :param base_dir: 默认为 config
+    :return:
+    """
+    if base_dir is None:
+        base_dir = os_utils.get_path_under_work_dir('config')
+    result: List[str] = []
+    for root, _, file_list in os.walk(base_dir):
+        for file_name in file_list:
+            if not file_name.endswith('.yml'):
+                continue
+            file_path = os.path.join(root, file_name)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    data = yaml.safe_load(file)
+            except Exception:
+                continue
+            if isinstance(data, dict) and ('scenes' in data or 'handlers' in data):
+                result.append(file_path)
+    return sorted(result)
+
+
+def _collect_expr(data: Any, expr_list: List[str]) -> None:
+    if isinstance(data, dict):
+        for key in ['states', 'interrupt_states']:
+            expr = data.get(key)
+            if isinstance(expr, str):
+                expr_list.append(expr)
+        for value in data.values():
+            _collect_expr(value, expr_list)
+    elif isinstance(data, list):
+        for value in data:
+            _collect_expr(value, expr_list)
+
+
+def load_expr_list(template_path_list: List[str]) -> List[str]:
+    """
+    读取配置中的所有状态表达式
+    :param template_path_list: 配置文件路径
+    :return:
+    """
+    expr_list: List[str] = []
+    for file_path in template_path_list:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            _collect_expr(yaml.safe_load(file), expr_list)
+    return expr_list
+
+
+def benchmark_expr_list(expr_list: List[str], times: int = 2000, seed: int = 0) -> dict:
+    """
+    对比递归判断和编译后判断 所有表达式判断一轮的耗时
+    :param expr_list: 状态表达式
+    :param times: 判断轮数
+    :param seed: 随机状态的种子
+    :return:
+    """
+    recorder_map: dict[str, StateRecorder] = {}
+
+    def get_recorder(state_name: str) -> StateRecorder:
+        if state_name not in recorder_map:
+            recorder_map[state_name] = StateRecorder(state_name)
+        return recorder_map[state_name]
+
+    tree_list: List[StateCalNode] = []
+    for expr in expr_list:
+        try:
+            tree_list.append(construct_state_cal_tree(expr, get_recorder))
+        except Exception:
+            log.error('状态表达式无法解析 %s', expr, exc_info=True)
+
+    start_time = time.perf_counter()
+    slots = StateCalSlots()
+    func_list = [compile_state_cal_tree(tree, slots) for tree in tree_list]
+    compile_ms = (time.perf_counter() - start_time) * 1000
+
+    # 随机的状态 其中部分从未出现
+    rng = random.Random(seed)
+    now = 1000.0
+    for recorder in recorder_map.values():
+        if rng.random() < 0.8:
+            recorder.update_state_record(StateRecord(recorder.state_name, trigger_time=now - rng.random() * 12,
+                                                     value=rng.randint(0, 120)))
+
+    now_list = [now + rng.random() * 3 for _ in range(times)]
+    mismatch_cnt = 0
+    for t in now_list[:100]:
+        snapshot = slots.snapshot()
+        for tree, func in zip(tree_list, func_list):
+            if tree.in_time_range(t) != func(t, snapshot[0], snapshot[1]):
+                mismatch_cnt += 1
+
+    start_time = time.perf_counter()
+    for t in now_list:
+        for tree in tree_list:
+            tree.in_time_range(t)
+    tree_ms = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    for t in now_list:
+        last_record_time_list, last_value_list = slots.snapshot()
+        for func in func_list:
+            func(t, last_record_time_list, last_value_list)
+    compiled_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        'expr_cnt': len(tree_list),
+        'state_cnt': len(recorder_map),
+        'times': times,
+        'compile_ms': round(compile_ms, 3),
+        'tree_ms': round(tree_ms, 3),
+        'compiled_ms': round(compiled_ms, 3),
+        'tree_eval_per_second': round(len(tree_list) * times / tree_ms * 1000) if tree_ms > 0 else None,
+        'compiled_eval_per_second': round(len(tree_list) * times / compiled_ms * 1000) if compiled_ms > 0 else None,
+        'speedup': round(tree_ms / compiled_ms, 3) if compiled_ms > 0 else None,
+        'mismatch_cnt': mismatch_cnt,
+    }
+
+
+def __debug():
+    parser = argparse.ArgumentParser(description='对比递归判断和编译后判断 状态表达式的判断耗时')
+    parser.add_argument('--template', type=str, nargs='*', default=None, help='配置文件路径 默认为 config 下所有包含场景配置的文件')
+    parser.add_argument('--output', type=str, default=None, help='结果保存的json文件 默认保存在 .debug/state_cal_benchmark')
+    parser.add_argument('--times', type=int, default=2000, help='判断轮数')
+    args = parser.parse_args()
+
+    template_path_list = args.template if args.template else list_template_path()
+    expr_list = load_expr_list(template_path_list)
+    if len(expr_list) == 0:
+        log.info('没有找到状态表达式 使用示例表达式')
+        expr_list = _SAMPLE_EXPR_LIST
+
+    result = benchmark_expr_list(expr_list, times=args.times)
+    log.info('表达式 %d 个 状态 %d 个 递归 %.1fms 编译后 %.1fms 提升 %sx 结果不一致 %d 次',
+             result['expr_cnt'], result['state_cnt'], result['tree_ms'], result['compiled_ms'],
+             result['speedup'], result['mismatch_cnt'])
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os_utils.get_path_under_work_dir('.debug', 'state_cal_benchmark'),
+                              '%s.json' % os_utils.now_timestamp_str())
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'template': template_path_list,
+            'result': result,
+        }, file, ensure_ascii=False, indent=2)
+    log.info('结果已保存 %s', output)
+
+
+if __name__ == '__main__':
+    __debug()
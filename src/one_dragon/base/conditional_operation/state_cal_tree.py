@@ -7,6 +7,8 @@ from typing import Callable, Optional
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 from one_dragon.utils.log_utils import log
 
+_TIME_RANGE_END_DELTA: float = 0.001  # 时间区间结束后 多久判断为失效
+
 
 class StateCalNodeType(IntEnum):
 
@@ -102,6 +104,36 @@ class StateCalNode:
 
         return False
 
+    def next_time_range_change(self, now: float) -> Optional[float]:
+        """
+        状态没有更新的情况下 下一次时间区间判断结果可能变化的时间
+        即某个 [state, min, max] 的时间区间开始或者结束的时间
+        :param now: 当前时间
+        :return: 不会再变化时返回None
+        """
+        if self.node_type == StateCalNodeType.OP:
+            left_time = self.left_child.next_time_range_change(now)
+            if self.right_child is None:
+                return left_time
+            right_time = self.right_child.next_time_range_change(now)
+            if left_time is None:
+                return right_time
+            if right_time is None:
+                return left_time
+            return min(left_time, right_time)
+        elif self.node_type == StateCalNodeType.STATE:
+            last_record_time = self.state_recorder.last_record_time
+            start_time = last_record_time + self.state_time_range_min
+            end_time = last_record_time + self.state_time_range_max
+            if now < start_time:
+                return start_time
+            elif now <= end_time:
+                # 区间是闭区间 超过结束时间才会失效
+                return end_time + _TIME_RANGE_END_DELTA
+            return None
+
+        return None
+
     @cached_property
     def usage_states(self) -> set[str]:
         """
@@ -131,6 +163,90 @@ class StateCalNode:
             self.state_recorder.dispose()
 
 
+class StateCalSlots:
+
+    def __init__(self):
+        """
+        多个状态判断树共用的状态记录器槽位
+        判断前一次性读取所有状态记录器的值 同一次判断中的所有树使用同一份快照
+        """
+        self.recorder_list: list[StateRecorder] = []
+        self._slot_map: dict[int, int] = {}  # id(状态记录器) -> 槽位
+
+    def get_slot(self, recorder: StateRecorder) -> int:
+        """
+        获取状态记录器的槽位 没有时新增
+        :param recorder: 状态记录器
+        :return: 槽位
+        """
+        slot = self._slot_map.get(id(recorder))
+        if slot is None:
+            slot = len(self.recorder_list)
+            self.recorder_list.append(recorder)
+            self._slot_map[id(recorder)] = slot
+        return slot
+
+    def snapshot(self) -> tuple[list[float], list[Optional[int]]]:
+        """
+        读取所有状态记录器当前的值
+        :return: 各槽位的上次记录时间 和 上次记录的值
+        """
+        recorder_list = self.recorder_list
+        return [i.last_record_time for i in recorder_list], [i.last_value for i in recorder_list]
+
+
+StateCalFunc = Callable[[float, list[float], list[Optional[int]]], bool]
+
+
+def compile_state_cal_tree(root: StateCalNode, slots: StateCalSlots) -> StateCalFunc:
+    """
+    将状态判断树编译成一个扁平的函数 结果和 root.in_time_range 一致
+    - 函数参数为 (当前时间, 各槽位的上次记录时间, 各槽位的上次记录的值)
+    - 生成一个 and / or / not 组成的表达式 保留短路求值 不需要递归和比较节点类型
+    :param root: 状态判断树
+    :param slots: 状态记录器槽位
+    :return: 判断函数
+    """
+    const_map: dict[str, float] = {}
+
+    def add_const(value: float) -> str:
+        # 常量可能是 inf 等无法直接写进代码的值 统一作为变量传入
+        name = '_c%d' % len(const_map)
+        const_map[name] = value
+        return name
+
+    def to_expr(node: StateCalNode) -> str:
+        if node.node_type == StateCalNodeType.OP:
+            if node.op_type == StateCalOpType.AND:
+                return '(%s and %s)' % (to_expr(node.left_child), to_expr(node.right_child))
+            elif node.op_type == StateCalOpType.OR:
+                return '(%s or %s)' % (to_expr(node.left_child), to_expr(node.right_child))
+            elif node.op_type == StateCalOpType.NOT:
+                return '(not %s)' % to_expr(node.left_child)
+            return 'False'
+        elif node.node_type == StateCalNodeType.STATE:
+            slot = slots.get_slot(node.state_recorder)
+            expr = '(%s <= now - t[%d] <= %s)' % (add_const(node.state_time_range_min), slot,
+                                                 add_const(node.state_time_range_max))
+            if node.state_value_range_min is not None and node.state_value_range_max is not None:
+                expr = '(%s and v[%d] is not None and %s <= v[%d] <= %s)' % (
+                    expr, slot, add_const(node.state_value_range_min), slot, add_const(node.state_value_range_max))
+            return expr
+        elif node.node_type == StateCalNodeType.TRUE:
+            return 'True'
+        return 'False'
+
+    try:
+        source = 'lambda now, t, v: bool(%s)' % to_expr(root)
+        func_globals = {'__builtins__': {'bool': bool}}
+        func_globals.update(const_map)
+        return eval(compile(source, '<state_cal_tree>', 'eval'), func_globals)
+    except (RecursionError, SyntaxError, MemoryError):
+        # 表达式嵌套太深无法编译时 使用原来的递归判断
+        log.warning('状态判断树无法编译 使用递归判断')
+        return lambda now, t, v: root.in_time_range(now)
+
+
 def construct_state_cal_tree(
     expr_str: str,
     state_getter: Callable[[str], StateRecorder],
@@ -7,9 +7,12 @@ from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.execution_info import ExecutionInfo
 from one_dragon.base.conditional_operation.operation_def import OperationDef
 from one_dragon.base.conditional_operation.state_cal_tree import (
+    StateCalFunc,
     StateCalNode,
     StateCalNodeType,
     StateCalOpType,
+    StateCalSlots,
+    compile_state_cal_tree,
     construct_state_cal_tree,
 )
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
@@ -34,6 +37,7 @@ class StateHandler:
 
         self.op_list: list[AtomicOp] = []  # 操作列表
         self.state_cal_tree: StateCalNode | None = None  # 状态判断树
+        self.state_cal_func: StateCalFunc | None = None  # 编译后的状态判断
         self.interrupt_states_cal_tree: StateCalNode | None = None  # 可被打断的状态判断树
 
         # TODO 调试代码 后续删除
@@ -94,6 +98,19 @@ class StateHandler:
                 for i in self.operations
             ]
 
+    def compile_states(self, slots: StateCalSlots) -> None:
+        """
+        编译状态判断树 包括子处理器的
+        需要先调用 self.build() 构建状态判断树
+
+        Args:
+            slots: 所在场景共用的状态记录器槽位
+        """
+        if self.state_cal_tree is not None:
+            self.state_cal_func = compile_state_cal_tree(self.state_cal_tree, slots)
+        for sub_handler in self.sub_handlers:
+            sub_handler.compile_states(slots)
+
     def _build_interrupt_tree(
         self,
         state_recorder_getter: Callable[[str], StateRecorder],
@@ -144,20 +161,49 @@ class StateHandler:
 
         return states
 
-    def match_execution(self, trigger_time: float) -> ExecutionInfo | None:
+    def next_time_range_change(self, now: float) -> float | None:
+        """
+        状态没有更新的情况下 下一次匹配结果可能变化的时间
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            不会再变化时返回None
+        """
+        result: float | None = None
+        if self.state_cal_tree is not None:
+            result = self.state_cal_tree.next_time_range_change(now)
+        for handler in self.sub_handlers:
+            sub_time = handler.next_time_range_change(now)
+            if sub_time is not None and (result is None or sub_time < result):
+                result = sub_time
+        return result
+
+    def match_execution(
+        self,
+        trigger_time: float,
+        snapshot: tuple[list[float], list[int | None]] | None = None,
+    ) -> ExecutionInfo | None:
         """
         根据触发时间和优先级 获取符合条件的场景下的执行信息
 
         Args:
             trigger_time: 触发时间
+            snapshot: 所在场景的状态快照 StateCalSlots.snapshot() 的结果 有时使用编译后的状态判断
 
         Returns:
             符合条件的场景下的执行信息
         """
-        if self.state_cal_tree.in_time_range(trigger_time):
+        if snapshot is not None and self.state_cal_func is not None:
+            matched = self.state_cal_func(trigger_time, snapshot[0], snapshot[1])
+        else:
+            matched = self.state_cal_tree.in_time_range(trigger_time)
+
+        if matched:
             if self.sub_handlers is not None and len(self.sub_handlers) > 0:
                 for sub_handler in self.sub_handlers:
-                    info = sub_handler.match_execution(trigger_time)
+                    info = sub_handler.match_execution(trigger_time, snapshot)
                     if info is not None:
                         info.add_state(self.states, self.display_name)
                         return info
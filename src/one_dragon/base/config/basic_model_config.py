@@ -26,6 +26,44 @@ class BasicModelConfig(YamlConfig):
     def ocr_gpu(self, new_value: bool) -> None:
         self.update('ocr_gpu', new_value)
 
+    @property
+    def onnx_optimization_level(self) -> str:
+        """
+        模型的图优化级别 disable / basic / extended / all
+        """
+        return self.get('onnx_optimization_level', 'all')
+
+    @onnx_optimization_level.setter
+    def onnx_optimization_level(self, new_value: str) -> None:
+        self.update('onnx_optimization_level', new_value)
+
+    @property
+    def onnx_intra_op_threads(self) -> int:
+        """
+        所有模型推理合计使用的线程数 由推理调度器分给各个推理线程 0 为自动
+        """
+        return self.get('onnx_intra_op_threads', 0)
+
+    @onnx_intra_op_threads.setter
+    def onnx_intra_op_threads(self, new_value: int) -> None:
+        self.update('onnx_intra_op_threads', new_value)
+
+    @property
+    def onnx_cache_optimized_model(self) -> bool:
+        return self.get('onnx_cache_optimized_model', True)
+
+    @onnx_cache_optimized_model.setter
+    def onnx_cache_optimized_model(self, new_value: bool) -> None:
+        self.update('onnx_cache_optimized_model', new_value)
+
+    @property
+    def onnx_io_binding(self) -> bool:
+        return self.get('onnx_io_binding', True)
+
+    @onnx_io_binding.setter
+    def onnx_io_binding(self, new_value: bool) -> None:
+        self.update('onnx_io_binding', new_value)
+
     def using_old_model(self) -> bool:
         """
         是否在使用旧模型
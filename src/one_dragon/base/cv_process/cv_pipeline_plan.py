@@ -0,0 +1,235 @@
+# coding: utf-8
+import threading
+import time
+from typing import Any, Dict, List, TYPE_CHECKING
+
+import cv2
+import numpy as np
+
+from one_dragon.base.cv_process.cv_pipeline import CvPipeline
+from one_dragon.base.cv_process.cv_step import CvPipelineContext, CvPixelStep, CvStep
+from one_dragon.utils.log_utils import log
+
+if TYPE_CHECKING:
+    from one_dragon.base.cv_process.cv_service import CvService
+
+
+class _LazyDisplay:
+    """
+    合并执行像素级步骤时 延迟计算的 display_image
+    display_image = base(灰度图时转为3通道) 并只保留 mask 非0的部分
+    """
+
+    def __init__(self, base: np.ndarray, buffers: Dict[str, np.ndarray]):
+        self.base: np.ndarray = base
+        self.base_is_gray: bool = False  # base 是否单通道的 mask_image
+        self.mask: np.ndarray | None = None  # 需要保留的部分 None 表示全部保留
+        self.changed: bool = False  # 是否需要重新计算 display_image
+        self.buffers: Dict[str, np.ndarray] = buffers
+
+    def apply(self, display_mode: str, mask: np.ndarray) -> None:
+        """
+        记录一个像素级步骤对 display_image 的修改
+        :param display_mode: 步骤更新 display_image 的规则
+        :param mask: 步骤计算得到的 mask_image
+        """
+        self.changed = True
+        if display_mode == CvPixelStep.DISPLAY_MODE_GRAY:
+            # 新的显示图和之前的显示图无关 之前未计算的部分可以直接丢弃
+            self.base = mask
+            self.base_is_gray = True
+            self.mask = None
+        elif self.mask is None:
+            self.mask = mask
+        else:
+            # 连续多次 bitwise_and 等价于只保留所有 mask 都非0的部分 取最小值即可
+            self.mask = cv2.min(self.mask, mask, dst=_get_buffer(self.buffers, 'and_mask', mask.shape, mask.dtype))
+
+    def materialize(self) -> np.ndarray:
+        """
+        计算出 display_image 之后的步骤需要读取时调用
+        :return: 新的 display_image
+        """
+        if not self.changed:
+            return self.base
+
+        if self.base_is_gray:
+            gray = self.base
+            if self.mask is not None:
+                # 先在单通道上过滤 再转换成3通道 中间结果使用复用的缓冲区
+                buffer = _get_buffer(self.buffers, 'gray', gray.shape, gray.dtype)
+                buffer.fill(0)
+                gray = cv2.bitwise_and(gray, gray, dst=buffer, mask=self.mask)
+            display = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+        elif self.mask is not None:
+            display = cv2.bitwise_and(self.base, self.base, mask=self.mask)
+        else:
+            display = self.base
+
+        self.base = display
+        self.base_is_gray = False
+        self.mask = None
+        self.changed = False
+        return display
+
+
+def _get_buffer(buffers: Dict[str, np.ndarray], key: str, shape: tuple, dtype: np.dtype) -> np.ndarray:
+    """
+    获取可以复用的缓冲区 大小不一致时重新创建
+    :param buffers: 当前线程的缓冲区
+    :param key: 缓冲区用途
+    :param shape: 需要的大小
+    :param dtype: 需要的类型
+    :return:
+    """
+    buffer = buffers.get(key)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = np.empty(shape, dtype=dtype)
+        buffers[key] = buffer
+    return buffer
+
+
+def validate_pipeline(pipeline: CvPipeline) -> List[str]:
+    """
+    检查流水线的配置
+    :param pipeline: 流水线
+    :return: 发现的问题
+    """
+    warning_list: List[str] = []
+    has_mask: bool = False  # 之前是否有步骤生成了 mask_image
+    for idx, step in enumerate(pipeline.steps):
+        param_defs = step.get_params()
+        for param_name, value in step.params.items():
+            definition = param_defs.get(param_name)
+            if definition is None:
+                continue
+            param_type = definition.get('type')
+            if param_type == 'enum' and value not in definition.get('options', []):
+                warning_list.append(f"第 {idx + 1} 步 {step.name} 参数 {param_name} 的值 {value} 不在可选范围内")
+            elif param_type == 'int' and (not isinstance(value, int) or isinstance(value, bool)):
+                warning_list.append(f"第 {idx + 1} 步 {step.name} 参数 {param_name} 应为整数 当前为 {value}")
+            elif param_type == 'float' and not isinstance(value, (int, float)):
+                warning_list.append(f"第 {idx + 1} 步 {step.name} 参数 {param_name} 应为数字 当前为 {value}")
+            elif param_type == 'tuple_int' and not isinstance(value, (tuple, list)):
+                warning_list.append(f"第 {idx + 1} 步 {step.name} 参数 {param_name} 应为整数数组 当前为 {value}")
+
+        if isinstance(step, CvPixelStep):
+            if not step.reads_display and not has_mask:
+                warning_list.append(f"第 {idx + 1} 步 {step.name} 之前没有生成 mask_image 的步骤")
+            has_mask = True
+
+    return warning_list
+
+
+class CvPipelinePlan:
+    """
+    编译后的流水线 加载一次后可以反复执行
+    - 创建时检查一次配置 不需要每次执行时发现问题
+    - 相邻的像素级步骤合并执行 中间被覆盖的 display_image 不再计算 多次过滤合并成一次
+    - 合并执行时的中间结果 使用每个线程各自的缓冲区 在多次执行之间复用
+    执行结果和 CvPipeline.execute 一致
+    """
+
+    def __init__(self, pipeline: CvPipeline, name: str = '', mtime_ns: int = 0):
+        """
+        :param pipeline: 流水线
+        :param name: 流水线名称
+        :param mtime_ns: 流水线文件的修改时间 用于判断缓存是否失效
+        """
+        self.pipeline: CvPipeline = pipeline
+        self.name: str = name
+        self.mtime_ns: int = mtime_ns
+
+        self.warning_list: List[str] = validate_pipeline(pipeline)
+        for warning in self.warning_list:
+            log.warning(f'流水线 {name} {warning}')
+
+        # 每个阶段是单个普通步骤 或者 连续的像素级步骤
+        self.stage_list: List[List[CvStep]] = []
+        for step in pipeline.steps:
+            if (isinstance(step, CvPixelStep)
+                    and len(self.stage_list) > 0
+                    and isinstance(self.stage_list[-1][0], CvPixelStep)):
+                self.stage_list[-1].append(step)
+            else:
+                self.stage_list.append([step])
+
+        self._local = threading.local()  # 每个线程各自的缓冲区
+
+    def _get_buffers(self) -> Dict[str, np.ndarray]:
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = {}
+            self._local.buffers = buffers
+        return buffers
+
+    def execute(self, source_image: np.ndarray, service: 'CvService | None' = None, debug_mode: bool = True,
+                start_time: float | None = None, timeout: float | None = None) -> CvPipelineContext:
+        """
+        执行流水线 参数同 CvPipeline.execute
+        :param source_image: 原始输入图像
+        :param service: CvService 的引用
+        :param debug_mode: 是否为调试模式
+        :param start_time: 流水线开始执行的时间
+        :param timeout: 允许的执行时间（秒），None表示无限制
+        :return: 包含所有结果的上下文
+        """
+        context = CvPipelineContext(source_image, service=service, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
+        pipeline_start_time = context.start_time
+
+        for stage in self.stage_list:
+            if isinstance(stage[0], CvPixelStep):
+                finished = self._execute_pixel_stage(context, stage)
+            else:
+                finished = self._execute_step(context, stage[0])
+            if not finished:
+                break
+
+        pipeline_end_time = time.time()
+        context.total_execution_time = (pipeline_end_time - pipeline_start_time) * 1000
+        return context
+
+    def _check_timeout(self, context: CvPipelineContext) -> bool:
+        if context.check_timeout():
+            context.error_str = f"流水线执行超时 (限制 {context.timeout} 秒)"
+            context.success = False
+            return True
+        return False
+
+    def _execute_step(self, context: CvPipelineContext, step: CvStep) -> bool:
+        """
+        执行一个普通步骤
+        :return: 是否可以继续执行
+        """
+        if self._check_timeout(context):
+            return False
+
+        step_start_time = time.time()
+        step.execute(context)
+        context.step_execution_times.append((step.name, (time.time() - step_start_time) * 1000))
+        return True
+
+    def _execute_pixel_stage(self, context: CvPipelineContext, stage: List[CvStep]) -> bool:
+        """
+        合并执行连续的像素级步骤 mask_image 每步更新 display_image 只在需要读取时计算
+        :return: 是否可以继续执行
+        """
+        lazy_display = _LazyDisplay(context.display_image, self._get_buffers())
+        finished = True
+        for step in stage:
+            if self._check_timeout(context):
+                finished = False
+                break
+
+            step_start_time = time.time()
+            if step.reads_display:
+                context.display_image = lazy_display.materialize()
+            params: Dict[str, Any] = step.params
+            mask = step.cal_mask(context, **params)
+            if mask is not None:
+                context.mask_image = mask
+                lazy_display.apply(step.display_mode, mask)
+            context.step_execution_times.append((step.name, (time.time() - step_start_time) * 1000))
+
+        context.display_image = lazy_display.materialize()
+        return finished
@@ -1,5 +1,6 @@
 # coding: utf-8
 import os
+import threading
 from typing import List, Dict, Type
 
 import cv2
@@ -7,6 +8,7 @@ import numpy as np
 import yaml
 
 from one_dragon.base.cv_process.cv_pipeline import CvPipeline, CvPipelineContext
+from one_dragon.base.cv_process.cv_pipeline_plan import CvPipelinePlan
 from one_dragon.base.cv_process.cv_step import CvStep
 from one_dragon.base.cv_process.steps import (
     CvStepFilterByRGB, CvStepFilterByHSV, CvErodeStep, CvDilateStep,
@@ -17,6 +19,7 @@ from one_dragon.base.cv_process.steps import (
 )
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.utils import os_utils, yaml_utils
+from one_dragon.utils.log_utils import log
 
 
 class CvService:
@@ -61,6 +64,10 @@ class CvService:
             'OCR识别': CvStepOcr,
         }
 
+        # 编译后的流水线 key=流水线名称 文件修改时间变化后重新编译
+        self._plan_cache: Dict[str, CvPipelinePlan] = {}
+        self._plan_lock = threading.Lock()
+
         if not os.path.exists(self.PIPELINE_DIR):
             os.makedirs(self.PIPELINE_DIR)
         if not os.path.exists(self.TEMPLATE_DIR):
@@ -76,16 +83,54 @@ class CvService:
         :param timeout: 允许的执行时间（秒），None表示无限制
         :return: 包含所有结果的上下文
         """
-        pipeline = self.load_pipeline(pipeline_name)
-        if pipeline is None:
+        plan = self.get_pipeline_plan(pipeline_name)
+        if plan is None:
             ctx = CvPipelineContext(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
             ctx.error_str = f"流水线 {pipeline_name} 加载失败"
             return ctx
 
-        result = pipeline.execute(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
+        result = plan.execute(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
         self._emit_overlay_vision(pipeline_name, result)
         return result
 
+    def get_pipeline_plan(self, pipeline_name: str) -> CvPipelinePlan | None:
+        """
+        获取编译后的流水线 按名称和文件修改时间缓存
+        :param pipeline_name: 流水线名称
+        :return: 加载失败时返回None
+        """
+        file_path = os.path.join(self.PIPELINE_DIR, f"{pipeline_name}.yml")
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except OSError:
+            self._invalidate_pipeline_plan(pipeline_name)
+            return None
+
+        plan = self._plan_cache.get(pipeline_name)
+        if plan is not None and plan.mtime_ns == mtime_ns:
+            return plan
+
+        with self._plan_lock:
+            plan = self._plan_cache.get(pipeline_name)
+            if plan is not None and plan.mtime_ns == mtime_ns:
+                return plan
+
+            pipeline = self.load_pipeline(pipeline_name)
+            if pipeline is None:
+                self._plan_cache.pop(pipeline_name, None)
+                return None
+
+            plan = CvPipelinePlan(pipeline, name=pipeline_name, mtime_ns=mtime_ns)
+            self._plan_cache[pipeline_name] = plan
+            return plan
+
+    def _invalidate_pipeline_plan(self, pipeline_name: str) -> None:
+        """
+        流水线文件变化后 删除编译后的缓存
+        """
+        with self._plan_lock:
+            self._plan_cache.pop(pipeline_name, None)
+
     def _emit_overlay_vision(self, pipeline_name: str, context: CvPipelineContext) -> None:
         bus = getattr(self.od_ctx, "overlay_debug_bus", None)
         if bus is None or context is None:
@@ -205,6 +250,7 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         with open(file_path, 'w', encoding='utf-8') as f:
             yaml.dump(data_to_save, f, allow_unicode=True, sort_keys=False)
+        self._invalidate_pipeline_plan(name)
 
         return True
 
@@ -232,6 +278,8 @@ class CvService:
                     step_instance = step_class()
                     step_instance.update_from_dict(step_data)
                     new_steps.append(step_instance)
+                else:
+                    log.warning(f'流水线 {name} 中有未知的步骤 {step_name} 已忽略')
 
         pipeline = CvPipeline()
         pipeline.steps = new_steps
@@ -245,6 +293,7 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         if os.path.exists(file_path):
             os.remove(file_path)
+        self._invalidate_pipeline_plan(name)
 
     def rename_pipeline(self, old_name: str, new_name: str):
         """
@@ -260,6 +309,8 @@ class CvService:
 
         if os.path.exists(old_file_path) and not os.path.exists(new_file_path):
             os.rename(old_file_path, new_file_path)
+            self._invalidate_pipeline_plan(old_name)
+            self._invalidate_pipeline_plan(new_name)
 
     def get_template_names(self) -> List[str]:
         """
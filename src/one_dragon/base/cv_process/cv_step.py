@@ -232,3 +232,34 @@ class CvStep:
         context.crop_offset = (context.crop_offset[0] + rect.x1, context.crop_offset[1] + rect.y1)
 
         context.analysis_results.append(f"已执行 {operation_name}，区域: {rect}，当前总偏移: {context.crop_offset}")
+
+
+class CvPixelStep(CvStep):
+    """
+    逐像素处理的步骤 只根据 display_image 或 mask_image 计算新的 mask_image 再按固定规则更新 display_image
+    编译后的流水线会把相邻的这类步骤合并执行 跳过中间不需要的 display_image
+    """
+
+    DISPLAY_MODE_GRAY: str = 'gray'  # 使用新的 mask_image 作为显示图
+    DISPLAY_MODE_AND: str = 'and'  # 显示图只保留新的 mask_image 非0的部分
+
+    reads_display: bool = False  # 计算 mask_image 时是否需要读取 display_image
+    display_mode: str = DISPLAY_MODE_AND  # 更新 display_image 的规则
+
+    def cal_mask(self, context: CvPipelineContext, **kwargs) -> np.ndarray | None:
+        """
+        子类需要重写的方法 计算新的 mask_image
+        :param context: 流水线上下文
+        :return: 新的 mask_image 返回None时不修改上下文中的图像
+        """
+        return None
+
+    def _execute(self, context: CvPipelineContext, **kwargs):
+        mask = self.cal_mask(context, **kwargs)
+        if mask is None:
+            return
+        context.mask_image = mask
+        if self.display_mode == CvPixelStep.DISPLAY_MODE_GRAY:
+            context.display_image = cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
+        else:
+            context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=mask)
@@ -2,10 +2,10 @@
 from typing import Dict, Any
 import cv2
 import numpy as np
-from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step import CvPixelStep, CvPipelineContext
 
 
-class CvDilateStep(CvStep):
+class CvDilateStep(CvPixelStep):
 
     def __init__(self):
         super().__init__('膨胀')
@@ -19,10 +19,9 @@ class CvDilateStep(CvStep):
     def get_description(self) -> str:
         return "膨胀操作可以连接断开的区域。 `kernel_size` 是膨胀核的大小，越大膨胀效果越强。`iterations` 是迭代次数。"
 
-    def _execute(self, context: CvPipelineContext, kernel_size: int = 3, iterations: int = 1, **kwargs):
+    def cal_mask(self, context: CvPipelineContext, kernel_size: int = 3, iterations: int = 1, **kwargs):
         if context.mask_image is None:
-            return
+            return None
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         dilated_mask = cv2.dilate(context.mask_image, kernel, iterations=iterations)
-        context.mask_image = dilated_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=dilated_mask)
\ No newline at end of file
+        return dilated_mask
\ No newline at end of file
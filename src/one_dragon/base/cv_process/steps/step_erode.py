@@ -2,10 +2,10 @@
 from typing import Dict, Any
 import cv2
 import numpy as np
-from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step import CvPixelStep, CvPipelineContext
 
 
-class CvErodeStep(CvStep):
+class CvErodeStep(CvPixelStep):
 
     def __init__(self):
         super().__init__('腐蚀')
@@ -19,10 +19,9 @@ class CvErodeStep(CvStep):
     def get_description(self) -> str:
         return "腐蚀操作可以去除小的噪点。 `kernel_size` 是腐蚀核的大小，越大腐蚀效果越强。`iterations` 是迭代次数。"
 
-    def _execute(self, context: CvPipelineContext, kernel_size: int = 3, iterations: int = 1, **kwargs):
+    def cal_mask(self, context: CvPipelineContext, kernel_size: int = 3, iterations: int = 1, **kwargs):
         if context.mask_image is None:
-            return
+            return None
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         eroded_mask = cv2.erode(context.mask_image, kernel, iterations=iterations)
-        context.mask_image = eroded_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=eroded_mask)
\ No newline at end of file
+        return eroded_mask
\ No newline at end of file
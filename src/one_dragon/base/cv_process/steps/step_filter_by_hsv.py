@@ -1,11 +1,12 @@
 # coding: utf-8
 from typing import Dict, Any
-import cv2
-from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step import CvPixelStep, CvPipelineContext
 from one_dragon.utils import cv2_utils
 
 
-class CvStepFilterByHSV(CvStep):
+class CvStepFilterByHSV(CvPixelStep):
+
+    reads_display = True
 
     def __init__(self):
         super().__init__('HSV 范围过滤')
@@ -19,7 +20,6 @@ class CvStepFilterByHSV(CvStep):
     def get_description(self) -> str:
         return "根据 HSV 颜色过滤图像。 `hsv_color` 参数指定要匹配的中心颜色，`hsv_diff` 参数指定 H, S, V 三个通道的容差范围。"
 
-    def _execute(self, context: CvPipelineContext, hsv_color: tuple = (0, 0, 0), hsv_diff: tuple = (10, 255, 255), **kwargs):
+    def cal_mask(self, context: CvPipelineContext, hsv_color: tuple = (0, 0, 0), hsv_diff: tuple = (10, 255, 255), **kwargs):
         mask = cv2_utils.filter_by_color(context.display_image, mode='hsv', hsv_color=hsv_color, hsv_diff=hsv_diff)
-        context.mask_image = mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=mask)
\ No newline at end of file
+        return mask
\ No newline at end of file
@@ -2,10 +2,10 @@
 from typing import Dict, Any
 import cv2
 import numpy as np
-from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step import CvPixelStep, CvPipelineContext
 
 
-class CvMorphologyExStep(CvStep):
+class CvMorphologyExStep(CvPixelStep):
     
     def __init__(self):
         self.op_map = {
@@ -26,13 +26,12 @@ class CvMorphologyExStep(CvStep):
     def get_description(self) -> str:
         return "执行高级形态学操作。`op` 是操作类型（如开运算、闭运算等），`kernel_size` 是操作核的大小。"
 
-    def _execute(self, context: CvPipelineContext, op: str = '开运算', kernel_size: int = 3, **kwargs):
+    def cal_mask(self, context: CvPipelineContext, op: str = '开运算', kernel_size: int = 3, **kwargs):
         if context.mask_image is None:
-            return
+            return None
         cv2_op = self.op_map.get(op)
         if cv2_op is None:
-            return
+            return None
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         morph_mask = cv2.morphologyEx(context.mask_image, cv2_op, kernel)
-        context.mask_image = morph_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=morph_mask)
\ No newline at end of file
+        return morph_mask
\ No newline at end of file
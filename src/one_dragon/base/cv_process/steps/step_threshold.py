@@ -1,10 +1,12 @@
 # coding: utf-8
 from typing import Dict, Any
 import cv2
-from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step import CvPixelStep, CvPipelineContext
 
 
-class CvStepThreshold(CvStep):
+class CvStepThreshold(CvPixelStep):
+
+    display_mode = CvPixelStep.DISPLAY_MODE_GRAY
 
     def __init__(self):
         self.method_map = {
@@ -26,11 +28,11 @@ class CvStepThreshold(CvStep):
     def get_description(self) -> str:
         return "将灰度图像转换为黑白二值图像，这是轮廓分析的前提。支持多种算法以适应不同光照场景。"
 
-    def _execute(self, context: CvPipelineContext, method: str = 'OTSU', threshold_value: int = 127, adaptive_block_size: int = 11, adaptive_c: int = 2, **kwargs):
+    def cal_mask(self, context: CvPipelineContext, method: str = 'OTSU', threshold_value: int = 127, adaptive_block_size: int = 11, adaptive_c: int = 2, **kwargs):
         # 确保在灰度图上操作
         if context.mask_image is None or len(context.mask_image.shape) != 2:
             context.analysis_results.append("错误: 请先执行灰度化步骤")
-            return
+            return None
 
         gray_image = context.mask_image
 
@@ -51,5 +53,4 @@ class CvStepThreshold(CvStep):
             _, thresh_image = cv2.threshold(gray_image, threshold_value, 255, cv2.THRESH_BINARY)
             context.analysis_results.append(f"已应用全局二值化 (阈值: {threshold_value})")
 
-        context.mask_image = thresh_image
-        context.display_image = cv2.cvtColor(thresh_image, cv2.COLOR_GRAY2RGB)
\ No newline at end of file
+        return thresh_image
\ No newline at end of file
@@ -0,0 +1,331 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+from one_dragon.base.inference import session_profile
+from one_dragon.base.inference.session_profile import FixedShapeIoBinding, IoBindingPool, OnnxSessionProfile
+from one_dragon.utils.log_utils import log
+
+
+class InferencePriority(IntEnum):
+
+    CRITICAL = 0  # 影响移动的识别 例如大世界的攻击提示
+    NORMAL = 1
+    BACKGROUND = 2  # 可以稍微等待的识别 例如OCR
+
+
+@dataclass
+class InferenceModelStats:
+    """一个模型的推理统计"""
+    model_name: str = ''
+    priority: int = InferencePriority.NORMAL
+    queue_depth: int = 0  # 当前排队中的请求数量
+    max_queue_depth: int = 0  # 最大排队数量
+    run_cnt: int = 0  # 推理次数
+    total_wait_ms: float = 0  # 累计排队耗时
+    total_run_ms: float = 0  # 累计推理耗时
+    last_wait_ms: float = 0
+    last_run_ms: float = 0
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_ms / self.run_cnt if self.run_cnt > 0 else 0
+
+    @property
+    def avg_run_ms(self) -> float:
+        return self.total_run_ms / self.run_cnt if self.run_cnt > 0 else 0
+
+
+class _InferenceRequest:
+
+    def __init__(self, session: 'ScheduledSession', output_names: Optional[List[str]],
+                 input_feed: Dict[str, Any], run_options: Optional[ort.RunOptions],
+                 priority: int,
+                 io_binding: Optional[FixedShapeIoBinding] = None):
+        self.session: ScheduledSession = session
+        self.output_names: Optional[List[str]] = output_names
+        self.input_feed: Dict[str, Any] = input_feed
+        self.run_options: Optional[ort.RunOptions] = run_options
+        self.priority: int = priority
+        self.io_binding: Optional[FixedShapeIoBinding] = io_binding
+        self.future: Future = Future()
+        self.submit_time: float = time.perf_counter()
+
+
+class ScheduledSession:
+
+    def __init__(self, scheduler: 'InferenceScheduler', session: ort.InferenceSession,
+                 model_name: str, priority: int, io_binding_pool: Optional[IoBindingPool] = None):
+        """
+        由调度器管理的 InferenceSession
+        和 InferenceSession 的用法一样 run 会交给调度器排队执行
+        """
+        self.scheduler: InferenceScheduler = scheduler
+        self.session: ort.InferenceSession = session
+        self.model_name: str = model_name
+        self.priority: int = priority
+        self.io_binding_pool: Optional[IoBindingPool] = io_binding_pool  # 输入输出大小固定时 使用预先分配的输出
+
+    @property
+    def io_binding_enabled(self) -> bool:
+        return self.io_binding_pool is not None
+
+    def run(self, output_names: Optional[List[str]], input_feed: Dict[str, Any],
+            run_options: Optional[ort.RunOptions] = None,
+            priority: Optional[int] = None) -> List[Any]:
+        """
+        同步推理 排队等待执行
+        :param output_names: 输出名称
+        :param input_feed: 输入
+        :param run_options: 运行参数
+        :param priority: 优先级 不传入时使用模型的优先级
+        :return: 推理结果
+        """
+        return self.submit(output_names, input_feed, run_options, priority=priority).result()
+
+    def submit(self, output_names: Optional[List[str]], input_feed: Dict[str, Any],
+               run_options: Optional[ort.RunOptions] = None,
+               priority: Optional[int] = None) -> Future:
+        """
+        异步推理
+        :return: 推理结果的 Future
+        """
+        return self.scheduler.submit(self, output_names, input_feed, run_options,
+                                     priority=self.priority if priority is None else priority)
+
+    def run_with_io_binding(self, input_feed: Dict[str, Any],
+                            run_options: Optional[ort.RunOptions] = None,
+                            priority: Optional[int] = None) -> List[np.ndarray]:
+        """
+        使用预先分配的输出缓冲区推理 只能在 io_binding_enabled 时使用
+        返回的结果会在当前线程下一次推理时被覆盖
+        :param input_feed: 输入
+        :param run_options: 运行参数
+        :param priority: 优先级 不传入时使用模型的优先级
+        :return: 全部输出
+        """
+        io_binding = self.io_binding_pool.get()
+        io_binding.bind_input(input_feed)
+        return self.scheduler.submit(self, None, input_feed, run_options,
+                                     priority=self.priority if priority is None else priority,
+                                     io_binding=io_binding).result()
+
+    def __getattr__(self, item):
+        # get_inputs / get_outputs / get_providers 等直接使用原来的 session
+        return getattr(self.session, item)
+
+
+class _InferenceLane:
+
+    def __init__(self, name: str, intra_op_threads: int):
+        """
+        一条推理通道 有自己的排队和推理线程
+        :param name: 通道名称 用于线程名
+        :param intra_op_threads: 在这条通道上推理的模型 每次推理使用的线程数
+        """
+        self.name: str = name
+        self.intra_op_threads: int = intra_op_threads
+        self.queue: queue.PriorityQueue = queue.PriorityQueue()
+        self.worker: Optional[threading.Thread] = None
+
+
+class InferenceScheduler:
+
+    def __init__(self,
+                 intra_op_threads: Optional[int] = None,
+                 inter_op_threads: int = 1):
+        """
+        统一管理所有 ONNX 模型的推理
+        - 影响移动的识别(CRITICAL) 使用单独的推理线程 不需要等待正在执行的OCR
+        - 其它识别共用一个推理线程 按优先级排队
+        - 两个推理线程分摊线程预算 避免OCR和YOLO同时推理时抢占CPU
+        - 记录每个模型的排队数量和耗时
+
+        :param intra_op_threads: 所有推理线程合计使用的线程数 默认为CPU核数的一半
+        :param inter_op_threads: 每次推理并行执行算子的线程数
+        """
+        self.intra_op_threads: int = 0
+        self.inter_op_threads: int = inter_op_threads
+        self._critical_lane: _InferenceLane = _InferenceLane('critical', 1)
+        self._normal_lane: _InferenceLane = _InferenceLane('normal', 1)
+        self.set_intra_op_threads(intra_op_threads)
+
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, InferenceModelStats] = {}
+
+        self._worker_local = threading.local()
+        self._running: bool = True
+
+        self.session_profile: OnnxSessionProfile = OnnxSessionProfile()  # 之后创建的 session 使用的参数
+
+    def set_intra_op_threads(self, intra_op_threads: Optional[int]) -> None:
+        """
+        设置所有推理线程合计使用的线程数 平分给两个推理线程 只影响之后创建的 session
+        :param intra_op_threads: 线程数 None 或者 0 时为CPU核数的一半
+        :return:
+        """
+        if intra_op_threads is None or intra_op_threads <= 0:
+            intra_op_threads = max(1, (os.cpu_count() or 2) // 2)
+        self.intra_op_threads = intra_op_threads
+        critical_threads = max(1, intra_op_threads // 2)
+        self._critical_lane.intra_op_threads = critical_threads
+        self._normal_lane.intra_op_threads = max(1, intra_op_threads - critical_threads)
+
+    def _get_lane(self, priority: int) -> _InferenceLane:
+        return self._critical_lane if priority <= InferencePriority.CRITICAL else self._normal_lane
+
+    def create_session(self, model_path: str, providers: List[Any],
+                       model_name: Optional[str] = None,
+                       priority: int = InferencePriority.NORMAL,
+                       profile: Optional[OnnxSessionProfile] = None) -> ScheduledSession:
+        """
+        创建由调度器管理的 session
+        :param model_path: 模型路径
+        :param providers: 执行提供程序
+        :param model_name: 模型名称 用于统计
+        :param priority: 默认优先级 决定使用哪个推理线程的线程预算
+        :param profile: 不传入时使用调度器的 session_profile
+        :return:
+        """
+        if profile is None:
+            profile = self.session_profile
+        session = session_profile.create_session(model_path, providers, profile,
+                                                 self._get_lane(priority).intra_op_threads, self.inter_op_threads)
+        io_binding_pool = None
+        if (profile.io_binding and session_profile.is_cpu_only(providers)
+                and session_profile.is_fixed_shape(session)):
+            io_binding_pool = IoBindingPool(session)
+
+        if model_name is None:
+            model_name = model_path
+        with self._lock:
+            if model_name not in self._stats:
+                self._stats[model_name] = InferenceModelStats(model_name=model_name, priority=int(priority))
+        return ScheduledSession(self, session, model_name, int(priority), io_binding_pool=io_binding_pool)
+
+    def submit(self, session: ScheduledSession, output_names: Optional[List[str]],
+               input_feed: Dict[str, Any], run_options: Optional[ort.RunOptions] = None,
+               priority: int = InferencePriority.NORMAL,
+               io_binding: Optional[FixedShapeIoBinding] = None) -> Future:
+        """
+        提交一个推理请求
+        :return: 推理结果的 Future
+        """
+        request = _InferenceRequest(session, output_names, input_feed, run_options, priority, io_binding)
+        if getattr(self._worker_local, 'is_worker', False):  # 推理线程里再提交的话 直接执行 防止互相等待
+            self._run_request(request)
+            return request.future
+
+        lane = self._get_lane(priority)
+        with self._lock:
+            stats = self._get_stats(session.model_name)
+            stats.queue_depth += 1
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+            self._ensure_worker(lane)
+
+        lane.queue.put((int(priority), next(self._seq), request))
+        return request.future
+
+    def _get_stats(self, model_name: str) -> InferenceModelStats:
+        stats = self._stats.get(model_name)
+        if stats is None:
+            stats = InferenceModelStats(model_name=model_name)
+            self._stats[model_name] = stats
+        return stats
+
+    def _ensure_worker(self, lane: _InferenceLane) -> None:
+        """
+        通道第一次使用时才创建推理线程
+        """
+        if not self._running or lane.worker is not None:
+            return
+        lane.worker = threading.Thread(target=self._work, args=(lane,), name='od_inference_%s' % lane.name, daemon=True)
+        lane.worker.start()
+
+    def _work(self, lane: _InferenceLane) -> None:
+        self._worker_local.is_worker = True
+        while True:
+            _, _, request = lane.queue.get()
+            if request is None:
+                break
+            with self._lock:
+                self._get_stats(request.session.model_name).queue_depth -= 1
+            self._run_request(request)
+
+    def _run_request(self, request: _InferenceRequest) -> None:
+        if not request.future.set_running_or_notify_cancel():
+            return
+
+        start_time = time.perf_counter()
+        try:
+            if request.io_binding is not None:
+                request.session.session.run_with_iobinding(request.io_binding.binding, request.run_options)
+                result = request.io_binding.output_list
+            else:
+                result = request.session.session.run(request.output_names, request.input_feed, request.run_options)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+        finally:
+            end_time = time.perf_counter()
+            with self._lock:
+                stats = self._get_stats(request.session.model_name)
+                stats.run_cnt += 1
+                stats.last_wait_ms = (start_time - request.submit_time) * 1000
+                stats.last_run_ms = (end_time - start_time) * 1000
+                stats.total_wait_ms += stats.last_wait_ms
+                stats.total_run_ms += stats.last_run_ms
+        request.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, InferenceModelStats]:
+        """
+        每个模型的统计
+        :return: key=模型名称
+        """
+        with self._lock:
+            return {k: InferenceModelStats(**v.__dict__) for k, v in self._stats.items()}
+
+    def log_stats(self) -> None:
+        for stats in self.get_stats().values():
+            if stats.run_cnt == 0:
+                continue
+            log.info('推理统计 %s 次数 %d 平均排队 %.1fms 平均推理 %.1fms 最大排队数 %d',
+                     stats.model_name, stats.run_cnt,
+                     stats.avg_wait_ms, stats.avg_run_ms, stats.max_queue_depth)
+
+    def shutdown(self) -> None:
+        """
+        停止推理线程 排队中的请求会继续执行完
+        """
+        with self._lock:
+            self._running = False
+            lane_list = [lane for lane in [self._critical_lane, self._normal_lane] if lane.worker is not None]
+        for lane in lane_list:
+            lane.queue.put((len(InferencePriority) + 1, next(self._seq), None))
+
+
+_DEFAULT_SCHEDULER: Optional[InferenceScheduler] = None
+_DEFAULT_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_inference_scheduler() -> InferenceScheduler:
+    """
+    全局共用的推理调度器
+    :return:
+    """
+    global _DEFAULT_SCHEDULER
+    if _DEFAULT_SCHEDULER is None:
+        with _DEFAULT_SCHEDULER_LOCK:
+            if _DEFAULT_SCHEDULER is None:
+                _DEFAULT_SCHEDULER = InferenceScheduler()
+    return _DEFAULT_SCHEDULER
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+from one_dragon.base.inference import session_profile
+from one_dragon.base.inference.session_profile import FixedShapeIoBinding, OnnxSessionProfile
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+
+_DYNAMIC_DIM_DEFAULT = 640  # 动态维度使用的大小 批量维度固定为1
+
+
+def list_model_path(base_dir: Optional[str] = None) -> List[str]:
+    """
+    找出目录下所有的 onnx 模型
+    :param base_dir: 默认为 assets/models
+    :return:
+    """
+    if base_dir is None:
+        base_dir = os_utils.get_path_under_work_dir('assets', 'models')
+    result: List[str] = []
+    for root, _, file_list in os.walk(base_dir):
+        for file_name in sorted(file_list):
+            if file_name.endswith('.onnx'):
+                result.append(os.path.join(root, file_name))
+    return sorted(result)
+
+
+def _make_input_feed(session: ort.InferenceSession) -> dict:
+    input_feed = {}
+    for node in session.get_inputs():
+        shape = []
+        for idx, dim in enumerate(node.shape):
+            if isinstance(dim, int) and dim > 0:
+                shape.append(dim)
+            else:
+                shape.append(1 if idx == 0 else _DYNAMIC_DIM_DEFAULT)
+        dtype = session_profile.ONNX_TENSOR_TYPE_MAP.get(node.type, np.dtype(np.float32))
+        input_feed[node.name] = np.random.random_sample(shape).astype(dtype)
+    return input_feed
+
+
+def _time_runs(run, warmup: int, times: int) -> dict:
+    for _ in range(warmup):
+        run()
+    cost_list: List[float] = []
+    for _ in range(times):
+        start_time = time.perf_counter()
+        run()
+        cost_list.append((time.perf_counter() - start_time) * 1000)
+    return {
+        'p50': round(float(np.percentile(cost_list, 50)), 3),
+        'p95': round(float(np.percentile(cost_list, 95)), 3),
+        'min': round(min(cost_list), 3),
+    }
+
+
+def benchmark_model(model_path: str, profile: OnnxSessionProfile,
+                    intra_op_threads: int, inter_op_threads: int,
+                    warmup: int = 5, times: int = 50) -> dict:
+    """
+    对比默认参数和配置参数下 一个模型的加载耗时和推理耗时
+    :param model_path: 模型路径
+    :param profile: 配置
+    :param intra_op_threads: 推理调度器的线程预算
+    :param inter_op_threads: 推理调度器的线程预算
+    :param warmup: 预热次数
+    :param times: 计时次数
+    :return:
+    """
+    providers: List[Any] = ['CPUExecutionProvider']
+    result: dict = {'model': model_path}
+
+    start_time = time.perf_counter()
+    default_session = ort.InferenceSession(model_path, providers=providers)
+    result['default_load_ms'] = round((time.perf_counter() - start_time) * 1000, 3)
+    input_feed = _make_input_feed(default_session)
+    result['default_run'] = _time_runs(lambda: default_session.run(None, input_feed), warmup, times)
+
+    if profile.cache_optimized_model:  # 删除缓存 分别统计第一次加载和使用缓存加载的耗时
+        cache_path = profile.get_optimized_model_path(model_path)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    start_time = time.perf_counter()
+    session = session_profile.create_session(model_path, providers, profile, intra_op_threads, inter_op_threads)
+    result['profile_cold_load_ms'] = round((time.perf_counter() - start_time) * 1000, 3)
+    if profile.cache_optimized_model:
+        start_time = time.perf_counter()
+        session = session_profile.create_session(model_path, providers, profile, intra_op_threads, inter_op_threads)
+        result['profile_cached_load_ms'] = round((time.perf_counter() - start_time) * 1000, 3)
+    result['profile_run'] = _time_runs(lambda: session.run(None, input_feed), warmup, times)
+
+    if profile.io_binding and session_profile.is_fixed_shape(session):
+        io_binding = FixedShapeIoBinding(session)
+
+        def run_with_io_binding():
+            io_binding.bind_input(input_feed)
+            session.run_with_iobinding(io_binding.binding)
+
+        result['profile_io_binding_run'] = _time_runs(run_with_io_binding, warmup, times)
+
+    best_run = min(v['p50'] for k, v in result.items() if k.startswith('profile_') and k.endswith('_run'))
+    result['run_speedup'] = round(result['default_run']['p50'] / best_run, 3) if best_run > 0 else None
+    return result
+
+
+def __debug():
+    parser = argparse.ArgumentParser(description='对比默认参数和配置参数下 每个模型的加载耗时和推理耗时')
+    parser.add_argument('--model', type=str, nargs='*', default=None, help='模型路径 默认为 assets/models 下的所有模型')
+    parser.add_argument('--output', type=str, default=None, help='结果保存的json文件 默认保存在 .debug/onnx_session_benchmark')
+    parser.add_argument('--optimization-level', type=str, default='all', help='图优化级别 disable / basic / extended / all')
+    parser.add_argument('--intra-op-threads', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='每次推理使用的线程数')
+    parser.add_argument('--inter-op-threads', type=int, default=1, help='并行执行算子的线程数')
+    parser.add_argument('--no-cache', action='store_true', help='不缓存优化后的模型')
+    parser.add_argument('--no-io-binding', action='store_true', help='不使用预先分配的输出缓冲区')
+    parser.add_argument('--warmup', type=int, default=5, help='预热次数')
+    parser.add_argument('--times', type=int, default=50, help='计时次数')
+    args = parser.parse_args()
+
+    profile = OnnxSessionProfile(
+        optimization_level=args.optimization_level,
+        cache_optimized_model=not args.no_cache,
+        io_binding=not args.no_io_binding,
+    )
+
+    model_list = args.model if args.model else list_model_path()
+    result_list = []
+    for model_path in model_list:
+        try:
+            result = benchmark_model(model_path, profile, args.intra_op_threads, args.inter_op_threads,
+                                     warmup=args.warmup, times=args.times)
+        except Exception:
+            log.error('模型评估失败 %s', model_path, exc_info=True)
+            continue
+        result_list.append(result)
+        log.info('%s 加载 %.1fms -> %.1fms 推理p50 %.2fms -> %.2fms 提升 %sx',
+                 os.path.basename(os.path.dirname(model_path)) + '/' + os.path.basename(model_path),
+                 result['default_load_ms'], result.get('profile_cached_load_ms', result['profile_cold_load_ms']),
+                 result['default_run']['p50'],
+                 min(v['p50'] for k, v in result.items() if k.startswith('profile_') and k.endswith('_run')),
+                 result['run_speedup'])
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os_utils.get_path_under_work_dir('.debug', 'onnx_session_benchmark'),
+                              '%s.json' % os_utils.now_timestamp_str())
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'config': {
+                'ort_version': ort.__version__,
+                'optimization_level': args.optimization_level,
+                'intra_op_threads': args.intra_op_threads,
+                'inter_op_threads': args.inter_op_threads,
+                'cache_optimized_model': not args.no_cache,
+                'io_binding': not args.no_io_binding,
+            },
+            'model': result_list,
+        }, file, ensure_ascii=False, indent=2)
+    log.info('结果已保存 %s', output)
+
+
+if __name__ == '__main__':
+    __debug()
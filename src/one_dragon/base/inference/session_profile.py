@@ -0,0 +1,217 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+
+_OPTIMIZATION_LEVEL_MAP: Dict[str, Any] = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+ONNX_TENSOR_TYPE_MAP: Dict[str, np.dtype] = {
+    'tensor(float)': np.dtype(np.float32),
+    'tensor(float16)': np.dtype(np.float16),
+    'tensor(double)': np.dtype(np.float64),
+    'tensor(int64)': np.dtype(np.int64),
+    'tensor(int32)': np.dtype(np.int32),
+    'tensor(uint8)': np.dtype(np.uint8),
+}
+
+
+class OnnxSessionProfile:
+
+    def __init__(self,
+                 optimization_level: str = 'all',
+                 intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None,
+                 enable_cpu_mem_arena: bool = True,
+                 enable_mem_pattern: bool = True,
+                 cache_optimized_model: bool = True,
+                 cache_dir: Optional[str] = None,
+                 io_binding: bool = True):
+        """
+        创建 InferenceSession 时使用的参数 所有模型共用
+        :param optimization_level: 图优化级别 disable / basic / extended / all
+        :param intra_op_threads: 每次推理使用的线程数 不传入时使用推理调度器的线程预算
+        :param inter_op_threads: 并行执行算子的线程数 不传入时使用推理调度器的线程预算
+        :param enable_cpu_mem_arena: 使用内存池 减少每次推理的内存分配
+        :param enable_mem_pattern: 按第一次推理的内存分配方式 预先分配之后推理的内存 输入大小固定时有效
+        :param cache_optimized_model: 把优化后的模型保存到磁盘 下次启动时直接加载 减少冷启动耗时
+        :param cache_dir: 优化后模型的保存目录 默认为 .cache/onnx
+        :param io_binding: 输入输出大小固定的模型 使用预先分配的输出缓冲区
+        """
+        self.optimization_level: str = optimization_level
+        self.intra_op_threads: Optional[int] = intra_op_threads
+        self.inter_op_threads: Optional[int] = inter_op_threads
+        self.enable_cpu_mem_arena: bool = enable_cpu_mem_arena
+        self.enable_mem_pattern: bool = enable_mem_pattern
+        self.cache_optimized_model: bool = cache_optimized_model
+        self.cache_dir: Optional[str] = cache_dir
+        self.io_binding: bool = io_binding
+
+    def create_session_options(self,
+                               model_path: str,
+                               providers: List[Any],
+                               intra_op_threads: int,
+                               inter_op_threads: int) -> Tuple[ort.SessionOptions, str]:
+        """
+        创建 SessionOptions
+        使用优化模型缓存时 返回的模型路径可能是缓存的优化模型
+
+        :param model_path: 模型路径
+        :param providers: 执行提供程序
+        :param intra_op_threads: 推理调度器的线程预算
+        :param inter_op_threads: 推理调度器的线程预算
+        :return: SessionOptions 和 实际加载的模型路径
+        """
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads if self.intra_op_threads is not None else intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads if self.inter_op_threads is not None else inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        options.enable_mem_pattern = self.enable_mem_pattern
+        options.graph_optimization_level = _OPTIMIZATION_LEVEL_MAP.get(
+            self.optimization_level, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+
+        # 优化后的模型会包含执行提供程序相关的算子 只缓存CPU的
+        if not self.cache_optimized_model or self.optimization_level == 'disable' or not is_cpu_only(providers):
+            return options, model_path
+
+        cache_path = self.get_optimized_model_path(model_path)
+        if os.path.exists(cache_path):
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            return options, cache_path
+
+        options.optimized_model_filepath = cache_path
+        return options, model_path
+
+    def get_optimized_model_path(self, model_path: str) -> str:
+        """
+        优化后模型的保存路径
+        模型文件、优化级别或者 onnxruntime 版本变化时 都会使用新的路径
+        :param model_path: 原模型路径
+        :return:
+        """
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            cache_dir = os_utils.get_path_under_work_dir('.cache', 'onnx')
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+        stat = os.stat(model_path)
+        key = '%s|%d|%d|%s|%s' % (os.path.abspath(model_path), stat.st_size, int(stat.st_mtime),
+                                  self.optimization_level, ort.__version__)
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+        model_name = os.path.splitext(os.path.basename(model_path))[0]
+        parent_name = os.path.basename(os.path.dirname(model_path))
+        return os.path.join(cache_dir, '%s-%s-%s.onnx' % (parent_name, model_name, digest))
+
+
+class FixedShapeIoBinding:
+
+    def __init__(self, session: ort.InferenceSession):
+        """
+        输入输出大小固定的模型 预先分配输出的缓冲区 每次推理直接写入
+        返回的结果会在同一个线程下一次推理时被覆盖 需要保留时自行复制
+        :param session: 原始的 InferenceSession
+        """
+        self.binding = session.io_binding()
+        self.output_list: List[np.ndarray] = []
+        for node in session.get_outputs():
+            arr = np.empty(node.shape, dtype=ONNX_TENSOR_TYPE_MAP[node.type])
+            self.binding.bind_output(node.name, 'cpu', 0, arr.dtype, arr.shape, arr.ctypes.data)
+            self.output_list.append(arr)
+
+    def bind_input(self, input_feed: Dict[str, np.ndarray]) -> None:
+        """
+        绑定输入 连续内存的输入不会复制
+        """
+        for name, arr in input_feed.items():
+            self.binding.bind_cpu_input(name, arr)
+
+
+class IoBindingPool:
+
+    def __init__(self, session: ort.InferenceSession):
+        """
+        每个调用线程各自使用一个 FixedShapeIoBinding
+        调用线程会等待推理结果并处理完才进行下一次推理 所以结果不会被其它推理覆盖
+        """
+        self.session: ort.InferenceSession = session
+        self._local = threading.local()
+
+    def get(self) -> FixedShapeIoBinding:
+        binding = getattr(self._local, 'binding', None)
+        if binding is None:
+            binding = FixedShapeIoBinding(self.session)
+            self._local.binding = binding
+        return binding
+
+
+def is_cpu_only(providers: List[Any]) -> bool:
+    """
+    执行提供程序是否只有CPU
+    """
+    for provider in providers:
+        name = provider[0] if isinstance(provider, tuple) else provider
+        if name != 'CPUExecutionProvider':
+            return False
+    return True
+
+
+def is_fixed_shape(session: ort.InferenceSession) -> bool:
+    """
+    模型的输入输出大小是否固定
+    """
+    for node in list(session.get_inputs()) + list(session.get_outputs()):
+        if node.type not in ONNX_TENSOR_TYPE_MAP:
+            return False
+        for dim in node.shape:
+            if not isinstance(dim, int) or dim <= 0:
+                return False
+    return True
+
+
+def create_session(model_path: str,
+                   providers: List[Any],
+                   profile: Optional[OnnxSessionProfile],
+                   intra_op_threads: int,
+                   inter_op_threads: int) -> ort.InferenceSession:
+    """
+    按配置创建 InferenceSession
+    第一次加载时会保存优化后的模型 保存失败时不影响使用
+    :param model_path: 模型路径
+    :param providers: 执行提供程序
+    :param profile: 配置 不传入时使用默认配置
+    :param intra_op_threads: 推理调度器的线程预算
+    :param inter_op_threads: 推理调度器的线程预算
+    :return:
+    """
+    if profile is None:
+        profile = OnnxSessionProfile()
+    options, load_path = profile.create_session_options(model_path, providers, intra_op_threads, inter_op_threads)
+    try:
+        return ort.InferenceSession(load_path, sess_options=options, providers=providers)
+    except Exception:
+        if load_path == model_path and not options.optimized_model_filepath:
+            raise
+        # 缓存的优化模型损坏 或者无法保存时 使用原模型重新加载
+        log.error('加载优化模型失败 使用原模型 %s', model_path, exc_info=True)
+        if load_path != model_path and os.path.exists(load_path):
+            os.remove(load_path)
+        options, _ = OnnxSessionProfile(
+            optimization_level=profile.optimization_level,
+            intra_op_threads=options.intra_op_num_threads,
+            inter_op_threads=options.inter_op_num_threads,
+            enable_cpu_mem_arena=profile.enable_cpu_mem_arena,
+            enable_mem_pattern=profile.enable_mem_pattern,
+            cache_optimized_model=False,
+        ).create_session_options(model_path, providers, intra_op_threads, inter_op_threads)
+        return ort.InferenceSession(model_path, sess_options=options, providers=providers)
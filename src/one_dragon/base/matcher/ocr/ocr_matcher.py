@@ -51,6 +51,15 @@ class OcrMatcher:
         """
         raise NotImplementedError('由具体的OCR实现提供')
 
+    def run_ocr_single_line_batch(self, image_list: list[MatLike], threshold: float | None = None) -> list[str]:
+        """
+        多张单行文本图片一起识别 具体的OCR实现可以合并成批量推理
+        :param image_list: 图片列表 每张图片都只有单行文本
+        :param threshold: 阈值
+        :return: 识别结果 顺序与传入的图片一致
+        """
+        return [self.run_ocr_single_line(image, threshold) for image in image_list]
+
     def run_ocr(self, image: MatLike, threshold: float | None = None,
                 merge_line_distance: float = -1) -> dict[str, MatchResultList]:
         """
@@ -1,4 +1,7 @@
+import hashlib
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import cv2
@@ -17,19 +20,31 @@ from one_dragon.utils.log_utils import log
 @dataclass(frozen=True)
 class OcrCacheEntry:
     """OCR缓存条目"""
-    image_id: int  # 图片在内存中的ID
-    image: MatLike  # 将图片也缓存起来 防止旧图片没引用被回收 导致出现新图片ID与旧图片重复
+    cache_key: tuple  # 缓存键 (图片内容哈希, 颜色范围, 识别区域, OCR阈值, 行合并距离)
     ocr_result_list: list[OcrMatchResult]  # OCR识别结果
     create_time: float  # 创建时间
-    color_range: list[list[int]] | None  # 颜色范围
-    rect: Rect | None = None  # 识别区域
-    crop_first: bool = True  # 先裁剪再识别 用于从连续文本中只提取特定区域的文本
+    size: int  # 估算占用的字节数
+
+
+@dataclass
+class OcrCacheStats:
+    """OCR缓存统计"""
+    hit: int = 0  # 命中次数
+    miss: int = 0  # 未命中次数
+    entry_cnt: int = 0  # 当前条目数
+    total_bytes: int = 0  # 当前估算占用的字节数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hit + self.miss
+        return self.hit / total if total > 0 else 0
 
 
 class OcrService:
     """
     OCR服务
-    - 提供缓存
+    - 提供缓存 按识别区域的图片内容哈希作为键 连续几帧画面不变时可以直接复用结果
+    - 全图识别时 计算整张图的哈希太慢 只在同一张图片上复用结果
     - 提供并发识别 (未实现)
 
     缺点：
@@ -40,7 +55,8 @@ class OcrService:
     def __init__(
         self,
         ocr_matcher: OcrMatcher,
-        max_cache_size: int = 5,
+        max_cache_size: int = 64,
+        max_cache_bytes: int = 1024 * 1024,
     ):
         """
         初始化OCR服务
@@ -48,34 +64,113 @@ class OcrService:
         Args:
             ocr_matcher: OCR匹配器实例
             max_cache_size: 最大缓存条目数
+            max_cache_bytes: 缓存最多占用的字节数 (估算)
         """
         self.ocr_matcher = ocr_matcher
         self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
 
-        # 缓存存储：key=图片ID，value为缓存条目
-        self._cache: dict[int, list[OcrCacheEntry]] = {}
-        self._cache_list: list[OcrCacheEntry] = []
+        # 缓存存储：key=缓存键，value为缓存条目 按最近使用排序
+        self._cache: OrderedDict[tuple, OcrCacheEntry] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats = OcrCacheStats()
+
+        # 全图识别的缓存 只保留最近一张图片的结果 持有图片的引用 保证对象不会被回收后复用
+        self._frame_image: MatLike | None = None
+        self._frame_cache: dict[tuple, list[OcrMatchResult]] = {}  # key=(颜色范围, OCR阈值, 行合并距离)
 
     def _clean_expired_cache(self) -> None:
         """
-        清除过期缓存
+        按最近最少使用清除超出限制的缓存 需要在持有锁时调用
+        Returns:
+
+        """
+        while len(self._cache) > 0 and (
+                len(self._cache) > self.max_cache_size
+                or self._stats.total_bytes > self.max_cache_bytes
+        ):
+            _, oldest_entry = self._cache.popitem(last=False)
+            self._stats.total_bytes -= oldest_entry.size
+        self._stats.entry_cnt = len(self._cache)
+
+    @staticmethod
+    def _estimate_entry_size(ocr_result_list: list[OcrMatchResult]) -> int:
+        """
+        估算缓存条目占用的字节数
+        Args:
+            ocr_result_list: OCR识别结果
+
+        Returns:
+            字节数
+        """
+        size = 256
+        for ocr_result in ocr_result_list:
+            size += 256 + len(ocr_result.data or '') * 4
+        return size
+
+    @staticmethod
+    def _get_image_digest(image: MatLike, rect: Rect) -> bytes:
+        """
+        计算识别区域的图片内容哈希
+        识别区域通常很小 计算哈希的耗时远小于OCR
+
+        Args:
+            image: 输入图片
+            rect: 识别区域
+
+        Returns:
+            哈希值
+        """
+        part = cv2_utils.crop_image_only(image, rect)
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(str(part.shape).encode())
+        hasher.update(np.ascontiguousarray(part).data)
+        return hasher.digest()
+
+    @staticmethod
+    def _get_color_key(color_range: list[list[int]] | None) -> tuple | None:
+        return None if color_range is None else tuple(tuple(i) for i in color_range)
+
+    def _get_cache_key(
+        self,
+        image: MatLike,
+        color_range: list[list[int]] | None,
+        rect: Rect,
+        threshold: float,
+        merge_line_distance: float,
+    ) -> tuple:
+        """
+        生成先裁剪再识别时的缓存键
+        只需要关注识别区域的内容 其它区域的变化不影响结果
+
+        Args:
+            image: 输入图片
+            color_range: 颜色范围过滤 [[lower], [upper]]
+            rect: 指定区域
+            threshold: OCR阈值
+            merge_line_distance: 行合并距离
+
         Returns:
+            缓存键
+        """
+        digest = self._get_image_digest(image, rect)
+        rect_key = (rect.x1, rect.y1, rect.x2, rect.y2)
+        return digest, self._get_color_key(color_range), rect_key, threshold, merge_line_distance
 
+    def get_cache_stats(self) -> OcrCacheStats:
         """
-        while len(self._cache_list) > self.max_cache_size:
-            oldest_entry = self._cache_list.pop(0)
-            image_id = oldest_entry.image_id
-
-            if image_id in self._cache:
-                # 从与 image_id 关联的列表中移除特定的条目
-                try:
-                    self._cache[image_id].remove(oldest_entry)
-                    # 如果这个 image_id 的列表现在为空，则从字典中移除该键
-                    if not self._cache[image_id]:
-                        self._cache.pop(image_id)
-                except ValueError:
-                    # 在罕见的并发场景下，如果条目已经被移除，可能会发生这种情况，但可以安全地忽略。
-                    pass
+        获取缓存统计
+
+        Returns:
+            缓存统计的快照
+        """
+        with self._cache_lock:
+            return OcrCacheStats(
+                hit=self._stats.hit,
+                miss=self._stats.miss,
+                entry_cnt=len(self._cache),
+                total_bytes=self._stats.total_bytes,
+            )
 
     def _apply_color_filter(self, image: MatLike, color_range: list[list[int]]) -> MatLike:
         """
@@ -96,40 +191,77 @@ class OcrService:
         mask = cv2.inRange(image, np.array(color_range[0]), np.array(color_range[1]))
         return cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
 
-    def _get_ocr_result_list_from_cache(
-        self,
-        image: MatLike,
-        color_range: list[list[int]] | None = None,
-        rect: Rect | None = None,
-        crop_first: bool = True,
-    ) -> OcrCacheEntry | None:
+    def _get_ocr_result_list_from_cache(self, cache_key: tuple) -> OcrCacheEntry | None:
         """
         从缓存中获取OCR结果
         Args:
-            image: 输入图片
-            color_range: 颜色范围过滤 [[lower], [upper]]
-            rect: 指定区域。识别结果后，筛选在指定区域中出现的结果，即文本所在的矩形有70%以上在指定区域内
-            crop_first: 先裁剪再识别 用于从连续文本中只提取特定区域的文本
+            cache_key: 缓存键
 
         Returns:
             缓存条目
         """
-        image_id = id(image)
-        cache_list = self._cache.get(image_id)
-        if cache_list is None:
-            return None
-
-        for cache_entry in cache_list:
-            # Python 的列表 == 操作符会自动处理嵌套结构和值的比较 包括None
-            if cache_entry.color_range != color_range:
-                continue
-            if cache_entry.crop_first != crop_first:
-                continue
-            if crop_first and cache_entry.rect != rect:
-                continue
+        with self._cache_lock:
+            cache_entry = self._cache.get(cache_key)
+            if cache_entry is None:
+                self._stats.miss += 1
+                return None
+            self._cache.move_to_end(cache_key)
+            self._stats.hit += 1
             return cache_entry
 
-        return None
+    def _put_ocr_result_list_to_cache(self, cache_key: tuple, ocr_result_list: list[OcrMatchResult]) -> None:
+        """
+        存储到缓存
+        Args:
+            cache_key: 缓存键
+            ocr_result_list: OCR识别结果
+        """
+        cache_entry = OcrCacheEntry(
+            cache_key=cache_key,
+            ocr_result_list=ocr_result_list,
+            create_time=time.time(),
+            size=self._estimate_entry_size(ocr_result_list),
+        )
+        with self._cache_lock:
+            old_entry = self._cache.pop(cache_key, None)
+            if old_entry is not None:
+                self._stats.total_bytes -= old_entry.size
+            self._cache[cache_key] = cache_entry
+            self._stats.total_bytes += cache_entry.size
+            self._clean_expired_cache()
+
+    def _get_frame_ocr_result_list(self, image: MatLike, frame_key: tuple) -> list[OcrMatchResult] | None:
+        """
+        从全图识别的缓存中获取OCR结果 只有同一张图片才会命中
+        Args:
+            image: 输入图片
+            frame_key: 缓存键
+
+        Returns:
+            OCR识别结果
+        """
+        with self._cache_lock:
+            ocr_result_list = self._frame_cache.get(frame_key) if self._frame_image is image else None
+            if ocr_result_list is None:
+                self._stats.miss += 1
+            else:
+                self._stats.hit += 1
+            return ocr_result_list
+
+    def _put_frame_ocr_result_list(self, image: MatLike, frame_key: tuple,
+                                   ocr_result_list: list[OcrMatchResult]) -> None:
+        """
+        存储到全图识别的缓存 图片变化时清除之前图片的结果
+        Args:
+            image: 输入图片
+            frame_key: 缓存键
+            ocr_result_list: OCR识别结果
+        """
+        with self._cache_lock:
+            if self._frame_image is not image:
+                self._frame_image = image
+                self._frame_cache = {}
+            self._frame_cache[frame_key] = ocr_result_list
 
     def get_ocr_result_list(
         self,
@@ -154,25 +286,22 @@ class OcrService:
         Returns:
             ocr_result_list: OCR识别结果列表
         """
-        # 生成缓存键
-        image_id = id(image)
-
-        cache_entity = self._get_ocr_result_list_from_cache(
-            image=image,
-            color_range=color_range,
-            rect=rect,
-            crop_first=crop_first,
-        )
-
-        # 检查缓存
-        if cache_entity is not None:
-            ocr_result_list = cache_entity.ocr_result_list
+        # 检查缓存 先裁剪时按区域内容 全图识别时按图片对象
+        crop_part = crop_first and rect is not None
+        if crop_part:
+            cache_key = self._get_cache_key(image, color_range, rect, threshold, merge_line_distance)
+            cache_entity = self._get_ocr_result_list_from_cache(cache_key)
+            ocr_result_list = None if cache_entity is None else cache_entity.ocr_result_list
         else:
+            cache_key = (self._get_color_key(color_range), threshold, merge_line_distance)
+            ocr_result_list = self._get_frame_ocr_result_list(image, cache_key)
+
+        if ocr_result_list is None:
             # 应用颜色过滤
             processed_image = self._apply_color_filter(image, color_range)
 
             # 执行OCR
-            if crop_first and rect is not None:
+            if crop_part:
                 crop_image, crop_rect = cv2_utils.crop_image(processed_image, rect)
                 bus = getattr(self.ocr_matcher, 'overlay_debug_bus', None)
                 if bus is not None:
@@ -190,20 +319,10 @@ class OcrService:
                 ocr_result_list = self.ocr_matcher.ocr(processed_image, threshold, merge_line_distance)
 
             # 存储到缓存
-            cache_entry = OcrCacheEntry(
-                ocr_result_list=ocr_result_list,
-                create_time=time.time(),
-                color_range=color_range,
-                image_id=image_id,
-                image=image,
-                rect=rect,
-                crop_first=crop_first,
-            )
-            if image_id not in self._cache:
-                self._cache[image_id] = []
-            self._cache[image_id].append(cache_entry)
-            self._cache_list.append(cache_entry)
-            self._clean_expired_cache()
+            if crop_part:
+                self._put_ocr_result_list_to_cache(cache_key, ocr_result_list)
+            else:
+                self._put_frame_ocr_result_list(image, cache_key, ocr_result_list)
 
         if rect is not None:
             # 过滤出指定区域内的结果
@@ -268,6 +387,32 @@ class OcrService:
             result_map[word].append(mr, auto_merge=False)
         return result_map
 
+    def get_single_line_text_by_rects(
+        self,
+        image: MatLike,
+        rect_list: list[Rect],
+        color_range: list[list[int]] | None = None,
+        threshold: float = 0,
+    ) -> list[str]:
+        """
+        在同一张图片上 对多个区域进行单行文本识别 所有区域合并成批量推理
+
+        Args:
+            image: 输入图片
+            rect_list: 识别区域列表 每个区域都只有单行文本
+            color_range: 颜色范围过滤 [[lower], [upper]]
+            threshold: OCR阈值
+
+        Returns:
+            识别文本列表 顺序与传入的区域一致
+        """
+        part_list: list[MatLike] = []
+        for rect in rect_list:
+            part = cv2_utils.crop_image_only(image, rect)
+            part_list.append(self._apply_color_filter(part, color_range))
+
+        return self.ocr_matcher.run_ocr_single_line_batch(part_list, threshold)
+
     def find_text_in_area(
         self,
         image: MatLike,
@@ -305,5 +450,10 @@ class OcrService:
 
     def clear_cache(self) -> None:
         """清空所有缓存"""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+            self._frame_image = None
+            self._frame_cache = {}
+            self._stats.total_bytes = 0
+            self._stats.entry_cnt = 0
         log.debug("OCR缓存已清空")
@@ -70,6 +70,7 @@ class OnnxOcrParam:
             use_gpu: bool = False,
             use_angle_cls: bool = False,
             det_limit_side_len: float = 960.0,
+            rec_batch_num: int = 6,
     ):
         self.ocr_model_name: str = ocr_model_name
         self.models_dir: str = get_ocr_model_dir(ocr_model_name)
@@ -97,6 +98,11 @@ class OnnxOcrParam:
         # ===================================================================
         self.det_limit_side_len = det_limit_side_len  # 输入图像的长边限制
 
+        # ===================================================================
+        # V. 文字识别超参数 (Recognition Hyperparameters)
+        # ===================================================================
+        self.rec_batch_num = rec_batch_num  # 文字识别每次推理的最大图片数量
+
     def to_dict(self):
         """将OCR配置转换为字典格式"""
         return {
@@ -108,6 +114,7 @@ class OnnxOcrParam:
             'vis_font_path': self.vis_font_path,
             'use_angle_cls': self.use_angle_cls,
             'det_limit_side_len': self.det_limit_side_len,
+            'rec_batch_num': self.rec_batch_num,
         }
 
 
@@ -345,6 +352,38 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
             log.debug('OCR结果 %s 耗时 %.2f', scan_result, time.time() - start_time)
         return img_result[0][0]
 
+    def run_ocr_single_line_batch(self, image_list: List[MatLike], threshold: float = 0) -> List[str]:
+        """
+        多张单行文本图片一起识别 不使用检测模型
+        识别模型内部会按宽高比排序后分批推理 N张图片只需要 N/rec_batch_num 次推理
+        :param image_list: 图片列表 每张图片都只有单行文本
+        :param threshold: 匹配阈值 低于阈值的结果返回空字符串
+        :return: 识别结果 顺序与传入的图片一致
+        """
+        if len(image_list) == 0:
+            return []
+        if self._model is None and not self.init_model():
+            return ['' for _ in image_list]
+        start_time = time.time()
+        scan_result: list = self._model.ocr(
+            list(image_list),
+            det=False,
+            rec=True,
+            cls=self._ocr_param.use_angle_cls
+        )
+        img_result = scan_result[0]
+
+        result_list: List[str] = []
+        for text, score in img_result:
+            result_list.append(text if score >= threshold else '')
+
+        elapsed_ms = (time.time() - start_time) * 1000.0
+        self._emit_overlay_perf_and_timeline(elapsed_ms, len(result_list))
+
+        if log.isEnabledFor(DEBUG):
+            log.debug('批量OCR结果 %s 耗时 %.2f', result_list, time.time() - start_time)
+        return result_list
+
     def match_words(
             self,
             image: MatLike, words: List[str],
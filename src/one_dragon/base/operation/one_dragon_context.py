@@ -12,6 +12,8 @@ from one_dragon.base.config.basic_model_config import BasicModelConfig
 from one_dragon.base.config.custom_config import UILanguageEnum
 from one_dragon.base.controller.controller_base import ControllerBase
 from one_dragon.base.controller.pc_button.pc_button_listener import PcButtonListener
+from one_dragon.base.inference.inference_scheduler import get_inference_scheduler
+from one_dragon.base.inference.session_profile import OnnxSessionProfile
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
 from one_dragon.base.matcher.ocr.ocr_service import OcrService
 from one_dragon.base.matcher.ocr.onnx_ocr_matcher import OnnxOcrMatcher, OnnxOcrParam
@@ -34,6 +36,8 @@ from one_dragon.base.operation.one_dragon_env_context import (
     OneDragonEnvContext,
 )
 from one_dragon.base.push.push_service import PushService
+from one_dragon.base.screen.frame_vision_context import FrameVisionCache
+from one_dragon.base.screen.screen_area_change_detector import ScreenAreaChangeDetector
 from one_dragon.base.screen.screen_loader import ScreenContext
 from one_dragon.base.screen.template_loader import TemplateLoader
 from one_dragon.utils import debug_utils, file_utils, i18_utils, log_utils, thread_utils
@@ -76,6 +80,8 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         )
         self.ocr.overlay_debug_bus = self.overlay_debug_bus
         self.ocr_service: OcrService = OcrService(ocr_matcher=self.ocr)
+        self.screen_area_change_detector: ScreenAreaChangeDetector = ScreenAreaChangeDetector()
+        self.frame_vision_cache: FrameVisionCache = FrameVisionCache()
         self.controller: ControllerBase | None = None
 
         self.keyboard_controller = keyboard.Controller()
@@ -459,11 +465,26 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
             if prop in self.__dict__:
                 del self.__dict__[prop]
 
+    def init_inference_profile(self) -> None:
+        """
+        按配置设置所有模型创建 session 时使用的参数 需要在加载模型前调用
+        配置的线程数是推理调度器的总预算 由调度器分给各个推理线程
+        :return:
+        """
+        scheduler = get_inference_scheduler()
+        scheduler.set_intra_op_threads(self.model_config.onnx_intra_op_threads)
+        scheduler.session_profile = OnnxSessionProfile(
+            optimization_level=self.model_config.onnx_optimization_level,
+            cache_optimized_model=self.model_config.onnx_cache_optimized_model,
+            io_binding=self.model_config.onnx_io_binding,
+        )
+
     def init_ocr(self) -> None:
         """
         初始化OCR
         :return:
         """
+        self.init_inference_profile()  # OCR是最先加载的模型
         self.ocr.update_use_gpu(self.model_config.ocr_gpu)
         self.ocr.init_model(
             ghproxy_url=self.env_config.gh_proxy_url if self.env_config.is_gh_proxy else None,
@@ -489,6 +510,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         StateRecordService.after_app_shutdown()
         from one_dragon.utils import gpu_executor
         gpu_executor.shutdown(wait=False)
+        get_inference_scheduler().log_stats()
         from one_dragon.base.operation.application_base import Application
         Application.after_app_shutdown()
         self.run_context.after_app_shutdown()
@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, TypeVar
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils import cv2_utils
+
+T = TypeVar('T')
+
+
+class FrameVisionContext:
+
+    def __init__(self, screen: MatLike):
+        """
+        一张截图的识别结果
+        同一轮操作中 多个判断方法经常会识别同一张截图里的相同区域
+        相同参数的识别只需要计算一次 之后直接使用结果
+        截图需要是只读的 在截图上画图的话需要先复制
+
+        :param screen: 游戏截图
+        """
+        self.screen: MatLike = screen
+        self._lock = threading.Lock()
+        self._result_map: dict[tuple, Any] = {}
+
+        self.hit_cnt: int = 0  # 直接使用结果的次数
+        self.miss_cnt: int = 0  # 需要计算的次数
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], T]) -> T:
+        """
+        获取识别结果 没有时进行计算
+        :param key: 识别的类型和全部参数
+        :param compute: 计算方法
+        :return: 识别结果 多个调用方共用 不应该修改
+        """
+        with self._lock:
+            if key in self._result_map:
+                self.hit_cnt += 1
+                return self._result_map[key]
+            self.miss_cnt += 1
+
+        result = compute()
+        with self._lock:
+            self._result_map[key] = result
+        return result
+
+    def get_color_mask(self, rect: Optional[Rect], lower: tuple, upper: tuple) -> MatLike:
+        """
+        区域内的颜色掩码
+        :param rect: 区域 为空时使用整张截图
+        :param lower: 颜色下限
+        :param upper: 颜色上限
+        :return: 掩码
+        """
+        rect_key = None if rect is None else (rect.x1, rect.y1, rect.x2, rect.y2)
+        key = ('color_mask', rect_key, tuple(lower), tuple(upper))
+
+        def compute() -> MatLike:
+            part = self.screen if rect is None else cv2_utils.crop_image_only(self.screen, rect)
+            return cv2.inRange(part, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+
+        return self.get_or_compute(key, compute)
+
+
+class FrameVisionCache:
+
+    def __init__(self, max_frame_cnt: int = 4):
+        """
+        最近几张截图的 FrameVisionContext
+        按截图对象判断是否同一帧 新截图会生成新的对象 所以不需要主动失效
+
+        :param max_frame_cnt: 最多保留多少张截图 超过时删除最久没使用的
+        """
+        self.max_frame_cnt: int = max(1, max_frame_cnt)
+        self._lock = threading.Lock()
+        self._frame_map: OrderedDict[int, FrameVisionContext] = OrderedDict()
+
+    def get(self, screen: MatLike) -> FrameVisionContext:
+        """
+        获取截图对应的 FrameVisionContext
+        :param screen: 游戏截图
+        :return:
+        """
+        key = id(screen)
+        with self._lock:
+            frame = self._frame_map.get(key)
+            if frame is not None and frame.screen is screen:
+                self._frame_map.move_to_end(key)
+                return frame
+
+            # 缓存中保留了截图的引用 截图对象的id不会被复用
+            frame = FrameVisionContext(screen)
+            self._frame_map[key] = frame
+            self._frame_map.move_to_end(key)
+            while len(self._frame_map) > self.max_frame_cnt:
+                self._frame_map.popitem(last=False)
+            return frame
+
+    def clear(self) -> None:
+        """
+        清空所有记录
+        """
+        with self._lock:
+            self._frame_map.clear()
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils import cv2_utils
+
+
+class ScreenAreaSignature:
+
+    def __init__(self, signature: np.ndarray, verdict: Any):
+        """
+        区域上一次识别时的缩略图 和 识别结论
+        """
+        self.signature: np.ndarray = signature
+        self.verdict: Any = verdict
+
+
+class ScreenAreaChangeDetector:
+
+    def __init__(self,
+                 downsample: int = 4,
+                 max_diff: int = 4,
+                 max_entry_cnt: int = 256):
+        """
+        判断区域画面是否发生了变化
+        很多操作会每一轮都识别同一个区域 等待画面变化 例如加载画面、战斗结束、跳过对话
+        区域画面没有变化时 可以直接复用上一次的识别结论 不需要再进行模板匹配或OCR
+
+        :param downsample: 缩略图的缩小倍数 用于过滤画面的细微噪声
+        :param max_diff: 缩略图每个像素允许的最大差值 小于等于这个值认为没有变化
+        :param max_entry_cnt: 最多记录多少个区域 超过时删除最久没使用的
+        """
+        self.downsample: int = max(1, downsample)
+        self.max_diff: int = max_diff
+        self.max_entry_cnt: int = max_entry_cnt
+
+        self._lock = threading.Lock()
+        self._entry_map: OrderedDict[Any, ScreenAreaSignature] = OrderedDict()
+
+        self.hit_cnt: int = 0  # 复用结论的次数
+        self.miss_cnt: int = 0  # 需要重新识别的次数
+
+    def get_signature(self, screen: MatLike, rect: Rect) -> Optional[np.ndarray]:
+        """
+        计算区域的缩略图
+        :param screen: 游戏截图
+        :param rect: 区域
+        :return: 缩略图 区域为空时返回None
+        """
+        part = cv2_utils.crop_image_only(screen, rect)
+        if part is None or part.size == 0:
+            return None
+
+        height, width = part.shape[:2]
+        target_width = max(1, width // self.downsample)
+        target_height = max(1, height // self.downsample)
+        if target_width == width and target_height == height:
+            return part.copy()
+        return cv2.resize(part, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+    def get_verdict(self, key: Any, signature: Optional[np.ndarray]) -> Optional[Any]:
+        """
+        区域画面没有变化时 返回上一次的识别结论
+        :param key: 区域的唯一标识
+        :param signature: 当前画面的缩略图
+        :return: 上一次的识别结论 画面变化或者没有记录时返回None
+        """
+        if signature is None:
+            return None
+
+        with self._lock:
+            entry = self._entry_map.get(key)
+            if entry is not None and self._is_same(entry.signature, signature):
+                self._entry_map.move_to_end(key)
+                self.hit_cnt += 1
+                return entry.verdict
+            self.miss_cnt += 1
+            return None
+
+    def put_verdict(self, key: Any, signature: Optional[np.ndarray], verdict: Any) -> None:
+        """
+        记录区域的识别结论
+        :param key: 区域的唯一标识
+        :param signature: 识别时画面的缩略图
+        :param verdict: 识别结论
+        """
+        if signature is None:
+            return
+
+        with self._lock:
+            self._entry_map[key] = ScreenAreaSignature(signature, verdict)
+            self._entry_map.move_to_end(key)
+            while len(self._entry_map) > self.max_entry_cnt:
+                self._entry_map.popitem(last=False)
+
+    def _is_same(self, old: np.ndarray, new: np.ndarray) -> bool:
+        if old.shape != new.shape or old.dtype != new.dtype:
+            return False
+        return int(np.max(cv2.absdiff(old, new))) <= self.max_diff
+
+    def clear(self) -> None:
+        """
+        清空所有记录
+        """
+        with self._lock:
+            self._entry_map.clear()
+            self.hit_cnt = 0
+            self.miss_cnt = 0
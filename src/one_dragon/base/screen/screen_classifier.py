@@ -0,0 +1,162 @@
+from typing import Callable, Optional
+
+from one_dragon.base.screen.screen_area import ScreenArea
+from one_dragon.base.screen.screen_info import ScreenInfo
+
+
+class ScreenCheck:
+
+    def __init__(self, idx: int, area: ScreenArea):
+        """
+        一个画面标识的判断 多个画面使用相同配置的标识区域时 共用一个判断
+        :param idx: 下标
+        :param area: 用于判断的区域 取第一个使用这个配置的区域
+        """
+        self.idx: int = idx
+        self.area: ScreenArea = area
+        self.screen_cnt: int = 0  # 使用这个判断的画面数量
+
+    @property
+    def is_ocr(self) -> bool:
+        """
+        是否需要OCR 模板匹配比OCR快很多
+        """
+        return not self.area.is_template_area and self.area.is_text_area
+
+
+class ScreenClassifier:
+
+    def __init__(self, screen_info_list: list[ScreenInfo]):
+        """
+        在加载画面配置时预先编译的画面分类器
+        - 相同配置的标识区域只判断一次 多个画面可以共享判断结果
+        - 每个画面的标识按 模板优先、被越多画面共享越优先 的顺序判断 尽早排除候选画面
+        - 从上一个画面开始的搜索顺序会缓存下来 不需要每次都重新搜索
+
+        :param screen_info_list: 画面列表
+        """
+        self.check_list: list[ScreenCheck] = []
+        self.screen_name_list: list[str] = []  # 有标识区域的画面 按配置顺序
+        self._screen_check_map: dict[str, list[ScreenCheck]] = {}
+        self._goto_map: dict[str, list[str]] = {}
+        self._search_order_cache: dict[tuple[Optional[str], Optional[str]], list[str]] = {}
+
+        check_key_map: dict[tuple, ScreenCheck] = {}
+        for screen_info in screen_info_list:
+            goto_list: list[str] = []
+            for area in screen_info.area_list:
+                for goto_screen in area.goto_list or []:
+                    if goto_screen not in goto_list:
+                        goto_list.append(goto_screen)
+            self._goto_map[screen_info.screen_name] = goto_list
+
+            screen_check_list: list[ScreenCheck] = []
+            for area in screen_info.area_list:
+                if not area.id_mark:
+                    continue
+                key = ScreenClassifier._get_check_key(area)
+                check = check_key_map.get(key)
+                if check is None:
+                    check = ScreenCheck(len(self.check_list), area)
+                    check_key_map[key] = check
+                    self.check_list.append(check)
+                if check not in screen_check_list:
+                    screen_check_list.append(check)
+                    check.screen_cnt += 1
+
+            if len(screen_check_list) == 0:  # 没有标识区域的画面 永远不会被识别
+                continue
+            if screen_info.screen_name in self._screen_check_map:
+                continue
+            self.screen_name_list.append(screen_info.screen_name)
+            self._screen_check_map[screen_info.screen_name] = screen_check_list
+
+        for screen_check_list in self._screen_check_map.values():
+            screen_check_list.sort(key=lambda i: (i.is_ocr, -i.screen_cnt, i.idx))
+
+    @staticmethod
+    def _get_check_key(area: ScreenArea) -> tuple:
+        """
+        判断的唯一标识 配置完全一样的区域 判断结果也一样
+        """
+        rect = area.rect
+        return (
+            rect.x1, rect.y1, rect.x2, rect.y2,
+            area.text,
+            area.lcs_percent,
+            str(area.color_range),
+            area.template_sub_dir,
+            area.template_id,
+            area.template_match_threshold,
+        )
+
+    def get_search_order(self, current_screen_name: Optional[str], last_screen_name: Optional[str]) -> list[str]:
+        """
+        从上一次记录的画面开始 按跳转关系广度优先的顺序 最后是其它没有出现的画面
+        :param current_screen_name: 当前记录的画面
+        :param last_screen_name: 上一个记录的画面
+        :return: 画面名称列表
+        """
+        cache_key = (current_screen_name, last_screen_name)
+        order = self._search_order_cache.get(cache_key)
+        if order is not None:
+            return order
+
+        bfs_list: list[str] = []
+        for screen_name in [current_screen_name, last_screen_name]:
+            if screen_name is not None and screen_name not in bfs_list:
+                bfs_list.append(screen_name)
+
+        bfs_idx = 0
+        while bfs_idx < len(bfs_list):
+            for goto_screen in self._goto_map.get(bfs_list[bfs_idx], []):
+                if goto_screen not in bfs_list:
+                    bfs_list.append(goto_screen)
+            bfs_idx += 1
+
+        visited = set(bfs_list)
+        order = [i for i in bfs_list if i in self._screen_check_map]
+        for screen_name in self.screen_name_list:
+            if screen_name not in visited:
+                order.append(screen_name)
+
+        self._search_order_cache[cache_key] = order
+        return order
+
+    def classify(
+        self,
+        candidate_list: list[str],
+        check_area: Callable[[ScreenArea], bool],
+    ) -> Optional[str]:
+        """
+        按顺序找到第一个所有标识区域都满足的画面
+        同一张截图中 每个判断最多执行一次
+
+        :param candidate_list: 候选画面 按优先级排序
+        :param check_area: 判断截图中能否找到区域
+        :return: 画面名称
+        """
+        result_map: dict[int, bool] = {}
+        for screen_name in candidate_list:
+            screen_check_list = self._screen_check_map.get(screen_name)
+            if screen_check_list is None:
+                continue
+
+            # 已经有判断不满足的话 不需要再判断其它区域
+            if any(result_map.get(check.idx) is False for check in screen_check_list):
+                continue
+
+            fit: bool = True
+            for check in screen_check_list:
+                result = result_map.get(check.idx)
+                if result is None:
+                    result = check_area(check.area)
+                    result_map[check.idx] = result
+                if not result:
+                    fit = False
+                    break
+
+            if fit:
+                return screen_name
+
+        return None
@@ -6,7 +6,8 @@ from typing import TYPE_CHECKING
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.point import Point
-from one_dragon.base.matcher.match_result import MatchResult
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_info import ScreenInfo
 from one_dragon.utils import cv2_utils, str_utils
@@ -101,8 +102,24 @@ def find_area_in_screen_binary(
     if area is None:
         return FindAreaResultEnum.AREA_NO_CONFIG
 
+    return ctx.frame_vision_cache.get(screen).get_or_compute(
+        ('find_area_binary', _get_area_change_key(area), binary_threshold, crop_first),
+        lambda: _find_area_in_screen_binary(ctx, screen, area, binary_threshold, crop_first),
+    )
+
+
+def _find_area_in_screen_binary(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    area: ScreenArea,
+    binary_threshold: int,
+    crop_first: bool,
+) -> FindAreaResultEnum:
     # 对屏幕进行二值化处理
-    binary_screen = cv2_utils.to_binary(screen, threshold=binary_threshold)
+    binary_screen = ctx.frame_vision_cache.get(screen).get_or_compute(
+        ('binary', binary_threshold),
+        lambda: cv2_utils.to_binary(screen, threshold=binary_threshold),
+    )
 
     find: bool = False
     if area.is_text_area:
@@ -140,6 +157,7 @@ def find_area_in_screen(
     screen: MatLike,
     area: ScreenArea,
     crop_first: bool = True,
+    skip_unchanged: bool = True,
 ) -> FindAreaResultEnum:
     """
     游戏截图中 是否能找到对应的区域
@@ -149,6 +167,7 @@ def find_area_in_screen(
         screen: 游戏截图
         area: 区域
         crop_first: 在传入区域时 是否先裁剪再进行文本识别
+        skip_unchanged: 区域画面和上一次识别时一样的话 直接复用上一次的结论
 
     Returns:
         bool: 是否可以匹配到指定区域
@@ -156,6 +175,32 @@ def find_area_in_screen(
     if area is None:
         return FindAreaResultEnum.AREA_NO_CONFIG
 
+    # 同一张截图中 相同区域只判断一次
+    return ctx.frame_vision_cache.get(screen).get_or_compute(
+        ('find_area', _get_area_change_key(area), crop_first),
+        lambda: _find_area_in_screen(ctx, screen, area, crop_first, skip_unchanged),
+    )
+
+
+def _find_area_in_screen(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    area: ScreenArea,
+    crop_first: bool,
+    skip_unchanged: bool,
+) -> FindAreaResultEnum:
+    # 结论只取决于区域内画面时 才可以复用 不裁剪的文本识别会受到区域外画面的影响
+    detector = ctx.screen_area_change_detector
+    detect_change: bool = skip_unchanged and (area.is_template_area or (area.is_text_area and crop_first))
+    change_key = None
+    signature = None
+    if detect_change:
+        change_key = _get_area_change_key(area)
+        signature = detector.get_signature(screen, area.rect)
+        verdict = detector.get_verdict(change_key, signature)
+        if verdict is not None:
+            return verdict
+
     find: bool = False
     if area.is_text_area:
         ocr_result_list = ctx.ocr_service.get_ocr_result_list(
@@ -170,13 +215,80 @@ def find_area_in_screen(
                 find = True
                 break
     elif area.is_template_area:
-        rect = area.rect
-
-        mrl = ctx.tm.crop_and_match_template(screen, rect, area.template_sub_dir, area.template_id,
-                                             threshold=area.template_match_threshold)
+        mrl = crop_and_match_template_in_area(ctx, screen, area)
         find = mrl.max is not None
 
-    return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
+    result = FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
+    if detect_change:
+        detector.put_verdict(change_key, signature, result)
+    return result
+
+
+def _get_area_change_key(area: ScreenArea) -> tuple:
+    """
+    区域变化检测使用的key 区域配置变化后不复用之前的结论
+    """
+    return (
+        id(area),
+        area.rect,
+        gt(area.text, 'game') if area.is_text_area else None,
+        area.lcs_percent,
+        str(area.color_range),
+        area.template_sub_dir,
+        area.template_id,
+        area.template_match_threshold,
+    )
+
+
+def crop_and_match_template_in_area(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    area: ScreenArea,
+    only_best: bool = False,
+) -> MatchResultList:
+    """
+    在区域内进行模板匹配 同一张截图中 相同的匹配只计算一次
+
+    Args:
+        ctx: 上下文
+        screen: 游戏截图
+        area: 模板区域
+        only_best: 是否只返回最好的结果
+
+    Returns:
+        MatchResultList: 匹配结果 坐标相对于区域 多个调用方共用 不应该修改
+    """
+    rect = area.rect
+    key = ('match_template', rect.x1, rect.y1, rect.x2, rect.y2,
+           area.template_sub_dir, area.template_id, area.template_match_threshold, only_best)
+    return ctx.frame_vision_cache.get(screen).get_or_compute(
+        key,
+        lambda: ctx.tm.crop_and_match_template(screen, rect, area.template_sub_dir, area.template_id,
+                                               threshold=area.template_match_threshold,
+                                               only_best=only_best),
+    )
+
+
+def ocr_in_rect(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    rect: Rect,
+) -> dict[str, MatchResultList]:
+    """
+    裁剪区域后进行OCR 同一张截图中 相同区域只识别一次
+
+    Args:
+        ctx: 上下文
+        screen: 游戏截图
+        rect: 区域
+
+    Returns:
+        dict[str, MatchResultList]: 识别结果 坐标相对于区域 多个调用方共用 不应该修改
+    """
+    return ctx.frame_vision_cache.get(screen).get_or_compute(
+        ('ocr', rect.x1, rect.y1, rect.x2, rect.y2),
+        lambda: ctx.ocr.run_ocr(cv2_utils.crop_image_only(screen, rect)),
+    )
 
 
 def find_template_coord_in_area(
@@ -202,14 +314,7 @@ def find_template_coord_in_area(
         return None
 
     # 在裁剪区域内进行模板匹配
-    mrl = ctx.tm.crop_and_match_template(
-        screen,
-        area.rect,
-        area.template_sub_dir,
-        area.template_id,
-        threshold=area.template_match_threshold,
-        only_best=True,
-    )
+    mrl = crop_and_match_template_in_area(ctx, screen, area, only_best=True)
 
     if mrl.max is None:
         return None
@@ -270,8 +375,7 @@ def find_and_click_area(
     elif area.is_template_area:
         rect = area.rect
 
-        mrl = ctx.tm.crop_and_match_template(screen, rect, area.template_sub_dir, area.template_id,
-                                             threshold=area.template_match_threshold)
+        mrl = crop_and_match_template_in_area(ctx, screen, area)
         if mrl.max is None:
             return OcrClickResultEnum.OCR_CLICK_NOT_FOUND
 
@@ -350,20 +454,18 @@ def get_match_screen_name(
     Returns:
         str | None: 画面名称
     """
+    classifier = ctx.screen_loader.screen_classifier
     if screen_name_list is not None:
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if screen_info.screen_name not in screen_name_list:
-                continue
-            if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
-                return screen_info.screen_name
+        candidate_list = [i for i in classifier.screen_name_list if i in screen_name_list]
     elif ctx.screen_loader.current_screen_name is not None or ctx.screen_loader.last_screen_name is not None:
         return get_match_screen_name_from_last(ctx, screen, crop_first=crop_first)
     else:
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
-                return screen_info.screen_name
+        candidate_list = classifier.screen_name_list
 
-    return None
+    return classifier.classify(
+        candidate_list,
+        lambda area: find_area_in_screen(ctx, screen, area, crop_first) == FindAreaResultEnum.TRUE,
+    )
 
 
 def get_match_screen_name_from_last(
@@ -381,42 +483,17 @@ def get_match_screen_name_from_last(
     Returns:
         str | None: 画面名称
     """
-    bfs_list = []
-
-    if ctx.screen_loader.current_screen_name is not None:  # 如果有记录上次所在画面 则从这个画面开始搜索
-        bfs_list.append(ctx.screen_loader.current_screen_name)
-    if ctx.screen_loader.last_screen_name is not None:
-        bfs_list.append(ctx.screen_loader.last_screen_name)
-
-    if len(bfs_list) == 0:
+    current_screen_name = ctx.screen_loader.current_screen_name
+    last_screen_name = ctx.screen_loader.last_screen_name
+    if current_screen_name is None and last_screen_name is None:
         return None
 
-    bfs_idx = 0
-    while bfs_idx < len(bfs_list):
-        current_screen_name = bfs_list[bfs_idx]
-        bfs_idx += 1
-
-        if is_target_screen(ctx, screen, screen_name=current_screen_name, crop_first=crop_first):
-            return current_screen_name
-
-        screen_info = ctx.screen_loader.get_screen(current_screen_name)
-        if screen_info is None:
-            continue
-        for area in screen_info.area_list:
-            if area.goto_list is None or len(area.goto_list) == 0:
-                continue
-            for goto_screen in area.goto_list:
-                if goto_screen not in bfs_list:
-                    bfs_list.append(goto_screen)
-
-    # 最后 尝试搜索中没有出现的画面
-    for screen_info in ctx.screen_loader.screen_info_list:
-        if screen_info.screen_name in bfs_list:
-            continue
-        if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
-            return screen_info.screen_name
+    classifier = ctx.screen_loader.screen_classifier
+    return classifier.classify(
+        classifier.get_search_order(current_screen_name, last_screen_name),
+        lambda area: find_area_in_screen(ctx, screen, area, crop_first) == FindAreaResultEnum.TRUE,
+    )
 
-    return None
 
 def is_target_screen(
     ctx: OneDragonContext,
@@ -11,6 +11,7 @@ from one_dragon.base.config.config_item import ConfigItem
 from one_dragon.base.config.yaml_operator import YamlOperator
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.screen.template_pack import TemplatePack
 from one_dragon.utils import os_utils, cal_utils, cv2_utils
 
 TEMPLATE_RAW_FILE_NAME = 'raw.png'
@@ -30,7 +31,13 @@ class TemplateShapeEnum(Enum):
 
 class TemplateInfo(YamlOperator):
 
-    def __init__(self, sub_dir: str, template_id: str):
+    def __init__(self, sub_dir: str, template_id: str, pack: Optional[TemplatePack] = None):
+        """
+        模板信息
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :param pack: 模板打包文件 传入时从打包文件读取 不读取散落的模板文件
+        """
         # 旧的模板ID 在开发工具中使用 方便更改后迁移文件
         self.old_sub_dir: str = sub_dir
         self.old_template_id: str = template_id
@@ -40,7 +47,13 @@ class TemplateInfo(YamlOperator):
 
         self.screen_image: Optional[MatLike] = None
 
-        YamlOperator.__init__(self, file_path=self.get_yml_file_path())
+        if pack is None:
+            YamlOperator.__init__(self, file_path=self.get_yml_file_path())
+        else:
+            YamlOperator.__init__(self)
+            self.file_path = self.get_yml_file_path()
+            self._write_file_path = self.file_path
+            self.data = pack.get_config(sub_dir, template_id)
 
         self.template_name: str = self.get('template_name', '')
         self.template_shape: str = self.get('template_shape', TemplateShapeEnum.RECTANGLE.value.value)
@@ -52,13 +65,19 @@ class TemplateInfo(YamlOperator):
         self.auto_mask: bool = self.get('auto_mask', True)
         self.point_updated: bool = False  # 点位是否更改过 开发工具中用
 
-        self.raw: MatLike = cv2_utils.read_image(get_template_raw_path(self.sub_dir, self.template_id))  # 原图
-        self.mask: MatLike = cv2_utils.read_image(get_template_mask_path(self.sub_dir, self.template_id))  # 掩码
-
         # 运算后保存在内存的
         self._gray: MatLike = None  # 灰度图
         self._kps: List[cv2.KeyPoint] = None  # 关键点
         self._desc: MatLike = None  # 描述
+        self._pack: Optional[TemplatePack] = pack
+
+        if pack is None:
+            self.raw: MatLike = cv2_utils.read_image(get_template_raw_path(self.sub_dir, self.template_id))  # 原图
+            self.mask: MatLike = cv2_utils.read_image(get_template_mask_path(self.sub_dir, self.template_id))  # 掩码
+        else:  # 打包文件中的是只读视图
+            self.raw: MatLike = pack.get_array(sub_dir, template_id, 'raw')
+            self.mask: MatLike = pack.get_array(sub_dir, template_id, 'mask')
+            self._gray = pack.get_array(sub_dir, template_id, 'gray')
 
     def get_yml_file_path(self) -> str:
         return get_template_config_path(self.sub_dir, self.template_id)
@@ -130,6 +149,12 @@ class TemplateInfo(YamlOperator):
     def features(self) -> Tuple[List[cv2.KeyPoint], MatLike]:
         if self._kps is not None:
             return self._kps, self._desc
+        if self._pack is not None:
+            kps = self._pack.get_keypoints(self.sub_dir, self.template_id)
+            if kps is not None:
+                self._kps = kps
+                self._desc = self._pack.get_array(self.sub_dir, self.template_id, 'desc')
+                return self._kps, self._desc
         if self.raw is not None:
             self._kps, self._desc = cv2_utils.feature_detect_and_compute(self.raw, self.mask)
         return self._kps, self._desc
@@ -2,7 +2,9 @@ import os
 from cv2.typing import MatLike
 from typing import List, Optional
 
-from one_dragon.base.screen.template_info import TemplateInfo, is_template_existed
+from one_dragon.base.screen import template_pack
+from one_dragon.base.screen.template_info import TemplateInfo, is_template_existed, get_template_sub_dir_path
+from one_dragon.base.screen.template_pack import TemplatePack
 from one_dragon.utils import os_utils
 
 
@@ -11,6 +13,49 @@ class TemplateLoader:
     def __init__(self):
         self.template: dict[str, TemplateInfo] = {}
 
+        self._pack: Optional[TemplatePack] = None  # 模板打包文件 存在时优先从这里读取
+        self._pack_loaded: bool = False
+
+    @property
+    def pack(self) -> Optional[TemplatePack]:
+        """
+        模板打包文件 第一次使用时才加载
+        :return:
+        """
+        if not self._pack_loaded:
+            self._pack = template_pack.load_template_pack()
+            self._pack_loaded = True
+        return self._pack
+
+    def reload_pack(self) -> None:
+        """
+        重新加载模板打包文件 并清空已加载的模板
+        :return:
+        """
+        self._pack = None
+        self._pack_loaded = False
+        self.template.clear()
+
+    def invalidate_template(self, sub_dir: str, template_id: str) -> None:
+        """
+        移除已加载的模板 开发工具保存模板后调用 下次获取时重新加载
+        :param sub_dir: 子文件夹
+        :param template_id: 模板id
+        :return:
+        """
+        self.template.pop('%s:%s' % (sub_dir, template_id), None)
+
+    def build_pack(self, file_path: Optional[str] = None) -> str:
+        """
+        把硬盘上的所有模板打包成一个文件 修改模板后需要重新打包
+        :param file_path: 打包文件路径 默认放在 assets/template 下
+        :return: 打包文件路径
+        """
+        info_list = self.get_all_template_info_from_disk(need_raw=False)
+        file_path = template_pack.build_template_pack(info_list, file_path=file_path)
+        self.reload_pack()
+        return file_path
+
     def get_all_template_info_from_disk(self, need_raw: bool = True, need_config: bool = False) -> List[TemplateInfo]:
         """
         从硬盘加载模板信息
@@ -50,9 +95,13 @@ class TemplateLoader:
         :param only_mask:
         :return: 模板图片
         """
-        if not is_template_existed(sub_dir, template_id, need_raw=not only_mask):
+        pack = self.pack
+        if pack is not None and pack.has_template(sub_dir, template_id, need_raw=not only_mask):
+            template: TemplateInfo = TemplateInfo(sub_dir, template_id, pack=pack)
+        elif is_template_existed(sub_dir, template_id, need_raw=not only_mask):
+            template: TemplateInfo = TemplateInfo(sub_dir, template_id)
+        else:
             return None
-        template: TemplateInfo = TemplateInfo(sub_dir, template_id)
 
         key = '%s:%s' % (sub_dir, template_id)
         self.template[key] = template
@@ -83,3 +132,21 @@ class TemplateLoader:
             return self.template[key].mask
         else:
             return self.load_template(sub_dir, template_id, only_mask=True).mask
+
+    def list_template_id(self, sub_dir: str) -> List[str]:
+        """
+        某个分类下的所有模板id 有打包文件时不需要访问硬盘
+        :param sub_dir: 子文件夹
+        :return:
+        """
+        pack = self.pack
+        if pack is not None:
+            template_id_list = pack.list_template_id(sub_dir)
+            if template_id_list is not None:
+                return sorted(template_id_list)
+
+        sub_dir_path = get_template_sub_dir_path(sub_dir)
+        if not os.path.isdir(sub_dir_path):
+            return []
+        return sorted(i for i in os.listdir(sub_dir_path)
+                      if is_template_existed(sub_dir, i))
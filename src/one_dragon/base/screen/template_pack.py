@@ -0,0 +1,269 @@
+import json
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from one_dragon.utils import cv2_utils, os_utils
+from one_dragon.utils.log_utils import log
+
+TEMPLATE_PACK_FILE_NAME = '_od_template_pack.bin'
+TEMPLATE_PACK_MAGIC = b'ODTPACK1'
+TEMPLATE_PACK_ALIGN = 64  # 每个数组的起始位置对齐 方便直接作为numpy数组使用
+
+_HEADER = struct.Struct('<8sQ')  # 魔数 + 索引长度
+_TEMPLATE_FILE_NAME_LIST: List[str] = ['raw.png', 'mask.png', 'config.yml']  # 打包时记录修改时间和大小的模板文件 同 template_info
+
+
+def get_template_pack_path() -> str:
+    """
+    模板打包文件的路径 和模板放在一起
+    :return:
+    """
+    return os.path.join(os_utils.get_path_under_work_dir('assets', 'template'), TEMPLATE_PACK_FILE_NAME)
+
+
+def _get_key(sub_dir: str, template_id: str) -> str:
+    return '%s:%s' % (sub_dir, template_id)
+
+
+def _align(size: int) -> int:
+    return (size + TEMPLATE_PACK_ALIGN - 1) // TEMPLATE_PACK_ALIGN * TEMPLATE_PACK_ALIGN
+
+
+def _get_file_stat(sub_dir: str, template_id: str) -> Dict[str, List[int]]:
+    """
+    模板文件的修改时间和大小 用于判断打包后模板是否被修改过
+    :param sub_dir: 模板分类
+    :param template_id: 模板id
+    :return: key=文件名 value=[修改时间ns, 大小]
+    """
+    template_dir = os.path.join(os_utils.get_path_under_work_dir('assets', 'template'), sub_dir, template_id)
+    file_stat: Dict[str, List[int]] = {}
+    for file_name in _TEMPLATE_FILE_NAME_LIST:
+        try:
+            stat = os.stat(os.path.join(template_dir, file_name))
+        except OSError:
+            continue
+        file_stat[file_name] = [stat.st_mtime_ns, stat.st_size]
+    return file_stat
+
+
+def _get_sub_dir_mtime(sub_dir: str) -> int:
+    """
+    模板分类文件夹的修改时间 新增或删除模板时会变化
+    :param sub_dir: 模板分类
+    :return: 修改时间ns 文件夹不存在时返回0
+    """
+    try:
+        return os.stat(os.path.join(os_utils.get_path_under_work_dir('assets', 'template'), sub_dir)).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class TemplatePack:
+
+    def __init__(self, file_path: str):
+        """
+        模板打包文件 使用内存映射读取
+        图片在打包时已经解码 读取时直接返回映射内存上的只读数组 不需要复制和解码
+        多个进程读取同一个文件时 可以共享系统的页缓存
+
+        :param file_path: 打包文件路径
+        """
+        self.file_path: str = file_path
+
+        with open(file_path, 'rb') as file:
+            magic, index_len = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != TEMPLATE_PACK_MAGIC:
+                raise ValueError('模板打包文件格式错误 %s' % file_path)
+            index = json.loads(file.read(index_len).decode('utf-8'))
+
+        self._data_offset: int = _align(_HEADER.size + index_len)
+        self._template_map: Dict[str, dict] = index.get('templates', {})
+        self._sub_dir_mtime: Dict[str, int] = index.get('sub_dir_mtime', {})  # 打包时模板分类文件夹的修改时间
+        self._mm: np.memmap = np.memmap(file_path, dtype=np.uint8, mode='r')
+
+        self._kps_lock = threading.Lock()
+        self._kps_map: Dict[str, Tuple[cv2.KeyPoint, ...]] = {}  # 关键点需要转换成对象 第一次使用时才转换
+
+    def has_template(self, sub_dir: str, template_id: str, need_raw: bool = True) -> bool:
+        """
+        打包文件中是否有这个模板 且打包后模板文件没有被修改过
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :param need_raw: 需要原图
+        :return:
+        """
+        item = self._template_map.get(_get_key(sub_dir, template_id))
+        if item is None:
+            return False
+        if need_raw and 'raw' not in item['arrays']:
+            return False
+        if item.get('file_stat') != _get_file_stat(sub_dir, template_id):
+            log.warning('模板在打包后被修改过 使用模板文件 请重新打包 %s %s', sub_dir, template_id)
+            return False
+        return True
+
+    def list_template_id(self, sub_dir: str) -> Optional[List[str]]:
+        """
+        某个分类下的所有模板id
+        :param sub_dir: 模板分类
+        :return: 打包后分类下新增或删除过模板时 返回None
+        """
+        if self._sub_dir_mtime.get(sub_dir) != _get_sub_dir_mtime(sub_dir):
+            return None
+        return [item['template_id'] for item in self._template_map.values() if item['sub_dir'] == sub_dir]
+
+    def get_config(self, sub_dir: str, template_id: str) -> dict:
+        """
+        模板的配置
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :return: 配置的副本 调用方可以修改
+        """
+        item = self._template_map.get(_get_key(sub_dir, template_id))
+        if item is None:
+            return {}
+        return json.loads(json.dumps(item['config']))
+
+    def get_array(self, sub_dir: str, template_id: str, name: str) -> Optional[np.ndarray]:
+        """
+        获取模板的某个数组 是映射内存上的只读视图
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :param name: raw / mask / gray / kps / desc
+        :return:
+        """
+        item = self._template_map.get(_get_key(sub_dir, template_id))
+        if item is None:
+            return None
+        array_info = item['arrays'].get(name)
+        if array_info is None:
+            return None
+        return np.ndarray(shape=tuple(array_info['shape']),
+                          dtype=np.dtype(array_info['dtype']),
+                          buffer=self._mm,
+                          offset=self._data_offset + array_info['offset'])
+
+    def get_keypoints(self, sub_dir: str, template_id: str) -> Optional[Tuple[cv2.KeyPoint, ...]]:
+        """
+        获取模板的特征点
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :return:
+        """
+        key = _get_key(sub_dir, template_id)
+        with self._kps_lock:
+            kps = self._kps_map.get(key)
+        if kps is not None:
+            return kps
+
+        kps_arr = self.get_array(sub_dir, template_id, 'kps')
+        if kps_arr is None:
+            return None
+        kps = tuple(cv2_utils.feature_keypoints_from_np(kps_arr))
+        with self._kps_lock:
+            self._kps_map[key] = kps
+        return kps
+
+
+def build_template_pack(template_list: List[Any], file_path: Optional[str] = None) -> str:
+    """
+    把模板打包成一个文件 包括配置、原图、掩码、灰度图和特征点
+    同时记录模板文件的修改时间和大小 打包后修改过的模板 运行时会改为读取模板文件
+    :param template_list: 模板列表 TemplateInfo
+    :param file_path: 打包文件路径 默认放在 assets/template 下
+    :return: 打包文件路径
+    """
+    if file_path is None:
+        file_path = get_template_pack_path()
+
+    template_map: Dict[str, dict] = {}
+    sub_dir_mtime: Dict[str, int] = {}
+    array_list: List[np.ndarray] = []
+    offset: int = 0
+
+    def add_array(arrays: dict, name: str, arr: Optional[np.ndarray]) -> None:
+        nonlocal offset
+        if arr is None:
+            return
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = {'offset': offset, 'shape': list(arr.shape), 'dtype': arr.dtype.str}
+        array_list.append(arr)
+        offset = _align(offset + arr.nbytes)
+
+    for template in template_list:
+        arrays: dict = {}
+        add_array(arrays, 'raw', template.raw)
+        add_array(arrays, 'mask', template.mask)
+        if template.raw is not None:
+            add_array(arrays, 'gray', template.gray)
+            try:
+                kps, desc = template.features
+            except Exception:  # 部分模板的掩码不是单通道 不会用于特征匹配
+                log.debug('模板无法计算特征 %s %s', template.sub_dir, template.template_id)
+            else:
+                add_array(arrays, 'kps', cv2_utils.feature_keypoints_to_np(kps).reshape((-1, 7)))
+                add_array(arrays, 'desc', desc)
+
+        template_map[_get_key(template.sub_dir, template.template_id)] = {
+            'sub_dir': template.sub_dir,
+            'template_id': template.template_id,
+            'config': template.data,
+            'arrays': arrays,
+            'file_stat': _get_file_stat(template.sub_dir, template.template_id),
+        }
+        if template.sub_dir not in sub_dir_mtime:
+            sub_dir_mtime[template.sub_dir] = _get_sub_dir_mtime(template.sub_dir)
+
+    index = json.dumps({'templates': template_map, 'sub_dir_mtime': sub_dir_mtime},
+                       ensure_ascii=False).encode('utf-8')
+    data_offset = _align(_HEADER.size + len(index))
+
+    temp_file_path = file_path + '.tmp'
+    with open(temp_file_path, 'wb') as file:
+        file.write(_HEADER.pack(TEMPLATE_PACK_MAGIC, len(index)))
+        file.write(index)
+        file.write(b'\0' * (data_offset - _HEADER.size - len(index)))
+        written = 0
+        for arr in array_list:
+            file.write(arr.tobytes())
+            written += arr.nbytes
+            padding = _align(written) - written
+            file.write(b'\0' * padding)
+            written += padding
+    os.replace(temp_file_path, file_path)
+
+    log.info('模板打包完成 数量 %d 大小 %.2fMB %s', len(template_map), (data_offset + offset) / 1024 / 1024, file_path)
+    return file_path
+
+
+def load_template_pack(file_path: Optional[str] = None) -> Optional[TemplatePack]:
+    """
+    加载模板打包文件 文件不存在或者格式错误时返回None 使用散落的模板文件
+    :param file_path: 打包文件路径 默认放在 assets/template 下
+    :return:
+    """
+    if file_path is None:
+        file_path = get_template_pack_path()
+    if not os.path.exists(file_path):
+        return None
+    try:
+        return TemplatePack(file_path)
+    except Exception:
+        log.error('模板打包文件读取失败 将使用模板文件 %s', file_path, exc_info=True)
+        return None
+
+
+def __debug():
+    from one_dragon.base.screen.template_loader import TemplateLoader
+    loader = TemplateLoader()
+    loader.build_pack()
+
+
+if __name__ == '__main__':
+    __debug()
@@ -12,6 +12,13 @@ from one_dragon.base.matcher.match_result import MatchResultList, MatchResult
 
 feature_detector = cv2.SIFT_create()
 
+_MATCH_PEAK_DISTANCE: int = 10  # 多个结果时 这个距离内只保留置信度最高的 同 MatchResultList.append 的合并距离
+_MATCH_PEAK_MAX_CNT: int = 1000  # 多个结果时 最多处理多少个峰值 防止噪点多的画面产生大量结果
+# 找局部最大值使用的圆形核 范围和合并距离一致 方形核会在对角线上多去掉 10~14 像素外的峰值
+_MATCH_PEAK_KERNEL: np.ndarray = (np.add.outer(np.arange(-_MATCH_PEAK_DISTANCE, _MATCH_PEAK_DISTANCE + 1) ** 2,
+                                               np.arange(-_MATCH_PEAK_DISTANCE, _MATCH_PEAK_DISTANCE + 1) ** 2)
+                                  <= _MATCH_PEAK_DISTANCE ** 2).astype(np.uint8)
+
 
 def read_image(file_path: str) -> Optional[MatLike]:
     """
@@ -196,19 +203,65 @@ def match_template(source: MatLike, template: MatLike, threshold,
     result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED, mask=mask)
 
     match_result_list = MatchResultList(only_best=only_best)
-    filtered_locations = np.where(np.logical_and(
-        result >= threshold,
-        np.isfinite(result) if ignore_inf else np.ones_like(result))
-    )  # 过滤低置信度的匹配结果
+    if not cv2.checkRange(result)[0]:
+        # 使用掩码时可能出现 nan 和 inf 改成负无穷 不会被选中
+        result = result.copy()
+        result[np.isnan(result) if not ignore_inf else ~np.isfinite(result)] = -np.inf
+
+    if only_best:
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= threshold:
+            match_result_list.append(MatchResult(max_val, max_loc[0], max_loc[1], tx, ty))
+        return match_result_list
 
-    # 遍历所有匹配结果，并输出位置和置信度
-    for pt in zip(*filtered_locations[::-1]):
-        confidence = result[pt[1], pt[0]]  # 获取置信度
-        match_result_list.append(MatchResult(confidence, pt[0], pt[1], tx, ty))
+    for x, y, confidence in _find_match_peaks(result, threshold):
+        match_result_list.append(MatchResult(confidence, x, y, tx, ty), auto_merge=False)
 
     return match_result_list
 
 
+def _find_match_peaks(result: np.ndarray, threshold: float) -> List[Tuple[int, int, float]]:
+    """
+    找出匹配结果中 超过阈值的峰值
+    - 先用膨胀找出局部最大值 再按置信度从高到低 去掉距离太近的
+    - 只对剩下的峰值进行逐个处理
+    :param result: matchTemplate 的结果
+    :param threshold: 阈值
+    :return: 峰值的 (x, y, 置信度) 按原图中的先后顺序
+    """
+    dilated = cv2.dilate(result, _MATCH_PEAK_KERNEL)
+    ys, xs = np.nonzero((result >= threshold) & (result >= dilated))
+    if len(ys) == 0:
+        return []
+
+    confidences = result[ys, xs]
+    if len(confidences) > _MATCH_PEAK_MAX_CNT:
+        top_idx = np.argpartition(-confidences, _MATCH_PEAK_MAX_CNT - 1)[:_MATCH_PEAK_MAX_CNT]
+    else:
+        top_idx = np.arange(len(confidences))
+    # 置信度相同时 原图中靠前的优先
+    order = top_idx[np.lexsort((top_idx, -confidences[top_idx]))]
+
+    kept_idx: List[int] = []
+    kept_x = np.empty(len(order), dtype=np.int64)
+    kept_y = np.empty(len(order), dtype=np.int64)
+    max_dis2 = _MATCH_PEAK_DISTANCE ** 2
+    for idx in order:
+        x, y = xs[idx], ys[idx]
+        kept_cnt = len(kept_idx)
+        if kept_cnt > 0:
+            dx = kept_x[:kept_cnt] - x
+            dy = kept_y[:kept_cnt] - y
+            if np.any(dx * dx + dy * dy <= max_dis2):
+                continue
+        kept_x[kept_cnt] = x
+        kept_y[kept_cnt] = y
+        kept_idx.append(int(idx))
+
+    kept_idx.sort()
+    return [(int(xs[i]), int(ys[i]), float(confidences[i])) for i in kept_idx]
+
+
 def concat_vertically(img: MatLike, next_img: MatLike, decision_height: int = 150):
     """
     垂直拼接图片。
@@ -363,9 +416,28 @@ def feature_match(source_kp, source_desc, template_kp, template_desc,
     # feature_matcher = cv2.FlannBasedMatcher()
     feature_matcher = cv2.BFMatcher()
     matches = feature_matcher.knnMatch(template_desc, source_desc, k=2)
+    return feature_match_by_knn(source_kp, template_kp, matches, source_mask=source_mask)
+
+
+def feature_match_by_knn(source_kp, template_kp, matches,
+                         source_mask: Optional[MatLike] = None,
+                         query_idx_offset: int = 0):
+    """
+    使用已经计算好的 knnMatch(template_desc, source_desc, k=2) 结果 计算模板在原图上的位置
+    多个模板可以合并成一次 knnMatch 后分别调用
+    :param source_kp: 原图关键点
+    :param template_kp: 模板关键点
+    :param matches: 模板描述子作为 query 的 knnMatch 结果
+    :param source_mask: 原图掩码
+    :param query_idx_offset: 合并匹配时 模板在 query 中的起始行 返回的 good_matches 不会减去这个偏移量
+    :return: 同 feature_match
+    """
     # 应用比值测试，筛选匹配点
     good_matches = []
-    for m, n in matches:
+    for t in matches:
+        if len(t) < 2:  # 原图关键点不足2个
+            continue
+        m, n = t
         if m.distance < 0.75 * n.distance:
             good_matches.append(m)
 
@@ -373,7 +445,7 @@ def feature_match(source_kp, source_desc, template_kp, template_desc,
         return good_matches, None, None, None
 
     # 提取匹配点的坐标
-    template_points = np.float32([template_kp[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)  # 模板的
+    template_points = np.float32([template_kp[m.queryIdx - query_idx_offset].pt for m in good_matches]).reshape(-1, 1, 2)  # 模板的
     source_points = np.float32([source_kp[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)  # 原图的
 
     # 使用RANSAC算法估计模板位置和尺度
@@ -390,11 +462,11 @@ def feature_match(source_kp, source_desc, template_kp, template_desc,
             best_match = good_matches[i]
 
     query_point = source_kp[best_match.trainIdx].pt  # 原图中的关键点坐标 (x, y)
-    train_point = template_kp[best_match.queryIdx].pt  # 模板中的关键点坐标 (x, y)
+    train_point = template_kp[best_match.queryIdx - query_idx_offset].pt  # 模板中的关键点坐标 (x, y)
 
     # 获取最佳匹配的特征点的缩放比例
     query_scale = source_kp[best_match.trainIdx].size
-    train_scale = template_kp[best_match.queryIdx].size
+    train_scale = template_kp[best_match.queryIdx - query_idx_offset].size
     template_scale = query_scale / train_scale
 
     # 模板图缩放后在原图上的偏移量
@@ -0,0 +1,190 @@
+import difflib
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from one_dragon.utils import i18_utils, str_utils
+
+T = TypeVar('T')
+
+
+class FuzzyIndex(Generic[T]):
+
+    def __init__(self, item_list: List[T], key_func: Callable[[T], str], ignore_case: bool = True):
+        """
+        OCR结果到固定目录(祝福、奇物、区域、特殊点、角色等)的模糊匹配索引
+        - 目录的翻译文本只在建立索引时计算一次 切换语言后自动重建
+        - 按字符建立倒排索引 没有任何相同字符的候选不参与计算
+        - 预先计算每个候选的字符位图 使用位并行的LCS 不需要每次构建二维数组
+
+        :param item_list: 目录
+        :param key_func: 匹配使用的文本 通常是 gt(...) 翻译后的名称
+        :param ignore_case: 是否忽略大小写
+        """
+        self.item_list: List[T] = list(item_list)
+        self.key_func: Callable[[T], str] = key_func
+        self.ignore_case: bool = ignore_case
+
+        self._lock = threading.Lock()
+        self._lang: Optional[str] = None  # 建立索引时的语言
+        self._key_list: List[str] = []  # 原始文本 用于difflib
+        self._norm_key_list: List[str] = []  # 忽略大小写后的文本 用于LCS
+        self._mask_list: List[dict[str, int]] = []  # 每个候选中 每个字符出现的位置
+        self._char_index: dict[str, List[int]] = {}  # 字符 -> 包含这个字符的候选下标
+
+    def _ensure_index(self) -> None:
+        lang = i18_utils.get_default_lang()
+        if self._lang == lang:
+            return
+        with self._lock:
+            if self._lang == lang:
+                return
+
+            key_list: List[str] = []
+            norm_key_list: List[str] = []
+            mask_list: List[dict[str, int]] = []
+            char_index: dict[str, List[int]] = {}
+            for idx, item in enumerate(self.item_list):
+                key = self.key_func(item) or ''
+                norm_key = key.lower() if self.ignore_case else key
+                key_list.append(key)
+                norm_key_list.append(norm_key)
+                mask_list.append(str_utils.lcs_char_mask(norm_key))
+                for c in set(norm_key):
+                    char_index.setdefault(c, []).append(idx)
+
+            self._key_list = key_list
+            self._norm_key_list = norm_key_list
+            self._mask_list = mask_list
+            self._char_index = char_index
+            self._lang = lang
+
+    def _get_candidate_idx_list(self, word: str, item_filter: Optional[Callable[[T], bool]]) -> List[int]:
+        """
+        和 word 至少有一个相同字符的候选 按目录顺序
+        """
+        idx_set: set[int] = set()
+        for c in set(word):
+            idx_list = self._char_index.get(c)
+            if idx_list is not None:
+                idx_set.update(idx_list)
+        if item_filter is None:
+            return sorted(idx_set)
+        return [idx for idx in sorted(idx_set) if item_filter(self.item_list[idx])]
+
+    def get_key(self, idx: int) -> str:
+        """
+        候选的匹配文本
+        """
+        self._ensure_index()
+        return self._key_list[idx]
+
+    def find_best_idx_by_lcs(self, word: Optional[str],
+                             lcs_percent_threshold: Optional[float] = None,
+                             item_filter: Optional[Callable[[T], bool]] = None) -> Optional[int]:
+        """
+        找出LCS占候选长度比例最大的 同 str_utils.find_best_match_by_lcs
+        :param word: OCR结果
+        :param lcs_percent_threshold: 要求的LCS阈值
+        :param item_filter: 只匹配满足条件的候选
+        :return: 候选在目录中的下标
+        """
+        if word is None or len(word) == 0:
+            return None
+        self._ensure_index()
+        norm_word = word.lower() if self.ignore_case else word
+
+        target_idx: Optional[int] = None
+        target_lcs_percent: Optional[float] = None
+        for idx in self._get_candidate_idx_list(norm_word, item_filter):
+            norm_key = self._norm_key_list[idx]
+            lcs = str_utils.lcs_length_by_mask(self._mask_list[idx], len(norm_key), norm_word)
+            if lcs == 0:
+                continue
+            lcs_percent = lcs * 1.0 / len(norm_key)
+            if lcs_percent_threshold is not None and lcs_percent < lcs_percent_threshold:
+                continue
+            if target_idx is None or lcs_percent > target_lcs_percent:
+                target_idx = idx
+                target_lcs_percent = lcs_percent
+
+        return target_idx
+
+    def find_best_by_lcs(self, word: Optional[str],
+                         lcs_percent_threshold: Optional[float] = None,
+                         item_filter: Optional[Callable[[T], bool]] = None) -> Optional[T]:
+        """
+        找出LCS占候选长度比例最大的
+        :return: 候选
+        """
+        idx = self.find_best_idx_by_lcs(word, lcs_percent_threshold, item_filter)
+        return None if idx is None else self.item_list[idx]
+
+    def find_best_idx_by_difflib(self, word: Optional[str], cutoff: float = 0.6,
+                                 item_filter: Optional[Callable[[T], bool]] = None) -> Optional[int]:
+        """
+        找出最相近的候选 同 str_utils.find_best_match_by_difflib
+        没有相同字符的候选相似度为0 cutoff大于0时不需要计算
+        :param word: OCR结果
+        :param cutoff: 相似度阈值
+        :param item_filter: 只匹配满足条件的候选
+        :return: 候选在目录中的下标
+        """
+        if word is None or len(word) == 0:
+            return None
+        self._ensure_index()
+
+        if cutoff > 0:
+            # difflib 区分大小写 使用原始文本的字符进行筛选
+            idx_list = [idx for idx in self._get_candidate_idx_list(word.lower() if self.ignore_case else word, item_filter)
+                        if any(c in self._key_list[idx] for c in word)]
+        elif item_filter is None:
+            idx_list = list(range(len(self.item_list)))
+        else:
+            idx_list = [idx for idx in range(len(self.item_list)) if item_filter(self.item_list[idx])]
+
+        key_list = [self._key_list[idx] for idx in idx_list]
+        results = difflib.get_close_matches(word, key_list, n=1, cutoff=cutoff)
+        if len(results) == 0:
+            return None
+        return idx_list[key_list.index(results[0])]
+
+    def find_best_by_difflib(self, word: Optional[str], cutoff: float = 0.6,
+                             item_filter: Optional[Callable[[T], bool]] = None) -> Optional[T]:
+        """
+        找出最相近的候选
+        :return: 候选
+        """
+        idx = self.find_best_idx_by_difflib(word, cutoff, item_filter)
+        return None if idx is None else self.item_list[idx]
+
+    def filter_by_lcs(self, word: str, percent: float = 0.3,
+                      item_filter: Optional[Callable[[T], bool]] = None) -> List[T]:
+        """
+        找出包含 word 的候选 同 str_utils.find_by_lcs(word, key, percent)
+        :param word: 需要包含的文本
+        :param percent: LCS需要占 word 长度的百分比
+        :param item_filter: 只匹配满足条件的候选
+        :return: 满足条件的候选 按目录顺序
+        """
+        if word is None or len(word) == 0:
+            return []
+        self._ensure_index()
+        norm_word = word.lower() if self.ignore_case else word
+        need_lcs = len(word) * percent
+
+        if need_lcs > 0:
+            idx_list = self._get_candidate_idx_list(norm_word, item_filter)
+        elif item_filter is None:
+            idx_list = list(range(len(self.item_list)))
+        else:
+            idx_list = [idx for idx in range(len(self.item_list)) if item_filter(self.item_list[idx])]
+
+        result: List[T] = []
+        for idx in idx_list:
+            norm_key = self._norm_key_list[idx]
+            if len(norm_key) == 0:
+                continue
+            lcs = str_utils.lcs_length_by_mask(self._mask_list[idx], len(norm_key), norm_word)
+            if lcs >= need_lcs:
+                result.append(self.item_list[idx])
+        return result
@@ -51,21 +51,38 @@ def longest_common_subsequence_length(str1: str, str2: str) -> int:
     :param str2:
     :return: 长度
     """
-    m = len(str1)
-    n = len(str2)
+    if len(str1) == 0 or len(str2) == 0:
+        return 0
+    return lcs_length_by_mask(lcs_char_mask(str1), len(str1), str2)
 
-    # 创建一个二维数组用于存储中间结果
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
 
-    # 动态规划求解
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if str1[i - 1] == str2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+def lcs_char_mask(s: str) -> dict[str, int]:
+    """
+    位并行LCS使用的字符位图 第i位为1表示 s[i] 是这个字符
+    同一个字符串需要多次计算LCS时 可以预先计算
+    :param s: 字符串
+    :return: 字符 -> 位图
+    """
+    mask: dict[str, int] = {}
+    for i, c in enumerate(s):
+        mask[c] = mask.get(c, 0) | (1 << i)
+    return mask
+
 
-    return dp[m][n]
+def lcs_length_by_mask(mask: dict[str, int], length: int, s: str) -> int:
+    """
+    位并行计算最长公共子序列长度 每个字符只需要几次整数运算
+    :param mask: 第一个字符串的字符位图 lcs_char_mask
+    :param length: 第一个字符串的长度
+    :param s: 第二个字符串
+    :return: 长度
+    """
+    full = (1 << length) - 1
+    v = full
+    for c in s:
+        u = v & mask.get(c, 0)
+        v = ((v + u) | (v - u)) & full
+    return length - bin(v).count('1')
 
 
 def get_positive_digits(v: str, err: Optional[int] = None) -> Optional[int]:
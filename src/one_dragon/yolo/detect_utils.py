@@ -145,19 +145,39 @@ def nms(boxes, scores, iou_threshold):
 
 
 def multiclass_nms(boxes, scores, class_ids, iou_threshold):
-
-    unique_class_ids = np.unique(class_ids)
-
-    keep_boxes = []
-    for class_id in unique_class_ids:
-        class_indices = np.where(class_ids == class_id)[0]
-        class_boxes = boxes[class_indices,:]
-        class_scores = scores[class_indices]
-
-        class_keep_boxes = nms(class_boxes, class_scores, iou_threshold)
-        keep_boxes.extend(class_indices[class_keep_boxes])
-
-    return keep_boxes
+    """
+    按类别进行NMS
+    不同类别的框加上不同的坐标偏移 互相之间不会重叠 只需要进行一次NMS
+    :param boxes: xyxy
+    :param scores: 得分
+    :param class_ids: 类别
+    :param iou_threshold: iou阈值
+    :return: 保留的下标 按类别、得分从高到低排序
+    """
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    class_ids = np.asarray(class_ids)
+    if len(scores) == 0:
+        return []
+
+    # 偏移量大于所有框的坐标范围 保证不同类别的框不相交
+    span = float(boxes.max() - boxes.min()) + 1
+    offset = class_ids.astype(np.float32) * span
+    xywh = np.empty_like(boxes)
+    xywh[:, 0] = boxes[:, 0] + offset
+    xywh[:, 1] = boxes[:, 1] + offset
+    xywh[:, 2] = boxes[:, 2] - boxes[:, 0]
+    xywh[:, 3] = boxes[:, 3] - boxes[:, 1]
+
+    # NMSBoxes 会过滤掉得分不大于阈值的框 平移得分后全部保留 不影响排序
+    nms_scores = scores - scores.min() + 1
+    keep = np.asarray(cv2.dnn.NMSBoxes(xywh, nms_scores, 0, iou_threshold), dtype=np.int64).reshape(-1)
+    if len(keep) == 0:
+        return []
+
+    # 保持和逐个类别处理时一样的顺序
+    order = np.lexsort((-scores[keep], class_ids[keep]))
+    return keep[order].tolist()
 
 
 def compute_iou(box, boxes):
@@ -4,8 +4,10 @@ import urllib.request
 import zipfile
 from typing import Optional, List
 
+import numpy as np
 import onnxruntime as ort
 
+from one_dragon.base.inference.inference_scheduler import InferencePriority, ScheduledSession, get_inference_scheduler
 from one_dragon.yolo.log_utils import log
 
 _GH_PROXY_URL = 'https://ghfast.top'
@@ -22,6 +24,7 @@ class OnnxModelLoader:
                  personal_proxy: Optional[str] = '',
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
+                 priority: int = InferencePriority.NORMAL,
                  ):
         self.model_name: str = model_name
         self.backup_model_name: str = backup_model_name  # 备用模型 默认在本地一定有的模型 在新模型无法下载使用时使用
@@ -32,9 +35,10 @@ class OnnxModelLoader:
         self.gh_proxy_url: str = gh_proxy_url
         self.personal_proxy: Optional[str] = personal_proxy
         self.gpu: bool = gpu  # 是否使用GPU加速
+        self.priority: int = priority  # 推理的优先级 所有模型共用一个推理调度器
 
         # 从模型中读取到的输入输出信息
-        self.session: ort.InferenceSession = None
+        self.session: Optional[ScheduledSession] = None
         self.input_names: List[str] = []
         self.onnx_input_width: int = 0
         self.onnx_input_height: int = 0
@@ -142,13 +146,26 @@ class OnnxModelLoader:
         onnx_path = os.path.join(self.model_dir_path, 'model.onnx')
         log.info('加载模型 %s', onnx_path)
 
-        self.session = ort.InferenceSession(
+        self.session = get_inference_scheduler().create_session(
             onnx_path,
             providers=providers,
+            model_name=self.model_name,
+            priority=self.priority,
         )
         self.get_input_details()
         self.get_output_details()
 
+    def run_session(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        """
+        使用模型推理 输入输出大小固定时使用预先分配的输出缓冲区
+        :param input_tensor: 模型输入
+        :return: 全部输出
+        """
+        input_feed = {self.input_names[0]: input_tensor}
+        if self.session.io_binding_enabled:
+            return self.session.run_with_io_binding(input_feed)
+        return self.session.run(self.output_names, input_feed)
+
     def get_input_details(self):
         model_inputs = self.session.get_inputs()
         self.input_names = [model_inputs[i].name for i in range(len(model_inputs))]
@@ -1,4 +1,6 @@
-from typing import Tuple
+import threading
+import time
+from typing import Optional, Tuple
 
 import cv2
 import numpy as np
@@ -38,3 +40,105 @@ def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height
     input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
 
     return input_tensor, scale_height, scale_width
+
+
+class PreprocessTiming:
+
+    def __init__(self):
+        """
+        预处理各阶段的耗时 毫秒
+        """
+        self.resize_ms: float = 0  # 缩放并放入画布
+        self.normalize_ms: float = 0  # 归一化并转成 NCHW
+        self.total_ms: float = 0
+
+
+class OnnxRunTiming:
+
+    def __init__(self, preprocess: PreprocessTiming, inference_ms: float, postprocess_ms: float):
+        """
+        一次识别各阶段的耗时 毫秒
+        """
+        self.preprocess: PreprocessTiming = preprocess
+        self.inference_ms: float = inference_ms
+        self.postprocess_ms: float = postprocess_ms
+
+    @property
+    def total_ms(self) -> float:
+        return self.preprocess.total_ms + self.inference_ms + self.postprocess_ms
+
+
+class _LetterboxBuffer:
+
+    def __init__(self, onnx_input_width: int, onnx_input_height: int):
+        """
+        一个输入尺寸使用的缓冲区
+        """
+        self.canvas: np.ndarray = np.full((onnx_input_height, onnx_input_width, 3), 114, dtype=np.uint8)
+        self.tensor: np.ndarray = np.empty((1, 3, onnx_input_height, onnx_input_width), dtype=np.float32)
+        self.scale_width: int = onnx_input_width  # 上一次放入画布的图片大小 用于判断是否需要重新填充边缘
+        self.scale_height: int = onnx_input_height
+
+
+class LetterboxPreprocessor:
+
+    def __init__(self):
+        """
+        和 scale_input_image_u 结果一致的预处理 复用缓冲区 每帧基本不需要申请内存
+        - 缩放结果直接写入预先分配好的 uint8 画布
+        - 归一化和 HWC->NCHW 转换在一次运算中完成 直接写入预先分配好的 float32 张量
+        每个线程使用自己的缓冲区 返回的张量在同一线程下一次调用前有效
+        """
+        self._local = threading.local()
+        self.last_timing: PreprocessTiming = PreprocessTiming()
+
+    def _get_buffer(self, onnx_input_width: int, onnx_input_height: int) -> _LetterboxBuffer:
+        buffer_map: Optional[dict] = getattr(self._local, 'buffer_map', None)
+        if buffer_map is None:
+            buffer_map = {}
+            self._local.buffer_map = buffer_map
+        key = (onnx_input_width, onnx_input_height)
+        buffer = buffer_map.get(key)
+        if buffer is None:
+            buffer = _LetterboxBuffer(onnx_input_width, onnx_input_height)
+            buffer_map[key] = buffer
+        return buffer
+
+    def run(self, image: MatLike, onnx_input_width: int, onnx_input_height: int) -> Tuple[np.ndarray, int, int]:
+        """
+        将图片缩放至模型使用的大小
+        :param image: 输入的图片 RBG通道
+        :param onnx_input_width: 模型需要的图片宽度
+        :param onnx_input_height: 模型需要的图片高度
+        :return: 模型输入的张量、缩放后的高度、缩放后的宽度
+        """
+        t1 = time.perf_counter()
+        img_height, img_width = image.shape[:2]
+        min_scale = min(onnx_input_height / img_height, onnx_input_width / img_width)
+        scale_height = int(round(img_height * min_scale))
+        scale_width = int(round(img_width * min_scale))
+
+        buffer = self._get_buffer(onnx_input_width, onnx_input_height)
+        if onnx_input_height != img_height or onnx_input_width != img_width:  # 需要缩放
+            if scale_width < buffer.scale_width or scale_height < buffer.scale_height:  # 上一次的图片更大 边缘需要重新填充
+                buffer.canvas.fill(114)
+            buffer.scale_width = scale_width
+            buffer.scale_height = scale_height
+            cv2.resize(image, (scale_width, scale_height),
+                       dst=buffer.canvas[0:scale_height, 0:scale_width],
+                       interpolation=cv2.INTER_LINEAR)
+            input_img = buffer.canvas
+        else:
+            input_img = image
+        t2 = time.perf_counter()
+
+        np.multiply(input_img.transpose(2, 0, 1), np.float32(1 / 255.0), out=buffer.tensor[0], casting='unsafe')
+        t3 = time.perf_counter()
+
+        timing = PreprocessTiming()
+        timing.resize_ms = (t2 - t1) * 1000.0
+        timing.normalize_ms = (t3 - t2) * 1000.0
+        timing.total_ms = (t3 - t1) * 1000.0
+        self.last_timing = timing
+
+        return buffer.tensor, scale_height, scale_width
@@ -4,6 +4,7 @@ import numpy as np
 from cv2.typing import MatLike
 from typing import Optional, List
 
+from one_dragon.base.inference.inference_scheduler import InferencePriority
 from one_dragon.yolo import onnx_utils
 from one_dragon.yolo.onnx_model_loader import OnnxModelLoader
 
@@ -60,12 +61,14 @@ class Yolov8Classifier(OnnxModelLoader):
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
                  keep_result_seconds: float = 2,
+                 priority: int = InferencePriority.NORMAL,
                  ):
         """
         :param model_name: 模型名称 在根目录下会有一个以模型名称创建的子文件夹
         :param model_parent_dir_path: 放置所有模型的根目录
         :param gpu: 是否启用GPU加速
         :param keep_result_seconds: 保留多长时间的识别结果
+        :param priority: 推理的优先级
         """
         OnnxModelLoader.__init__(
             self,
@@ -76,11 +79,14 @@ class Yolov8Classifier(OnnxModelLoader):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            backup_model_name=backup_model_name
+            backup_model_name=backup_model_name,
+            priority=priority,
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
         self.run_result_history: List[ClassificationResult] = []  # 历史识别结果
+        self.preprocessor: onnx_utils.LetterboxPreprocessor = onnx_utils.LetterboxPreprocessor()  # 复用缓冲区的预处理
+        self.last_timing: Optional[onnx_utils.OnnxRunTiming] = None  # 上一次识别各阶段的耗时
 
     def run(self, image: MatLike, conf: float = 0.9, run_time: Optional[float] = None) -> ClassificationResult:
         """
@@ -101,6 +107,11 @@ class Yolov8Classifier(OnnxModelLoader):
 
         result = self.process_output(outputs, context)
         t4 = time.time()
+        self.last_timing = onnx_utils.OnnxRunTiming(
+            preprocess=self.preprocessor.last_timing,
+            inference_ms=(t3 - t2) * 1000.0,
+            postprocess_ms=(t4 - t3) * 1000.0,
+        )
 
         # log.info(f'识别完毕 预处理耗时 {t2 - t1:.3f}s, 推理耗时 {t3 - t2:.3f}s, 后处理耗时 {t4 - t3:.3f}s')
 
@@ -111,7 +122,7 @@ class Yolov8Classifier(OnnxModelLoader):
         """
         推理前的预处理
         """
-        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(context.img, self.onnx_input_width, self.onnx_input_height)
+        input_tensor, scale_height, scale_width = self.preprocessor.run(context.img, self.onnx_input_width, self.onnx_input_height)
         context.scale_height = scale_height
         context.scale_width = scale_width
         return input_tensor
@@ -122,7 +133,7 @@ class Yolov8Classifier(OnnxModelLoader):
         :param input_tensor: 输入模型的图片 RGB通道
         :return: onnx模型推理得到的结果
         """
-        outputs = self.session.run(self.output_names, {self.input_names[0]: input_tensor})
+        outputs = self.run_session(input_tensor)
         return outputs
 
     def process_output(self, output, context: RunContext) -> ClassificationResult:
@@ -4,8 +4,9 @@ import csv
 import numpy as np
 import os
 from cv2.typing import MatLike
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
+from one_dragon.base.inference.inference_scheduler import InferencePriority
 from one_dragon.yolo import onnx_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult, DetectClass, DetectContext, DetectObjectResult, xywh2xyxy, \
     multiclass_nms
@@ -23,7 +24,8 @@ class Yolov8Detector(OnnxModelLoader):
                  personal_proxy: Optional[str] = None,
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
-                 keep_result_seconds: float = 2
+                 keep_result_seconds: float = 2,
+                 priority: int = InferencePriority.NORMAL
                  ):
         """
         yolov8 detect 导出 onnx 后使用
@@ -33,6 +35,7 @@ class Yolov8Detector(OnnxModelLoader):
         :param model_parent_dir_path: 放置所有模型的根目录
         :param gpu: 是否启用GPU运算
         :param keep_result_seconds: 保留多长时间的识别结果
+        :param priority: 推理的优先级
         """
         OnnxModelLoader.__init__(
             self,
@@ -43,11 +46,14 @@ class Yolov8Detector(OnnxModelLoader):
             gh_proxy_url=gh_proxy_url,
             personal_proxy=personal_proxy,
             gpu=gpu,
-            backup_model_name=backup_model_name
+            backup_model_name=backup_model_name,
+            priority=priority,
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
         self.run_result_history: List[DetectFrameResult] = []  # 历史识别结果
+        self.preprocessor: onnx_utils.LetterboxPreprocessor = onnx_utils.LetterboxPreprocessor()  # 复用缓冲区的预处理
+        self.last_timing: Optional[onnx_utils.OnnxRunTiming] = None  # 上一次识别各阶段的耗时
         self.overlay_debug_bus = None
 
         self.idx_2_class: dict[int, DetectClass] = {}  # 分类
@@ -93,6 +99,11 @@ class Yolov8Detector(OnnxModelLoader):
 
         results = self.process_output(outputs, context)
         t4 = time.time()
+        self.last_timing = onnx_utils.OnnxRunTiming(
+            preprocess=self.preprocessor.last_timing,
+            inference_ms=(t3 - t2) * 1000.0,
+            postprocess_ms=(t4 - t3) * 1000.0,
+        )
 
         # log.info(f'识别完毕 得到结果 {len(results)}个。预处理耗时 {t2 - t1:.3f}s, 推理耗时 {t3 - t2:.3f}s, 后处理耗时 {t4 - t3:.3f}s')
 
@@ -110,7 +121,7 @@ class Yolov8Detector(OnnxModelLoader):
         """
         推理前的预处理
         """
-        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(context.img, self.onnx_input_width, self.onnx_input_height)
+        input_tensor, scale_height, scale_width = self.preprocessor.run(context.img, self.onnx_input_width, self.onnx_input_height)
         context.scale_height = scale_height
         context.scale_width = scale_width
         return input_tensor
@@ -121,7 +132,7 @@ class Yolov8Detector(OnnxModelLoader):
         :param input_tensor: 输入模型的图片 RGB通道
         :return: onnx模型推理得到的结果
         """
-        outputs = self.session.run(self.output_names, {self.input_names[0]: input_tensor})
+        outputs = self.run_session(input_tensor)
         return outputs
 
     def process_output(self, output, context: DetectContext) -> List[DetectObjectResult]:
@@ -130,39 +141,47 @@ class Yolov8Detector(OnnxModelLoader):
         :param context: 上下文
         :return: 最终得到的识别结果
         """
-        predictions = np.squeeze(output[0]).T
+        boxes, scores, class_ids = self.process_output_to_array(output, context)
 
-        keep = np.ones(shape=(predictions.shape[1]), dtype=bool)
+        results: List[DetectObjectResult] = []
+        for idx in range(len(scores)):
+            result = DetectObjectResult(rect=boxes[idx].tolist(),
+                                        score=float(scores[idx]),
+                                        detect_class=self.idx_2_class[int(class_ids[idx])]
+                                        )
+            results.append(result)
 
-        if context.label_list is not None or context.category_list is not None:
-            keep[4:] = False  # 前4位是坐标 先把所有标签都设置为False
-            if context.label_list is not None:
-                for label in context.label_list:
-                    idx = self.class_2_idx.get(label)
-                    if idx is not None:
-                        keep[idx + 4] = True
+        return results
 
-            if context.category_list is not None:
-                for category in context.category_list:
-                    for idx in self.category_2_idx.get(category, []):
-                        keep[idx + 4] = True
+    def process_output_to_array(self, output, context: DetectContext) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        后处理 结果以数组返回 需要时再转换成 DetectObjectResult
+        先按置信度过滤 只对剩下的候选框进行转置、坐标转换和NMS
+        :param output: 推理结果
+        :param context: 上下文
+        :return: 原图上的框 xyxy、得分、类别
+        """
+        predictions = output[0][0]  # [4 + 类别数量, 候选框数量]
 
-        predictions[:, keep == False] = 0
+        class_idx_list = self._get_keep_class_idx(context)
+        if class_idx_list is None:
+            class_scores = predictions[4:, :]
+        else:
+            class_scores = predictions[4 + class_idx_list, :]
 
         # 按置信度阈值进行基本的过滤
-        scores = np.max(predictions[:, 4:], axis=1)
-        predictions = predictions[scores > context.conf, :]
-        scores = scores[scores > context.conf]
+        scores = np.max(class_scores, axis=0) if class_scores.shape[0] > 0 else np.zeros(predictions.shape[1])
+        candidate = scores > context.conf
+        if not np.any(candidate):
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
 
-        results: List[DetectObjectResult] = []
-        if len(scores) == 0:
-            return results
-
-        # 选择置信度最高的类别
-        class_ids = np.argmax(predictions[:, 4:], axis=1)
+        scores = scores[candidate]
+        class_ids = np.argmax(class_scores[:, candidate], axis=0)  # 选择置信度最高的类别
+        if class_idx_list is not None:
+            class_ids = class_idx_list[class_ids]
 
         # 提取Bounding box
-        boxes = predictions[:, :4]  # 原始推理结果 xywh
+        boxes = predictions[:4, candidate].T  # 原始推理结果 xywh
         scale_shape = np.array([context.scale_width, context.scale_height, context.scale_width, context.scale_height])  # 缩放后图片的大小
         boxes = np.divide(boxes, scale_shape, dtype=np.float32)  # 转化到 0~1
         boxes *= np.array([context.img_width, context.img_height, context.img_width, context.img_height])  # 恢复到原图的坐标
@@ -171,14 +190,30 @@ class Yolov8Detector(OnnxModelLoader):
         # 进行NMS 获取最后的结果
         indices = multiclass_nms(boxes, scores, class_ids, context.iou)
 
-        for idx in indices:
-            result = DetectObjectResult(rect=boxes[idx].tolist(),
-                                        score=float(scores[idx]),
-                                        detect_class=self.idx_2_class[int(class_ids[idx])]
-                                        )
-            results.append(result)
+        return boxes[indices], scores[indices], class_ids[indices]
 
-        return results
+    def _get_keep_class_idx(self, context: DetectContext) -> Optional[np.ndarray]:
+        """
+        需要保留的类别下标
+        :param context: 上下文
+        :return: 不限定标签时返回None
+        """
+        if context.label_list is None and context.category_list is None:
+            return None
+
+        keep = set()
+        if context.label_list is not None:
+            for label in context.label_list:
+                idx = self.class_2_idx.get(label)
+                if idx is not None:
+                    keep.add(idx)
+
+        if context.category_list is not None:
+            for category in context.category_list:
+                for idx in self.category_2_idx.get(category, []):
+                    keep.add(idx)
+
+        return np.array(sorted(keep), dtype=np.int64)
 
     def record_result(self, context: DetectContext, results: List[DetectObjectResult]) -> DetectFrameResult:
         """
@@ -208,6 +243,7 @@ class Yolov8Detector(OnnxModelLoader):
         except Exception:
             return
 
+        offset_x, offset_y = bus.crop_offset
         for result in frame_result.results[:50]:
             label = result.detect_class.class_name
             if len(label) > 36:
@@ -216,10 +252,10 @@ class Yolov8Detector(OnnxModelLoader):
                 VisionDrawItem(
                     source="yolo",
                     label=label,
-                    x1=result.x1,
-                    y1=result.y1,
-                    x2=result.x2,
-                    y2=result.y2,
+                    x1=result.x1 + offset_x,
+                    y1=result.y1 + offset_y,
+                    x2=result.x2 + offset_x,
+                    y2=result.y2 + offset_y,
                     score=result.score,
                     color="#35d4ff",
                     ttl_seconds=1.6,
@@ -556,7 +556,9 @@ class DevtoolsTemplateHelperInterface(VerticalScrollInterface, HistoryMixin):
         if self.chosen_template is None:
             return
 
+        old_sub_dir, old_template_id = self.chosen_template.old_sub_dir, self.chosen_template.old_template_id
         self.chosen_template.save_config()
+        self._invalidate_loaded_template(old_sub_dir, old_template_id)
         self._update_existed_yml_options()
 
     def _on_save_raw_clicked(self) -> None:
@@ -567,7 +569,9 @@ class DevtoolsTemplateHelperInterface(VerticalScrollInterface, HistoryMixin):
         if self.chosen_template is None:
             return
 
+        old_sub_dir, old_template_id = self.chosen_template.old_sub_dir, self.chosen_template.old_template_id
         self.chosen_template.save_raw()
+        self._invalidate_loaded_template(old_sub_dir, old_template_id)
         self._update_existed_yml_options()
 
     def _on_save_mask_clicked(self) -> None:
@@ -578,9 +582,21 @@ class DevtoolsTemplateHelperInterface(VerticalScrollInterface, HistoryMixin):
         if self.chosen_template is None:
             return
 
+        old_sub_dir, old_template_id = self.chosen_template.old_sub_dir, self.chosen_template.old_template_id
         self.chosen_template.save_mask()
+        self._invalidate_loaded_template(old_sub_dir, old_template_id)
         self._update_existed_yml_options()
 
+    def _invalidate_loaded_template(self, old_sub_dir: str, old_template_id: str) -> None:
+        """
+        保存模板后 移除运行时已经加载的模板 改了分类或id时 旧的也要移除
+        :param old_sub_dir: 保存前的分类
+        :param old_template_id: 保存前的模板id
+        :return:
+        """
+        self.ctx.template_loader.invalidate_template(old_sub_dir, old_template_id)
+        self.ctx.template_loader.invalidate_template(self.chosen_template.sub_dir, self.chosen_template.template_id)
+
     def _on_clear_points_clicked(self) -> None:
         """
         清除所有点位
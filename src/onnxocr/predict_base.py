@@ -1,4 +1,7 @@
-import onnxruntime
+import os
+
+from one_dragon.base.inference.inference_scheduler import InferencePriority, get_inference_scheduler
+
 
 class PredictBase(object):
     def __init__(self):
@@ -11,7 +14,13 @@ class PredictBase(object):
         else:
             providers =['CPUExecutionProvider']
 
-        onnx_session = onnxruntime.InferenceSession(model_dir, None,providers=providers)
+        # 和YOLO共用推理调度器 OCR优先级较低 不影响移动时的识别
+        onnx_session = get_inference_scheduler().create_session(
+            model_dir,
+            providers=providers,
+            model_name='ocr_%s' % os.path.basename(model_dir),
+            priority=InferencePriority.BACKGROUND,
+        )
 
         # print("providers:", onnxruntime.get_device())
         return onnx_session
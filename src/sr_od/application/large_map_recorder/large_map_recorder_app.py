@@ -280,11 +280,13 @@ class LargeMapRecorder(SrApplication):
         # best_mys_resize: int = large_map_recorder_mys_utils.get_best_mys_image_resize_for_all(self.region_list, row, col)
 
         for region in self.region_list:
-            merge = large_map_recorder_utils.merge_parts_into_one(
+            merge = large_map_recorder_utils.stitch_parts_into_one(
                 region,
                 max_row=self.ck.max_row,
                 max_col=self.ck.max_column
             )
+            if merge is None:
+                return self.round_fail(f'合并失败 {region.prl_id}')
             large_map_recorder_utils.save_floor_image(region, merge)
 
         if self.run_mode == self.RUN_MODE_ALL:
@@ -75,6 +75,13 @@ def save_floor_image(region: Region, image: MatLike) -> None:
 
 
 
+_STITCH_DOWNSCALE: int = 4  # 相位相关估算偏移量时 图片缩小的倍数
+_STITCH_REFINE_RADIUS: int = 8  # 原尺寸精修偏移量时 允许修正的范围 需要覆盖缩小带来的误差
+_STITCH_MATCH_THRESHOLD: float = 0.9  # 精修后 重叠部分需要达到的相关系数
+_STITCH_SOLVE_ROUNDS: int = 5  # 最小二乘求解的轮数 每轮降低误差大的偏移量的权重
+_STITCH_RESIDUAL_TOLERANCE: float = 2  # 偏移量和求解结果的误差 超过多少像素开始降低权重
+
+
 class RegionMergeCheckpoint:
 
     def __init__(self):
@@ -467,6 +474,370 @@ def _merge_part_into_whole(
     return new_image
 
 
+def stitch_parts_into_one(
+        region: Region,
+        max_row: int,
+        max_col: int,
+        max_workers: int | None = None,
+) -> MatLike | None:
+    """
+    将所有碎片地图合并成一个完整的大地图 同 merge_parts_into_one 但更快
+    1. 读取所有碎片 忽略大部分空白的块
+    2. 使用线程池 并发计算每一对相邻碎片的偏移量 每对碎片之间互不依赖
+       - 在缩小后的图片上使用相位相关 估算偏移量
+       - 在原尺寸的重叠区域上 再做一次相位相关修正 并用非背景部分的相关系数校验
+       - 估算失败时 使用 _cal_part_position 逐个裁剪匹配
+    3. 以道路最多的碎片为原点 对所有相邻偏移量求最小二乘解 得到每个碎片的位置 误差不会沿着bfs路径累积
+    4. 按所有碎片的范围 一次性创建大地图 空白区域使用 rgb=(205, 205, 205) 填充 再把碎片写入对应位置
+
+    Args:
+        region: 当前合并的区域
+        max_row: 碎片图片的最大行数 从1开始到max_row
+        max_col: 碎片图片的最大列数 从1开始到max_col
+        max_workers: 线程池的大小 默认为cpu数量
+
+    Returns:
+        合并后的大地图图像 没有碎片时返回None
+    """
+    log.info(f'[{region.prl_id}] 开始合并碎片地图，行数: {max_row}, 列数: {max_col}')
+    executor = ThreadPoolExecutor(thread_name_prefix='large_map_recorder', max_workers=max_workers or os.cpu_count())
+
+    try:
+        # 读取所有碎片
+        load_future_map: dict[tuple[int, int], Future] = {}
+        for row in range(1, max_row + 1):
+            for col in range(1, max_col + 1):
+                load_future_map[(row, col)] = executor.submit(get_part_image, region, row, col)
+
+        all_part_set: set[tuple[int, int]] = set()  # 存在的碎片 包括空白块
+        part_map: dict[tuple[int, int], MatLike] = {}  # 需要拼接的碎片
+        for pos, future in load_future_map.items():
+            part_image = future.result()
+            if part_image is None:
+                continue
+            all_part_set.add(pos)
+            if is_empty_part(part_image):  # 忽略一些大部分空白的块
+                log.info(f"忽略空白块 {pos}")
+                continue
+            part_map[pos] = part_image
+
+        if len(part_map) == 0:
+            log.error(f'[{region.prl_id}] 没有可以合并的碎片')
+            return None
+
+        # 并发计算相邻碎片的偏移量 只需要计算右方和下方
+        offset_future_map: dict[tuple[tuple[int, int], tuple[int, int]], Future] = {}
+        for pos, part_image in part_map.items():
+            for direction in [(1, 0), (0, 1)]:
+                next_pos = (pos[0] + direction[0], pos[1] + direction[1])
+                next_part = part_map.get(next_pos)
+                if next_part is None:
+                    continue
+                offset_future_map[(pos, next_pos)] = executor.submit(
+                    _cal_part_offset, part_image, next_part, direction
+                )
+
+        pair_offset_map: dict[tuple[tuple[int, int], tuple[int, int]], tuple[int, int, float]] = {}
+        for pair, future in offset_future_map.items():
+            offset = future.result()
+            if offset is None:
+                log.info(f"计算偏移量失败 {pair[0]} -> {pair[1]}")
+                continue
+            log.info(f"计算偏移量完成 {pair[0]} -> {pair[1]} : {offset[0], offset[1]}")
+            pair_offset_map[pair] = offset
+    finally:
+        executor.shutdown(wait=False)
+
+    # 找出道路最多的碎片作为原点
+    start_pos = max(part_map.keys(), key=lambda p: (np.count_nonzero(_get_road_mask(part_map[p])), -p[0], -p[1]))
+    log.info(f'找到最佳起始碎片: {start_pos}')
+
+    part_positions = _solve_part_positions(start_pos, pair_offset_map)
+    for pos in part_map.keys():
+        if pos not in part_positions:
+            log.info(f'碎片无法连接到起始碎片 忽略 {pos}')
+
+    # 按范围一次性创建大地图
+    min_x = min(x for x, _ in part_positions.values())
+    min_y = min(y for _, y in part_positions.values())
+    ck = RegionMergeCheckpoint()
+    for pos, (x, y) in part_positions.items():
+        ck.part_positions[pos] = (x - min_x, y - min_y)
+        ck.final_width = max(ck.final_width, x - min_x + part_map[pos].shape[1])
+        ck.final_height = max(ck.final_height, y - min_y + part_map[pos].shape[0])
+    ck.done_part = all_part_set
+
+    final_image = np.full((ck.final_height, ck.final_width, 3), 205, dtype=np.uint8)
+    for pos, (x, y) in ck.part_positions.items():  # 按bfs顺序写入 后面的碎片覆盖前面的
+        part_image = part_map[pos]
+        final_image[y:y + part_image.shape[0], x:x + part_image.shape[1]] = part_image
+
+    _save_merge_checkpoint(region, ck)
+    log.info(f'[{region.prl_id}] 合并完成 碎片 {len(part_positions)}/{len(part_map)} 大小 {ck.final_width}x{ck.final_height}')
+    return final_image
+
+
+def _cal_part_offset(
+        current_part: MatLike,
+        next_part: MatLike,
+        direction: tuple[int, int],
+) -> tuple[int, int, float] | None:
+    """
+    计算下一个碎片在当前碎片的相对位置
+    先用相位相关估算 再在原尺寸上精修 失败时使用 _cal_part_position
+
+    Args:
+        current_part: 当前碎片的图像
+        next_part: 下一个碎片的图像
+        direction: 方向
+
+    Returns:
+        下一个碎片在当前碎片的相对位置 以及重叠部分的相关系数 计算失败时返回None
+    """
+    current_gray = cv2.cvtColor(current_part, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    next_gray = cv2.cvtColor(next_part, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    next_mask = _get_non_background_mask(next_part) > 0
+
+    best: tuple[int, int, float] | None = None
+    for dx, dy in _estimate_part_offset(current_gray, next_gray, direction):
+        refined = _refine_part_offset(current_gray, next_gray, next_mask, dx, dy)
+        if refined is not None and (best is None or refined[2] > best[2]):
+            best = refined
+
+    if best is not None:
+        return best
+
+    dx, dy = _cal_part_position(current_part, next_part, direction)
+    if dx is None or dy is None:
+        return None
+    return dx, dy, _STITCH_MATCH_THRESHOLD
+
+
+def _estimate_part_offset(
+        current_gray: np.ndarray,
+        next_gray: np.ndarray,
+        direction: tuple[int, int],
+) -> list[tuple[int, int]]:
+    """
+    在缩小后的图片上 使用相位相关估算下一个碎片在当前碎片的相对位置
+    相位相关的结果是循环的 沿拖动方向的偏移量有多种可能 只保留和方向一致的
+
+    Args:
+        current_gray: 当前碎片的灰度图
+        next_gray: 下一个碎片的灰度图
+        direction: 方向
+
+    Returns:
+        可能的相对位置
+    """
+    height = min(current_gray.shape[0], next_gray.shape[0])
+    width = min(current_gray.shape[1], next_gray.shape[1])
+    small_width = width // _STITCH_DOWNSCALE
+    small_height = height // _STITCH_DOWNSCALE
+    if small_width < 8 or small_height < 8:
+        return []
+
+    current_small = cv2.resize(current_gray[:height, :width], (small_width, small_height), interpolation=cv2.INTER_AREA)
+    next_small = cv2.resize(next_gray[:height, :width], (small_width, small_height), interpolation=cv2.INTER_AREA)
+    (shift_x, shift_y), _ = cv2.phaseCorrelate(next_small - next_small.mean(), current_small - current_small.mean())
+
+    if direction[1] == 0:
+        dx_list = [shift_x]
+        dy_list = [shift_y + i * small_height for i in [-1, 0, 1]]
+        dy_list = [dy for dy in dy_list if dy * direction[0] > 0 and abs(dy) < small_height]
+    else:
+        dy_list = [shift_y]
+        dx_list = [shift_x + i * small_width for i in [-1, 0, 1]]
+        dx_list = [dx for dx in dx_list if dx * direction[1] > 0 and abs(dx) < small_width]
+
+    return [
+        (int(round(dx * _STITCH_DOWNSCALE)), int(round(dy * _STITCH_DOWNSCALE)))
+        for dx in dx_list
+        for dy in dy_list
+    ]
+
+
+def _refine_part_offset(
+        current_gray: np.ndarray,
+        next_gray: np.ndarray,
+        next_mask: np.ndarray,
+        dx: int,
+        dy: int,
+) -> tuple[int, int, float] | None:
+    """
+    在原尺寸的重叠区域上 精修估算的偏移量
+    1. 对重叠区域再做一次相位相关 修正缩小带来的误差
+    2. 计算修正后位置上 非背景部分的相关系数 不满足时再尝试周围一个像素
+
+    Args:
+        current_gray: 当前碎片的灰度图
+        next_gray: 下一个碎片的灰度图
+        next_mask: 下一个碎片的非背景掩码
+        dx: 估算的下一个碎片在当前碎片的相对位置
+        dy: 估算的下一个碎片在当前碎片的相对位置
+
+    Returns:
+        下一个碎片在当前碎片的相对位置 以及重叠部分的相关系数 低于阈值时返回None
+    """
+    overlap = _get_overlap_rect(current_gray, next_gray, dx, dy)
+    if overlap is None:
+        return None
+
+    # 裁剪成32的倍数 傅里叶变换更快
+    x1, y1, x2, y2 = overlap
+    x2 -= (x2 - x1) % 32
+    y2 -= (y2 - y1) % 32
+    current_overlap = current_gray[y1:y2, x1:x2]
+    next_overlap = next_gray[y1 - dy:y2 - dy, x1 - dx:x2 - dx]
+    (shift_x, shift_y), _ = cv2.phaseCorrelate(next_overlap - next_overlap.mean(),
+                                               current_overlap - current_overlap.mean())
+    if abs(shift_x) <= _STITCH_REFINE_RADIUS and abs(shift_y) <= _STITCH_REFINE_RADIUS:
+        dx += int(round(shift_x))
+        dy += int(round(shift_y))
+
+    score = _cal_overlap_correlation(current_gray, next_gray, next_mask, dx, dy)
+    if score is not None and score >= _STITCH_MATCH_THRESHOLD:
+        return dx, dy, score
+
+    # 修正后的位置不满足时 再尝试周围一个像素
+    best: tuple[int, int, float] | None = None
+    for offset_y in [-1, 0, 1]:
+        for offset_x in [-1, 0, 1]:
+            if offset_x == 0 and offset_y == 0:
+                continue
+            score = _cal_overlap_correlation(current_gray, next_gray, next_mask, dx + offset_x, dy + offset_y)
+            if score is not None and (best is None or score > best[2]):
+                best = (dx + offset_x, dy + offset_y, score)
+
+    if best is None or best[2] < _STITCH_MATCH_THRESHOLD:
+        return None
+    return best
+
+
+def _get_overlap_rect(
+        current_image: np.ndarray,
+        next_image: np.ndarray,
+        dx: int,
+        dy: int,
+) -> tuple[int, int, int, int] | None:
+    """
+    重叠区域在当前碎片上的范围
+
+    Returns:
+        (x1, y1, x2, y2) 重叠区域太小时返回None
+    """
+    x1 = max(0, dx)
+    x2 = min(current_image.shape[1], dx + next_image.shape[1])
+    y1 = max(0, dy)
+    y2 = min(current_image.shape[0], dy + next_image.shape[0])
+    if x2 - x1 <= _STITCH_REFINE_RADIUS * 4 or y2 - y1 <= _STITCH_REFINE_RADIUS * 4:
+        return None
+    return x1, y1, x2, y2
+
+
+def _cal_overlap_correlation(
+        current_gray: np.ndarray,
+        next_gray: np.ndarray,
+        next_mask: np.ndarray,
+        dx: int,
+        dy: int,
+) -> float | None:
+    """
+    计算重叠区域中 非背景部分的相关系数 同带掩码的 TM_CCOEFF_NORMED
+
+    Returns:
+        相关系数 重叠部分几乎都是背景时无法判断 返回None
+    """
+    overlap = _get_overlap_rect(current_gray, next_gray, dx, dy)
+    if overlap is None:
+        return None
+
+    x1, y1, x2, y2 = overlap
+    mask = next_mask[y1 - dy:y2 - dy, x1 - dx:x2 - dx]
+    if np.count_nonzero(mask) < mask.size * 0.01:
+        return None
+
+    current_values = current_gray[y1:y2, x1:x2][mask]
+    next_values = next_gray[y1 - dy:y2 - dy, x1 - dx:x2 - dx][mask]
+    current_values = current_values - current_values.mean()
+    next_values = next_values - next_values.mean()
+    denominator = np.sqrt(np.dot(current_values, current_values) * np.dot(next_values, next_values))
+    if denominator <= 0:
+        return None
+    return float(np.dot(current_values, next_values) / denominator)
+
+
+def _solve_part_positions(
+        start_pos: tuple[int, int],
+        pair_offset_map: dict[tuple[tuple[int, int], tuple[int, int]], tuple[int, int, float]],
+) -> dict[tuple[int, int], tuple[int, int]]:
+    """
+    根据相邻碎片的偏移量 求出每个碎片的位置
+    所有偏移量一起求加权最小二乘解 再降低误差较大的偏移量的权重重新求解
+
+    Args:
+        start_pos: 起始碎片 位置固定为 (0, 0)
+        pair_offset_map: 相邻碎片的偏移量 key=(碎片, 相邻碎片) value=(dx, dy, 匹配度)
+
+    Returns:
+        和起始碎片连通的碎片的位置 按bfs顺序
+    """
+    neighbour_map: dict[tuple[int, int], list[tuple[int, int]]] = {}
+    for pos, next_pos in pair_offset_map.keys():
+        neighbour_map.setdefault(pos, []).append(next_pos)
+        neighbour_map.setdefault(next_pos, []).append(pos)
+
+    # bfs找出和起始碎片连通的碎片
+    bfs_order: list[tuple[int, int]] = [start_pos]
+    visited: set[tuple[int, int]] = {start_pos}
+    bfs_list: deque[tuple[int, int]] = deque([start_pos])
+    while len(bfs_list) > 0:
+        current_pos = bfs_list.popleft()
+        for next_pos in neighbour_map.get(current_pos, []):
+            if next_pos in visited:
+                continue
+            visited.add(next_pos)
+            bfs_order.append(next_pos)
+            bfs_list.append(next_pos)
+
+    if len(bfs_order) == 1:
+        return {start_pos: (0, 0)}
+
+    # 起始碎片以外的碎片 每个碎片对应一列
+    var_idx_map: dict[tuple[int, int], int] = {pos: idx for idx, pos in enumerate(bfs_order[1:])}
+    pair_list = [pair for pair in pair_offset_map.keys() if pair[0] in visited]
+    a = np.zeros((len(pair_list), len(var_idx_map)), dtype=np.float64)
+    b = np.zeros((len(pair_list), 2), dtype=np.float64)
+    base_weight = np.zeros(len(pair_list), dtype=np.float64)
+    for row, (pos, next_pos) in enumerate(pair_list):
+        dx, dy, confidence = pair_offset_map[(pos, next_pos)]
+        if next_pos in var_idx_map:
+            a[row, var_idx_map[next_pos]] = 1
+        if pos in var_idx_map:
+            a[row, var_idx_map[pos]] = -1
+        b[row] = (dx, dy)
+        base_weight[row] = confidence
+
+    weight = base_weight
+    solution = np.zeros((len(var_idx_map), 2), dtype=np.float64)
+    residual = np.zeros(len(pair_list), dtype=np.float64)
+    for _ in range(_STITCH_SOLVE_ROUNDS):
+        sqrt_weight = np.sqrt(weight)[:, np.newaxis]
+        solution = np.linalg.lstsq(a * sqrt_weight, b * sqrt_weight, rcond=None)[0]
+        residual = np.linalg.norm(a @ solution - b, axis=1)
+        # 误差超过几个像素的 大概率是匹配错了 降低权重
+        weight = base_weight / np.maximum(1, (residual / _STITCH_RESIDUAL_TOLERANCE) ** 2)
+
+    for row in np.where(residual > _STITCH_RESIDUAL_TOLERANCE)[0]:
+        log.warning(f'偏移量和整体位置不一致 {pair_list[row][0]} -> {pair_list[row][1]} 误差 {residual[row]:.1f}')
+
+    positions: dict[tuple[int, int], tuple[int, int]] = {start_pos: (0, 0)}
+    for pos in bfs_order[1:]:
+        x, y = solution[var_idx_map[pos]]
+        positions[pos] = (int(round(x)), int(round(y)))
+    return positions
+
+
 def is_empty_part(map_image: MatLike) -> bool:
     """
     判断当前地图图片是否空白
@@ -8,7 +8,6 @@ from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.operation.operation_edge import node_from
 from one_dragon.base.operation.operation_node import operation_node
 from one_dragon.base.operation.operation_round_result import OperationRoundResult
-from one_dragon.utils import cv2_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from sr_od.application.sim_universe import sim_uni_screen_state
@@ -123,11 +122,8 @@ class SimUniChooseCurio(SrOperation):
         """
         curio_list: List[MatchResult] = []
 
-        for rect in rect_list:
-            title_part = cv2_utils.crop_image_only(screen, rect)
-            title_ocr = self.ctx.ocr.run_ocr_single_line(title_part)
-            # cv2_utils.show_image(title_part, wait=0)
-
+        title_ocr_list = self.ctx.ocr_service.get_single_line_text_by_rects(screen, rect_list)
+        for rect, title_ocr in zip(rect_list, title_ocr_list):
             curio = match_best_curio_by_ocr(title_ocr)
 
             if curio is None:  # 有一个识别不到就返回 提速
@@ -311,11 +307,8 @@ class SimUniDropCurio(SrOperation):
         """
         curio_list: List[MatchResult] = []
 
-        for rect in rect_list:
-            title_part = cv2_utils.crop_image_only(screen, rect)
-            title_ocr = self.ctx.ocr.run_ocr_single_line(title_part)
-            # cv2_utils.show_image(title_part, wait=0)
-
+        title_ocr_list = self.ctx.ocr_service.get_single_line_text_by_rects(screen, rect_list)
+        for rect, title_ocr in zip(rect_list, title_ocr_list):
             curio = match_best_curio_by_ocr(title_ocr)
 
             if curio is None:  # 有一个识别不到就返回 提速
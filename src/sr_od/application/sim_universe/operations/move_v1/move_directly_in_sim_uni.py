@@ -57,6 +57,21 @@ class MoveDirectlyInSimUni(MoveDirectly):
             first_state = battle_screen_state.ScreenState.BATTLE.value
         return SimUniEnterFight(self.ctx, config=self.config, first_state=first_state)
 
+    def do_track_pos(self, mm_info: MiniMapInfo,
+                     predict_pos: Point, scale: float, margin: int) -> Optional[MatchResult]:
+        """
+        真正的跟踪坐标
+        :param mm_info: 当前的小地图信息
+        :param predict_pos: 预测的坐标
+        :param scale: 预测的小地图缩放比例
+        :param margin: 预测坐标的误差范围
+        :return:
+        """
+        return cal_pos_utils.cal_character_pos_by_tracking(
+            self.ctx, self.lm_info, mm_info,
+            predict_pos=predict_pos, scale=scale, margin=margin,
+            sim_uni=True)
+
     def do_cal_pos(self, mm_info: MiniMapInfo,
                    lm_rect: Rect, verify: VerifyPosInfo) -> Optional[MatchResult]:
         """
@@ -73,14 +88,16 @@ class MoveDirectlyInSimUni(MoveDirectly):
                 lm_rect=lm_rect,
                 running=self.ctx.controller.is_moving,
                 real_move_time=real_move_time,
-                verify=verify)
+                verify=verify,
+                pyramid=self.ctx.controller.is_moving)
             if next_pos is None and self.next_lm_info is not None:
                 next_pos = cal_pos_utils.sim_uni_cal_pos(
                     self.ctx, self.next_lm_info, mm_info,
                     lm_rect=lm_rect,
                     running=self.ctx.controller.is_moving,
                     real_move_time=real_move_time,
-                    verify=verify)
+                    verify=verify,
+                    pyramid=self.ctx.controller.is_moving)
         except Exception:
             next_pos = None
             log.error('识别坐标失败', exc_info=True)
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Optional, List
 
-from one_dragon.utils import str_utils
+from one_dragon.utils.fuzzy_index import FuzzyIndex
 from one_dragon.utils.i18_utils import gt
 
 
@@ -167,14 +167,11 @@ def path_of(path_str: str) -> Optional[SimUniPath]:
     return None
 
 
+_PATH_INDEX: FuzzyIndex[SimUniPath] = FuzzyIndex(list(SimUniPath), lambda path: gt(path.value, 'ocr'))
+
+
 def match_best_path_by_ocr(path_ocr: str) -> Optional[SimUniPath]:
-    path_list = [path for path in SimUniPath]
-    target_path_list = [gt(path.value, 'ocr') for path in SimUniPath]
-    idx = str_utils.find_best_match_by_lcs(path_ocr, target_path_list)
-    if idx is None:
-        return None
-    else:
-        return path_list[idx]
+    return _PATH_INDEX.find_best_by_lcs(path_ocr)
 
 
 class SimUniBlessLevel(Enum):
@@ -465,6 +462,12 @@ for _bless_enum in SimUniBlessEnum:
 
     PATH_BLESS_LIST[_path.value].append(_bless)
 
+# 每个命途的祝福 不包括第一个命途本身
+PATH_BLESS_INDEX: dict[str, FuzzyIndex[SimUniBless]] = {
+    _path_value: FuzzyIndex([i for i in _bless_list if i.title != i.path.value], lambda bless: gt(bless.title, 'ocr'))
+    for _path_value, _bless_list in PATH_BLESS_LIST.items()
+}
+
 
 def match_best_bless_by_ocr(title_ocr: str, path_ocr: str) -> Optional[SimUniBless]:
     """
@@ -477,14 +480,11 @@ def match_best_bless_by_ocr(title_ocr: str, path_ocr: str) -> Optional[SimUniBle
     if path is None:
         return None
 
-    bless_list = PATH_BLESS_LIST[path.value]
-    target_title_list = [gt(bless.title, 'ocr') for bless in bless_list if bless.title != bless.path.value]
-
-    idx = str_utils.find_best_match_by_lcs(title_ocr, target_title_list)
-    if idx is None:  # 未录入的祝福
-        return bless_list[0]
+    bless = PATH_BLESS_INDEX[path.value].find_best_by_lcs(title_ocr)
+    if bless is None:  # 未录入的祝福
+        return PATH_BLESS_LIST[path.value][0]
     else:
-        return bless_list[idx + 1]
+        return bless
 
 
 def bless_enum_from_title(bless_title: str) -> Optional[SimUniBlessEnum]:
@@ -573,18 +573,16 @@ class SimUniCurioEnum(Enum):
     CURIO_060 = SimUniCurio('粉红冲撞', 'fhcz')
 
 
+_CURIO_INDEX: FuzzyIndex[SimUniCurio] = FuzzyIndex([c.value for c in SimUniCurioEnum], lambda curio: gt(curio.name, 'ocr'))
+
+
 def match_best_curio_by_ocr(name_ocr: str) -> Optional[SimUniCurio]:
     """
     根据OCR结果，匹配一个最合适的奇物
     :param name_ocr: OCR得到的奇物名称
     :return:
     """
-    target_list = [gt(c.value.name, 'ocr') for c in SimUniCurioEnum.__members__.values()]
-    idx = str_utils.find_best_match_by_lcs(name_ocr, target_list)
-    if idx is not None:
-        return SimUniCurioEnum['CURIO_%03d' % idx].value
-    else:
-        return None
+    return _CURIO_INDEX.find_best_by_lcs(name_ocr)
 
 
 def curio_enum_from_name(name: str) -> Optional[SimUniCurioEnum]:
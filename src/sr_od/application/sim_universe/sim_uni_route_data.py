@@ -2,20 +2,23 @@ import os
 from cv2.typing import MatLike
 from typing import List, Optional
 
-from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.utils import cv2_utils
 from one_dragon.utils.log_utils import log
 from sr_od.application.sim_universe.sim_uni_route import SimUniRoute
 from sr_od.application.sim_universe.sim_uni_data import SimUniLevelType
+from sr_od.application.sim_universe.sim_uni_route_index import START_MM_CROP_RECT, SimUniRouteIndex
 from sr_od.sr_map.sr_map_data import SrMapData
 
+_VERIFY_ROUTE_CNT: int = 3  # 使用索引找到最相似的几条路线 再用模板匹配确认
+
 
 class SimUniRouteData:
 
     def __init__(self, map_data: SrMapData):
         self.map_data: SrMapData = map_data
         self.level_type_2_route_list: dict[str, List[SimUniRoute]] = {}
+        self.level_type_2_route_index: dict[str, SimUniRouteIndex] = {}  # 开始点小地图的索引 和路线一起加载
 
     def get_route_list(self, level_type: SimUniLevelType) -> List[SimUniRoute]:
         """
@@ -39,8 +42,20 @@ class SimUniRouteData:
             arr.append(route)
 
         self.level_type_2_route_list[key] = arr
+        self.level_type_2_route_index[key] = SimUniRouteIndex(arr)
         return arr
 
+    def get_route_index(self, level_type: SimUniLevelType) -> SimUniRouteIndex:
+        """
+        获取楼层类型对应的路线索引
+        :param level_type: 楼层类型
+        :return:
+        """
+        key = level_type.route_id
+        if key not in self.level_type_2_route_index:
+            self.get_route_list(level_type)
+        return self.level_type_2_route_index[key]
+
     def load_one_route(self, level_type: SimUniLevelType, sub: str) -> Optional[SimUniRoute]:
         """
         加载一条路线
@@ -60,16 +75,49 @@ class SimUniRouteData:
 
     def clear_cache(self):
         self.level_type_2_route_list.clear()
+        self.level_type_2_route_index.clear()
 
     def match_best_sim_uni_route(self, uni_num: int, level_type: SimUniLevelType, mm: MatLike) -> Optional[SimUniRoute]:
         """
         根据开始点的小地图的截图 找到最合适的路线
+        先使用索引找出开始点最相似的几条路线 只对这几条进行模板匹配 都匹配失败时才逐条匹配
         :param uni_num: 第几宇宙
         :param level_type: 楼层类型
         :param mm: 开始点的小地图截图
         :return:
         """
         route_list = self.get_route_list(level_type)
+        route_index = self.get_route_index(level_type)
+        template = cv2_utils.crop_image_only(mm, START_MM_CROP_RECT)
+
+        nearest_idx_list = route_index.find_nearest_route_idx(mm, _VERIFY_ROUTE_CNT)
+        target_route, target_mr = self._match_best_in_route_list(
+            uni_num, [route_list[i] for i in sorted(nearest_idx_list)], template)
+
+        if target_route is None:
+            nearest_idx_set = set(nearest_idx_list)
+            target_route, target_mr = self._match_best_in_route_list(
+                uni_num, [route for idx, route in enumerate(route_list) if idx not in nearest_idx_set], template)
+
+        if target_route is not None and uni_num not in target_route.support_world:
+            target_route.add_support_world(uni_num)
+            target_route.save()
+
+        if target_mr is not None:
+            log.debug(f'当前匹配路线置信度 {target_mr.confidence:.2f}')
+
+        return target_route
+
+    @staticmethod
+    def _match_best_in_route_list(uni_num: int, route_list: List[SimUniRoute],
+                                  template: MatLike) -> tuple[Optional[SimUniRoute], Optional[MatchResult]]:
+        """
+        在路线列表中 逐条使用模板匹配 找到最合适的路线
+        :param uni_num: 第几宇宙
+        :param route_list: 路线列表
+        :param template: 当前小地图的中间部分
+        :return: 最合适的路线 和匹配结果
+        """
         target_route: Optional[SimUniRoute] = None
         target_mr: Optional[MatchResult] = None
 
@@ -78,12 +126,10 @@ class SimUniRouteData:
                 if (uni_num in route.support_world) != same_world:
                     continue
                 source = route.mm
-                template = cv2_utils.crop_image_only(mm, Rect(30, 30, 160, 160))
                 mr = cv2_utils.match_template(source, template, threshold=0.6, only_best=True)
 
                 if mr.max is None and route.mm2 is not None:
                     source = route.mm2
-                    template, _ = cv2_utils.crop_image(mm, Rect(30, 30, 160, 160))
                     mr = cv2_utils.match_template(source, template, threshold=0.6, only_best=True)
 
                 if mr.max is None:
@@ -93,13 +139,4 @@ class SimUniRouteData:
                     target_route = route
                     target_mr = mr.max
 
-        if target_route is not None and uni_num not in target_route.support_world:
-            target_route.add_support_world(uni_num)
-            target_route.save()
-
-        if target_mr is not None:
-            log.debug(f'当前匹配路线置信度 {target_mr.confidence:.2f}')
-
-        return target_route
-
-
+        return target_route, target_mr
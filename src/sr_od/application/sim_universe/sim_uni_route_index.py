@@ -0,0 +1,95 @@
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils import cv2_utils
+from sr_od.application.sim_universe.sim_uni_route import SimUniRoute
+
+START_MM_CROP_RECT: Rect = Rect(30, 30, 160, 160)  # 匹配路线时 使用当前小地图的中间部分
+_THUMBNAIL_SCALE: int = 4  # 缩略图缩小的倍数
+
+
+class SimUniRouteIndex:
+
+    def __init__(self, route_list: List[SimUniRoute]):
+        """
+        一个楼层类型下 所有路线开始点小地图的索引 在加载路线时建立
+        - 每条路线开始点的小地图(mm 和 mm2) 缩小成灰度缩略图 横向拼接成一张图
+        - 查找时把当前小地图的中间部分同样缩小 在拼接图上只匹配一次 就得到和每条路线的相似度
+        - 相似度最高的几条路线 再由调用方使用原尺寸的模板匹配确认
+
+        :param route_list: 同一个楼层类型的路线
+        """
+        self.route_list: List[SimUniRoute] = route_list
+
+        self._thumbnail_size: int = 0  # 缩略图的边长
+        self._thumbnail_strip: Optional[np.ndarray] = None  # 所有缩略图横向拼接
+        self._entry_route_idx: Optional[np.ndarray] = None  # 拼接图中每个缩略图对应的路线下标
+
+        thumbnail_list: List[np.ndarray] = []
+        entry_route_idx: List[int] = []
+        for idx, route in enumerate(route_list):
+            for mm in [route.mm, route.mm2]:
+                thumbnail = SimUniRouteIndex.get_thumbnail(mm)
+                if thumbnail is None:
+                    continue
+                if len(thumbnail_list) > 0 and thumbnail.shape != thumbnail_list[0].shape:
+                    continue
+                thumbnail_list.append(thumbnail)
+                entry_route_idx.append(idx)
+
+        if len(thumbnail_list) > 0:
+            self._thumbnail_size = thumbnail_list[0].shape[1]
+            self._thumbnail_strip = np.ascontiguousarray(np.hstack(thumbnail_list))
+            self._entry_route_idx = np.array(entry_route_idx, dtype=np.int32)
+
+    @staticmethod
+    def get_thumbnail(mm: Optional[MatLike]) -> Optional[np.ndarray]:
+        """
+        小地图的缩略图 灰度并缩小
+        :param mm: 小地图
+        :return:
+        """
+        if mm is None:
+            return None
+        gray = cv2.cvtColor(mm, cv2.COLOR_RGB2GRAY) if len(mm.shape) == 3 else mm
+        return cv2.resize(gray, (gray.shape[1] // _THUMBNAIL_SCALE, gray.shape[0] // _THUMBNAIL_SCALE),
+                          interpolation=cv2.INTER_AREA)
+
+    def find_nearest_route_idx(self, mm: MatLike, top_n: int) -> List[int]:
+        """
+        找出开始点小地图和当前小地图最相似的几条路线
+        :param mm: 当前小地图
+        :param top_n: 返回的路线数量
+        :return: 路线下标 按相似度从高到低
+        """
+        if self._thumbnail_strip is None:
+            return []
+
+        query = SimUniRouteIndex.get_thumbnail(cv2_utils.crop_image_only(mm, START_MM_CROP_RECT))
+        if (query is None
+                or query.shape[0] > self._thumbnail_strip.shape[0]
+                or query.shape[1] > self._thumbnail_size):
+            return []
+
+        result = cv2.matchTemplate(self._thumbnail_strip, query, cv2.TM_CCOEFF_NORMED)
+        result[~np.isfinite(result)] = -1
+
+        # 每个缩略图中的最大值 跨越两个缩略图的位置不算
+        entry_cnt = len(self._entry_route_idx)
+        valid_width = self._thumbnail_size - query.shape[1] + 1
+        result = np.pad(result, ((0, 0), (0, entry_cnt * self._thumbnail_size - result.shape[1])), constant_values=-1)
+        entry_score = result.reshape(result.shape[0], entry_cnt, self._thumbnail_size)[:, :, :valid_width].max(axis=(0, 2))
+
+        route_score = np.full(len(self.route_list), -np.inf, dtype=np.float32)
+        np.maximum.at(route_score, self._entry_route_idx, entry_score)
+
+        route_idx_list: List[int] = []
+        for idx in np.argsort(-route_score, kind='stable')[:top_n]:
+            if route_score[idx] == -np.inf:
+                break
+            route_idx_list.append(int(idx))
+        return route_idx_list
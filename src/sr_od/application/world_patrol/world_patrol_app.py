@@ -94,6 +94,8 @@ class WorldPatrolApp(SrApplication):
         if self.current_route_idx >= len(self.route_list):
             return self.round_success(WorldPatrolApp.STATUS_ALL_ROUTE_FINISHED)
         route = self.route_list[self.current_route_idx]
+        if self.current_route_idx + 1 < len(self.route_list):  # 运行当前路线时 在后台加载下一条路线的大地图
+            self.ctx.map_data.prefetch_large_map_info(self.route_list[self.current_route_idx + 1].tp.region)
 
         self.current_route_start_time = time.time()
         op = WorldPatrolRunRoute(self.ctx, route)
@@ -1,21 +1,130 @@
+import copy
 import os
+import threading
 from typing import List, Optional
 
-from one_dragon.base.config.yaml_operator import YamlOperator
-from one_dragon.utils import os_utils
+from one_dragon.utils import i18_utils, os_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from sr_od.application.world_patrol import world_patrol_route_utils
+from sr_od.application.world_patrol.world_patrol_route_index import WorldPatrolRouteIndex, WorldPatrolRouteIndexItem
 from sr_od.sr_map.sr_map_data import SrMapData
 from sr_od.sr_map.sr_map_def import Planet, Region, SpecialPoint
 from sr_od.application.world_patrol.world_patrol_route import WorldPatrolRoute
 from sr_od.application.world_patrol.world_patrol_whitelist_config import WorldPatrolWhitelist, WorldPatrolWhiteListType
 
 
+class _IndexedRoute:
+
+    def __init__(self, item: WorldPatrolRouteIndexItem, planet: Planet, region: Region, tp: SpecialPoint):
+        """
+        匹配好星球、区域和传送点的路线
+        """
+        self.item: WorldPatrolRouteIndexItem = item
+        self.planet: Planet = planet
+        self.region: Region = region
+        self.tp: SpecialPoint = tp
+
+    def to_route(self) -> WorldPatrolRoute:
+        # 路线会在画图页面被修改 每次都使用新的数据
+        return WorldPatrolRoute(self.tp, copy.deepcopy(self.item.route_data), self.item.file_path)
+
+
 class WorldPatrolRouteData:
 
     def __init__(self, map_data: SrMapData):
         self.map_data: SrMapData = map_data
+        self.route_index: WorldPatrolRouteIndex = WorldPatrolRouteIndex()
+
+        self._lock = threading.Lock()
+        self._catalog_key: Optional[tuple] = None  # 建立目录时的 (索引版本, 语言)
+        self._match_cache: dict[str, tuple[tuple, Optional[_IndexedRoute]]] = {}  # 路线文件路径 -> (文件版本和语言, 匹配结果)
+        self._route_list: List[_IndexedRoute] = []  # 按星球和文件夹排序的全部路线
+        self._route_id_map: dict[str, _IndexedRoute] = {}  # key=路线unique_id
+        self._planet_route_map: dict[str, List[_IndexedRoute]] = {}  # key=星球np_id
+        self._region_route_map: dict[str, List[_IndexedRoute]] = {}  # key=区域pr_id 忽略楼层
+
+    def _get_route_dir_list(self) -> List[str]:
+        """
+        所有路线文件夹 按星球顺序 公共路线在前
+        """
+        route_dir_list: List[str] = []
+        for planet in self.map_data.planet_list:
+            for is_personal in [False, True]:
+                route_dir_list.append(world_patrol_route_utils.get_planet_route_dir(planet, personal=is_personal))
+        return route_dir_list
+
+    def _refresh_catalog(self) -> None:
+        """
+        更新路线目录 只有文件变化或者语言变化时 才需要重建
+        """
+        route_dir_list = self._get_route_dir_list()
+        self.route_index.refresh(route_dir_list)
+
+        catalog_key = (self.route_index.version, i18_utils.get_default_lang())
+        if self._catalog_key == catalog_key:
+            return
+
+        with self._lock:
+            if self._catalog_key == catalog_key:
+                return
+
+            dir_item_map: dict[str, List[WorldPatrolRouteIndexItem]] = {}
+            for item in self.route_index.get_item_list():
+                dir_item_map.setdefault(os.path.dirname(item.file_path), []).append(item)
+
+            route_list: List[_IndexedRoute] = []
+            match_cache: dict[str, tuple[tuple, Optional[_IndexedRoute]]] = {}
+            for route_dir in route_dir_list:
+                for item in dir_item_map.pop(route_dir, []):
+                    match_key = (item.mtime_ns, item.size, catalog_key[1])
+                    cached = self._match_cache.get(item.file_path)
+                    if cached is not None and cached[0] == match_key:
+                        indexed_route = cached[1]
+                    else:
+                        indexed_route = self._match_route(item)
+                    match_cache[item.file_path] = (match_key, indexed_route)
+                    if indexed_route is not None:
+                        route_list.append(indexed_route)
+
+            route_id_map: dict[str, _IndexedRoute] = {}
+            planet_route_map: dict[str, List[_IndexedRoute]] = {}
+            region_route_map: dict[str, List[_IndexedRoute]] = {}
+            for indexed_route in route_list:
+                route_id_map[indexed_route.item.unique_id] = indexed_route
+                planet_route_map.setdefault(indexed_route.planet.np_id, []).append(indexed_route)
+                region_route_map.setdefault(indexed_route.region.pr_id, []).append(indexed_route)
+
+            self._match_cache = match_cache
+            self._route_list = route_list
+            self._route_id_map = route_id_map
+            self._planet_route_map = planet_route_map
+            self._region_route_map = region_route_map
+            self._catalog_key = catalog_key
+
+    def _match_route(self, item: WorldPatrolRouteIndexItem) -> Optional[_IndexedRoute]:
+        """
+        匹配路线的星球、区域和传送点
+        :param item: 路线文件的解析结果
+        :return: 无法匹配时返回None
+        """
+        route_filename = os.path.basename(item.file_path)
+        planet = self.map_data.best_match_planet_by_name(item.planet_name)
+        if planet is None:
+            log.error(f'路线 {route_filename} 无法匹配星球')
+            return None
+
+        region = self.map_data.best_match_region_by_name(item.region_name, planet, target_floor=item.floor)
+        if region is None:
+            log.error(f'路线 {route_filename} 无法匹配区域')
+            return None
+
+        tp = self.map_data.best_match_sp_by_name(region, gt(item.tp_name, 'ocr'))
+        if tp is None:
+            log.error(f'路线 {route_filename} 无法匹配传送点')
+            return None
+
+        return _IndexedRoute(item, planet, region, tp)
 
     def load_all_route(self, whitelist: WorldPatrolWhitelist = None, finished: List[str] = None,
                        target_planet: Optional[Planet] = None,
@@ -35,47 +144,62 @@ class WorldPatrolRouteData:
         """
         # 需要排除的部分
         finished_unique_id = [] if finished is None else finished
+        finished_id_set = set(finished_unique_id)
+        whitelist_id_set = None if whitelist is None else set(whitelist.list)
+
+        self._refresh_catalog()
+        if target_region is not None:
+            candidate_list = self._region_route_map.get(target_region.pr_id, [])
+        elif target_planet is not None:
+            candidate_list = self._planet_route_map.get(target_planet.np_id, [])
+        else:
+            candidate_list = self._route_list
 
         route_list: List[WorldPatrolRoute] = []
-
-        for planet in self.map_data.planet_list:
-            for is_public in [True, False]:
-                is_personal = not is_public
-                if is_public and not include_public:
+        for indexed_route in candidate_list:
+            item = indexed_route.item
+            if item.is_personal and not include_personal:
+                continue
+            if not item.is_personal and not include_public:
+                continue
+            if target_planet is not None and target_planet.np_id != indexed_route.planet.np_id:
+                continue
+            if item.unique_id in finished_id_set:
+                continue
+            if whitelist is not None:
+                if whitelist.type == 'white' and item.unique_id not in whitelist_id_set:
                     continue
-                if is_personal and not include_personal:
+                if whitelist.type == 'black' and item.unique_id in whitelist_id_set:
                     continue
-
-                planet_dir = world_patrol_route_utils.get_planet_route_dir(planet, personal=is_personal)
-
-                for route_filename in os.listdir(planet_dir):
-                    if not route_filename.endswith('.yml'):
-                        continue
-
-                    route_path = os.path.join(planet_dir, route_filename)
-                    route = self.load_route_by_yaml_path(route_path,
-                                                         target_planet=target_planet,
-                                                         target_region=target_region,
-                                                         finished_unique_id=finished_unique_id,
-                                                         whitelist=whitelist)
-                    if route is not None:
-                        route_list.append(route)
+            route_list.append(indexed_route.to_route())
 
         log.info('最终加载 %d 条线路 过滤已完成 %d 条 使用名单 %s',
                  len(route_list), len(finished_unique_id), 'None' if whitelist is None else whitelist.name)
 
         # 白名单的情况下 按照白名单的顺序返回
         if whitelist is not None and whitelist.type == WorldPatrolWhiteListType.WHITE.value.value:
+            route_id_map: dict[str, WorldPatrolRoute] = {}
+            for route in route_list:
+                route_id_map.setdefault(route.unique_id, route)
             sorted_route_list = []
             for target_route_id in whitelist.list:
-                for route in route_list:
-                    if route.unique_id == target_route_id:
-                        sorted_route_list.append(route)
-                        break
+                route = route_id_map.get(target_route_id)
+                if route is not None:
+                    sorted_route_list.append(route)
             return sorted_route_list
         else:
             return route_list
 
+    def get_route_by_unique_id(self, unique_id: str) -> Optional[WorldPatrolRoute]:
+        """
+        按唯一标识获取路线
+        :param unique_id: 路线的唯一标识
+        :return:
+        """
+        self._refresh_catalog()
+        indexed_route = self._route_id_map.get(unique_id)
+        return None if indexed_route is None else indexed_route.to_route()
+
     def load_route_by_yaml_path(self, yaml_path: str,
                                 target_planet: Optional[Planet] = None,
                                 target_region: Optional[Region] = None,
@@ -88,48 +212,33 @@ class WorldPatrolRouteData:
         :param whitelist: 传入后 按名单筛选路线
         :param finished_unique_id: 传入后 排除已经完成的路线
         """
-        yaml_op = YamlOperator(yaml_path)
-        route_filename = os.path.basename(yaml_path)
-
-        planet_name = yaml_op.get('planet', None)
-        region_name = yaml_op.get('region', None)
-        floor = yaml_op.get('floor', None)
-        tp_name = yaml_op.get('tp', None)
-
-        planet = self.map_data.best_match_planet_by_name(planet_name)
-        if planet is None:
-            log.error(f'路线 {route_filename} 无法匹配星球')
-            return
-
-        if target_planet is not None and target_planet.np_id != planet.np_id:
-            return
+        stat = os.stat(yaml_path)
+        item = WorldPatrolRouteIndex.parse_route_file(yaml_path, stat.st_mtime_ns, stat.st_size)
+        if item is None:
+            return None
 
-        region = self.map_data.best_match_region_by_name(region_name, planet, target_floor=floor)
-        if region is None:
-            log.error(f'路线 {route_filename} 无法匹配区域')
-            return
+        indexed_route = self._match_route(item)
+        if indexed_route is None:
+            return None
 
-        if target_region is not None and target_region.pr_id != region.pr_id:
-            return
+        if target_planet is not None and target_planet.np_id != indexed_route.planet.np_id:
+            return None
 
-        tp = self.map_data.best_match_sp_by_name(region, gt(tp_name, 'ocr'))
-        if tp is None:
-            log.error(f'路线 {route_filename} 无法匹配传送点')
-            return
+        if target_region is not None and target_region.pr_id != indexed_route.region.pr_id:
+            return None
 
-        route = WorldPatrolRoute(tp, yaml_op.data, yaml_path)
-        route_id = route.unique_id
+        route_id = item.unique_id
 
         if finished_unique_id is not None and route_id in finished_unique_id:
-            return
+            return None
 
         if whitelist is not None:
             if whitelist.type == 'white' and route_id not in whitelist.list:
-                return
+                return None
             if whitelist.type == 'black' and route_id in whitelist.list:
-                return
+                return None
 
-        return route
+        return indexed_route.to_route()
 
     @staticmethod
     def get_personal_route_dir() -> str:
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from typing import Any, List, Optional
+
+from one_dragon.utils import os_utils, yaml_utils
+from one_dragon.utils.log_utils import log
+
+_INDEX_VERSION: int = 1  # 索引内容有变化时修改 旧的索引文件会被忽略
+
+
+class WorldPatrolRouteIndexItem:
+
+    def __init__(self, file_path: str, mtime_ns: int, size: int, route_data: dict):
+        """
+        一个路线文件的解析结果
+        :param file_path: 路线文件路径
+        :param mtime_ns: 解析时的文件修改时间
+        :param size: 解析时的文件大小
+        :param route_data: 路线文件的内容
+        """
+        self.file_path: str = file_path
+        self.mtime_ns: int = mtime_ns
+        self.size: int = size
+        self.route_data: dict = route_data
+
+        file_name = os.path.basename(file_path)[:-4]
+        self.is_personal: bool = file_path.find('personal') != -1  # 同 WorldPatrolRoute.is_personal
+        self.unique_id: str = f'personal_{file_name}' if self.is_personal else file_name  # 同 WorldPatrolRoute.unique_id
+
+        self.planet_name: Optional[str] = route_data.get('planet', None)
+        self.region_name: Optional[str] = route_data.get('region', None)
+        self.floor: Optional[int] = route_data.get('floor', None)
+        self.tp_name: Optional[str] = route_data.get('tp', None)
+        self.author_list: List[str] = route_data.get('author', None) or []
+        self.op_cnt: int = len(route_data.get('route', None) or [])
+
+    def is_same_file(self, mtime_ns: int, size: int) -> bool:
+        """
+        文件是否没有变化
+        """
+        return self.mtime_ns == mtime_ns and self.size == size
+
+    def to_dict(self) -> dict:
+        return {
+            'file_path': self.file_path,
+            'mtime_ns': self.mtime_ns,
+            'size': self.size,
+            'route_data': self.route_data,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'WorldPatrolRouteIndexItem':
+        return WorldPatrolRouteIndexItem(data['file_path'], data['mtime_ns'], data['size'], data['route_data'])
+
+
+class WorldPatrolRouteIndex:
+
+    def __init__(self, cache_file_path: Optional[str] = None):
+        """
+        路线文件的索引
+        - 按文件修改时间和大小判断是否需要重新解析 只解析有变化的文件
+        - 解析结果保存到磁盘 下次启动时不需要重新解析所有路线文件
+
+        :param cache_file_path: 索引的保存路径 默认为 .cache/world_patrol_route_index.json
+        """
+        if cache_file_path is None:
+            cache_file_path = os.path.join(os_utils.get_path_under_work_dir('.cache'), 'world_patrol_route_index.json')
+        self.cache_file_path: str = cache_file_path
+
+        self._lock = threading.Lock()
+        self._loaded: bool = False  # 是否已经读取过保存的索引
+        self._item_map: dict[str, WorldPatrolRouteIndexItem] = {}  # key=文件路径
+        self.version: int = 0  # 每次内容变化时增加 用于判断使用方是否需要重建
+
+    def refresh(self, route_dir_list: List[str]) -> None:
+        """
+        按目录中的文件 更新索引
+        :param route_dir_list: 路线文件夹列表
+        :return:
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load_cache()
+                self._loaded = True
+
+            changed: bool = False
+            existed_path_set: set[str] = set()
+            for route_dir in route_dir_list:
+                if not os.path.isdir(route_dir):
+                    continue
+                for route_filename in os.listdir(route_dir):
+                    if not route_filename.endswith('.yml'):
+                        continue
+                    route_path = os.path.join(route_dir, route_filename)
+                    try:
+                        stat = os.stat(route_path)
+                    except OSError:
+                        continue
+                    existed_path_set.add(route_path)
+
+                    item = self._item_map.get(route_path)
+                    if item is not None and item.is_same_file(stat.st_mtime_ns, stat.st_size):
+                        continue
+
+                    new_item = self.parse_route_file(route_path, stat.st_mtime_ns, stat.st_size)
+                    if new_item is None:
+                        if item is not None:
+                            del self._item_map[route_path]
+                            changed = True
+                        continue
+                    self._item_map[route_path] = new_item
+                    changed = True
+
+            for route_path in list(self._item_map.keys()):
+                if route_path not in existed_path_set:
+                    del self._item_map[route_path]
+                    changed = True
+
+            if changed:
+                self.version += 1
+                self._save_cache()
+
+    def get_item_list(self) -> List[WorldPatrolRouteIndexItem]:
+        """
+        按文件路径排序的全部索引
+        """
+        with self._lock:
+            return [self._item_map[k] for k in sorted(self._item_map.keys())]
+
+    @staticmethod
+    def parse_route_file(route_path: str, mtime_ns: int, size: int) -> Optional[WorldPatrolRouteIndexItem]:
+        """
+        解析一个路线文件
+        :param route_path: 路线文件路径
+        :param mtime_ns: 文件修改时间
+        :param size: 文件大小
+        :return: 读取失败时返回None
+        """
+        try:
+            with open(route_path, 'r', encoding='utf-8') as file:
+                route_data = yaml_utils.safe_load(file)
+        except Exception:
+            log.error('路线文件读取失败 %s', route_path, exc_info=True)
+            return None
+        if not isinstance(route_data, dict):
+            log.error('路线文件格式错误 %s', route_path)
+            return None
+        return WorldPatrolRouteIndexItem(route_path, mtime_ns, size, route_data)
+
+    def _load_cache(self) -> None:
+        if not os.path.exists(self.cache_file_path):
+            return
+        try:
+            with open(self.cache_file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') != _INDEX_VERSION:
+                return
+            for item_data in data.get('item_list', []):
+                item = WorldPatrolRouteIndexItem.from_dict(item_data)
+                self._item_map[item.file_path] = item
+        except Exception:
+            log.error('路线索引读取失败 将重新建立 %s', self.cache_file_path, exc_info=True)
+            self._item_map = {}
+
+    def _save_cache(self) -> None:
+        data: dict[str, Any] = {
+            'version': _INDEX_VERSION,
+            'item_list': [i.to_dict() for i in self._item_map.values()],
+        }
+        temp_path = self.cache_file_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False)
+            os.replace(temp_path, self.cache_file_path)
+        except Exception:
+            log.error('路线索引保存失败 %s', self.cache_file_path, exc_info=True)
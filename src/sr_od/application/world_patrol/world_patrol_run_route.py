@@ -65,9 +65,28 @@ class WorldPatrolRunRoute(SrOperation):
         log.info('感谢以下人员提供本路线 %s', self.route.author_list)
 
         self.ctx.ban_technique = False  # 每条路线开始前 重置
+        self.prefetch_large_map()
 
         return None
 
+    def prefetch_large_map(self) -> None:
+        """
+        在后台预加载路线会经过的大地图 传送和移动时加载好 切换区域时不需要等待
+        :return:
+        """
+        region = self.route.tp.region
+        map_data = self.ctx.map_data
+        map_data.prefetch_large_map_info(region)
+        for route_item in self.route.route_list:
+            if route_item.op == operation_const.OP_ENTER_SUB:
+                region = map_data.get_sub_region_by_cn(region, route_item.data[0], int(route_item.data[1]))
+                map_data.prefetch_large_map_info(region)
+            elif route_item.op in [operation_const.OP_MOVE, operation_const.OP_SLOW_MOVE] and len(route_item.data) > 2:
+                region = map_data.region_with_another_floor(region, int(route_item.data[2]))
+                map_data.prefetch_large_map_info(region)
+            if region is None:  # 路线配置有误 由执行时处理
+                break
+
     @operation_node(name='传送', is_start_node=True)
     def transport(self) -> OperationRoundResult:
         op = TransportByMap(self.ctx, self.route.tp)
@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from one_dragon.utils import str_utils
+from one_dragon.utils.fuzzy_index import FuzzyIndex
 from one_dragon.utils.i18_utils import gt
 
 
@@ -350,21 +350,27 @@ CHARACTER_LIST: List[Character] = [
 ]
 
 
+_CHARACTER_NAME_INDEX: FuzzyIndex[Character] = FuzzyIndex(CHARACTER_LIST, lambda c: gt(c.cn))
+
+
 def filter_character_list(destiny_id: Optional[str] = None,
                           combat_type_id: Optional[str] = None,
                           level: Optional[int] = None,
                           character_name: Optional[str] = None) -> List[Character]:
     filter_list = []
 
-    for c in CHARACTER_LIST:
+    if character_name is not None:
+        character_list = _CHARACTER_NAME_INDEX.filter_by_lcs(character_name, percent=1)
+    else:
+        character_list = CHARACTER_LIST
+
+    for c in character_list:
         if destiny_id is not None and c.path.id != destiny_id:
             continue
         if combat_type_id is not None and c.combat_type.id != combat_type_id:
             continue
         if level is not None and c.level != level:
             continue
-        if character_name is not None and not str_utils.find_by_lcs(character_name, gt(c.cn), percent=1):
-            continue
 
         filter_list.append(c)
 
@@ -1,5 +1,7 @@
 from concurrent.futures import ThreadPoolExecutor
 
+from sr_od.sr_map.mm_icon_feature_index import MM_ICON_PREFIX_LIST
+
 
 class SrPreheatContext:
 
@@ -29,15 +31,13 @@ class SrPreheatContext:
         预热小地图图标
         :return:
         """
-        for prefix in ['mm_tp', 'mm_sp', 'mm_boss', 'mm_sub']:
-            for i in range(100):
-                if i == 0:
-                    continue
-
-                template_id = '%s_%02d' % (prefix, i)
-                t = self.ctx.template_loader.get_template('mm_icon', template_id)
-                if t is None:
-                    break
-                _ = t.gray
-                _ = t.features
+        for template_id in self.ctx.template_loader.list_template_id('mm_icon'):
+            if not any(template_id.startswith(prefix + '_') for prefix in MM_ICON_PREFIX_LIST):
+                continue
+            t = self.ctx.template_loader.get_template('mm_icon', template_id)
+            if t is None:
+                continue
+            _ = t.gray
+            _ = t.features
+        self.ctx.mm_icon_feature_index.build()
 
@@ -34,6 +34,7 @@ from sr_od.context.sr_pc_controller import SrPcController
 from sr_od.interastral_peace_guide.guide_data import SrGuideData
 from sr_od.screen_state.yolo_screen_detector import YoloScreenDetector
 from sr_od.sr_map.sr_map_data import SrMapData
+from sr_od.sr_map.mm_icon_feature_index import MmIconFeatureIndex
 
 
 class TeamInfo:
@@ -173,6 +174,7 @@ class SrContext(OneDragonContext):
         self.world_patrol_route_data: WorldPatrolRouteData = WorldPatrolRouteData(self.map_data)
         self.sim_uni_route_data: SimUniRouteData = SimUniRouteData(self.map_data)
         self.guide_data: SrGuideData = SrGuideData()
+        self.mm_icon_feature_index: MmIconFeatureIndex = MmIconFeatureIndex(self.template_loader)
 
         self.pos_info: ContextPosInfo = ContextPosInfo()
         self.team_info: TeamInfo = TeamInfo()
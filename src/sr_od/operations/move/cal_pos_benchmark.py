@@ -0,0 +1,227 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import os
+from typing import List, Optional
+
+from one_dragon.base.config.yaml_operator import YamlOperator
+from one_dragon.base.matcher.match_result import MatchResult
+from one_dragon.utils import cv2_utils, os_utils, cal_utils
+from one_dragon.utils.log_utils import log
+from sr_od.context.sr_context import SrContext
+from sr_od.operations.move import cal_pos_utils
+from sr_od.operations.move.cal_pos_utils import CalPosRecord
+from sr_od.sr_map import mini_map_utils, large_map_utils
+from sr_od.sr_map.sr_map_def import Region
+
+
+class CalPosSampleResult:
+
+    def __init__(self, prl_id: str, case_id: str, record: CalPosRecord,
+                 expected: MatchResult, result: Optional[MatchResult],
+                 cost: float, max_error: float):
+        """
+        一个样例的定位结果
+        """
+        self.prl_id: str = prl_id
+        self.case_id: str = case_id
+        self.record: CalPosRecord = record
+        self.expected: MatchResult = expected
+        self.result: Optional[MatchResult] = result
+        self.cost: float = cost  # 耗时 毫秒
+
+        self.error: Optional[float] = None  # 与真实坐标的距离
+        if result is not None:
+            self.error = cal_utils.distance_between(result.center, expected.center)
+        self.correct: bool = self.error is not None and self.error <= max_error
+
+    def to_dict(self) -> dict:
+        return {
+            'prl_id': self.prl_id,
+            'case_id': self.case_id,
+            'strategy': self.record.strategy,
+            'tried_strategy_list': self.record.tried_strategy_list,
+            'scale_cnt': len(self.record.scale_list),
+            'cost': round(self.cost, 3),
+            'error': None if self.error is None else round(self.error, 2),
+            'correct': self.correct,
+        }
+
+
+def _percentile(cost_list: List[float], q: float) -> Optional[float]:
+    if len(cost_list) == 0:
+        return None
+    return round(float(np.percentile(cost_list, q)), 3)
+
+
+def summarize(result_list: List[CalPosSampleResult]) -> dict:
+    """
+    汇总定位结果
+    :param result_list: 样例结果
+    :return:
+    """
+    total = len(result_list)
+    cost_list = [i.cost for i in result_list]
+
+    strategy_map: dict[str, dict] = {}
+    for i in result_list:
+        for strategy in i.record.tried_strategy_list:
+            if strategy not in strategy_map:
+                strategy_map[strategy] = {'tried': 0, 'hit': 0, 'correct': 0}
+            strategy_map[strategy]['tried'] += 1
+        if i.record.strategy is not None:
+            if i.record.strategy not in strategy_map:
+                strategy_map[i.record.strategy] = {'tried': 0, 'hit': 0, 'correct': 0}
+            strategy_map[i.record.strategy]['hit'] += 1
+            if i.correct:
+                strategy_map[i.record.strategy]['correct'] += 1
+    for v in strategy_map.values():
+        v['hit_rate'] = round(v['hit'] / v['tried'], 4) if v['tried'] > 0 else None
+
+    return {
+        'total': total,
+        'found': len([i for i in result_list if i.result is not None]),
+        'correct': len([i for i in result_list if i.correct]),
+        'accuracy': round(len([i for i in result_list if i.correct]) / total, 4) if total > 0 else None,
+        'cost_p50': _percentile(cost_list, 50),
+        'cost_p95': _percentile(cost_list, 95),
+        'cost_p99': _percentile(cost_list, 99),
+        'avg_scale_cnt': round(sum(len(i.record.scale_list) for i in result_list) / total, 2) if total > 0 else None,
+        'strategy': strategy_map,
+    }
+
+
+def run_benchmark(ctx: SrContext,
+                  base_dir: Optional[str] = None,
+                  sim_uni: bool = False,
+                  running: bool = False,
+                  real_move_time: float = 0,
+                  pyramid: bool = False,
+                  move_distance: Optional[float] = None,
+                  max_error: float = 5,
+                  prl_id_list: Optional[List[str]] = None) -> dict:
+    """
+    使用 record_pos_utils.save_sample 保存的样例 回放计算坐标 统计准确率和耗时
+    :param ctx: 上下文
+    :param base_dir: 样例所在的文件夹 默认为 .debug/gps
+    :param sim_uni: 是否模拟宇宙的样例
+    :param running: 是否按移动中计算
+    :param real_move_time: 按移动中计算时 使用的移动时间
+    :param pyramid: 是否使用金字塔匹配
+    :param move_distance: 在真实坐标附近多大的范围内搜索 不传入时搜索整张大地图
+    :param max_error: 与真实坐标距离多少以内认为是正确的
+    :param prl_id_list: 只评估特定的区域
+    :return: 评估结果
+    """
+    if base_dir is None:
+        base_dir = os_utils.get_path_under_work_dir('.debug', 'gps')
+
+    region_map: dict[str, Region] = {i.prl_id: i for i in ctx.map_data.region_list}
+    result_list: List[CalPosSampleResult] = []
+    region_result_map: dict[str, List[CalPosSampleResult]] = {}
+
+    for prl_id in sorted(os.listdir(base_dir)):
+        if prl_id_list is not None and prl_id not in prl_id_list:
+            continue
+        region = region_map.get(prl_id)
+        if region is None:
+            log.error('找不到区域 %s 跳过', prl_id)
+            continue
+        lm_info = ctx.map_data.get_large_map_info(region)
+
+        prl_dir = os.path.join(base_dir, prl_id)
+        for case_id in sorted(os.listdir(prl_dir)):
+            case_dir = os.path.join(prl_dir, case_id)
+            mm = cv2_utils.read_image(os.path.join(case_dir, 'mm.png'))
+            if mm is None:
+                continue
+            yml = YamlOperator(os.path.join(case_dir, 'pos.yml'))
+            expected = MatchResult(1, yml.get('x'), yml.get('y'), yml.get('w'), yml.get('h'),
+                                   template_scale=yml.get('template_scale'))
+
+            lm_rect = None
+            if move_distance is not None:
+                lm_rect = large_map_utils.get_large_map_rect_by_pos(
+                    lm_info.gray.shape, mm.shape[:2],
+                    (expected.center.x, expected.center.y, move_distance))
+
+            record = CalPosRecord()
+            start_time = time.perf_counter()
+            try:
+                mm_info = mini_map_utils.analyse_mini_map(mm)
+                if sim_uni:
+                    result = cal_pos_utils.sim_uni_cal_pos(
+                        ctx, lm_info, mm_info, lm_rect=lm_rect,
+                        running=running, real_move_time=real_move_time,
+                        pyramid=pyramid, record=record)
+                else:
+                    result = cal_pos_utils.cal_character_pos(
+                        ctx, lm_info, mm_info, lm_rect=lm_rect,
+                        running=running, real_move_time=real_move_time,
+                        pyramid=pyramid, record=record)
+            except Exception:
+                log.error('计算坐标失败 %s %s', prl_id, case_id, exc_info=True)
+                result = None
+            cost = (time.perf_counter() - start_time) * 1000
+
+            sample_result = CalPosSampleResult(prl_id, case_id, record, expected, result, cost, max_error)
+            result_list.append(sample_result)
+            region_result_map.setdefault(prl_id, []).append(sample_result)
+            if not sample_result.correct:
+                log.info('定位错误 %s %s 误差 %s', prl_id, case_id, sample_result.error)
+
+    return {
+        'config': {
+            'base_dir': base_dir,
+            'sim_uni': sim_uni,
+            'running': running,
+            'real_move_time': real_move_time,
+            'pyramid': pyramid,
+            'move_distance': move_distance,
+            'max_error': max_error,
+        },
+        'summary': summarize(result_list),
+        'region': {k: summarize(v) for k, v in region_result_map.items()},
+        'sample': [i.to_dict() for i in result_list],
+    }
+
+
+def __debug():
+    parser = argparse.ArgumentParser(description='回放 .debug/gps 下的样例 评估计算坐标的准确率和耗时')
+    parser.add_argument('--base-dir', type=str, default=None, help='样例所在的文件夹 默认为 .debug/gps')
+    parser.add_argument('--output', type=str, default=None, help='结果保存的json文件 默认保存在 .debug/cal_pos_benchmark')
+    parser.add_argument('--sim-uni', action='store_true', help='模拟宇宙的样例')
+    parser.add_argument('--running', action='store_true', help='按移动中计算坐标')
+    parser.add_argument('--real-move-time', type=float, default=0, help='按移动中计算时 使用的移动时间')
+    parser.add_argument('--pyramid', action='store_true', help='使用金字塔匹配')
+    parser.add_argument('--move-distance', type=float, default=None, help='在真实坐标附近多大的范围内搜索 不传入时搜索整张大地图')
+    parser.add_argument('--max-error', type=float, default=5, help='与真实坐标距离多少以内认为是正确的')
+    parser.add_argument('--region', type=str, nargs='*', default=None, help='只评估特定的区域 prl_id')
+    args = parser.parse_args()
+
+    ctx = SrContext()
+    ctx.init_by_config()
+
+    result = run_benchmark(ctx, base_dir=args.base_dir, sim_uni=args.sim_uni,
+                           running=args.running, real_move_time=args.real_move_time,
+                           pyramid=args.pyramid, move_distance=args.move_distance,
+                           max_error=args.max_error, prl_id_list=args.region)
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os_utils.get_path_under_work_dir('.debug', 'cal_pos_benchmark'),
+                              '%s.json' % os_utils.now_timestamp_str())
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+
+    summary = result['summary']
+    log.info('样例 %d 正确 %d 准确率 %s 耗时 p50 %s p95 %s p99 %s',
+             summary['total'], summary['correct'], summary['accuracy'],
+             summary['cost_p50'], summary['cost_p95'], summary['cost_p99'])
+    log.info('结果已保存 %s', output)
+
+
+if __name__ == '__main__':
+    __debug()
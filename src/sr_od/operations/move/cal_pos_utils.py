@@ -15,12 +15,18 @@ from one_dragon.utils import cal_utils, cv2_utils, os_utils, thread_utils
 from one_dragon.utils.log_utils import log
 from sr_od.context.sr_context import SrContext
 from sr_od.sr_map import mini_map_utils
-from sr_od.sr_map.large_map_info import LargeMapInfo
+from sr_od.sr_map.large_map_info import LargeMapInfo, PYRAMID_FACTOR
 from sr_od.sr_map.mini_map_info import MiniMapInfo
+from sr_od.sr_map.mini_map_scale_bank import MiniMapScaleBank, ScaledTemplate
 from sr_od.sr_map.sr_map_def import Region
 
 cal_pos_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='sr_od_cal_pos')
 
+PYRAMID_TOP_K: int = 3  # 金字塔粗匹配后 进行精确匹配的候选数量
+PYRAMID_MIN_TEMPLATE_SIZE: int = 32  # 缩小后的模板小于这个尺寸时 不使用金字塔匹配
+PYRAMID_ACCEPT_THRESHOLD: float = 0.6  # 金字塔匹配的结果达到这个置信度才直接使用 否则再进行全分辨率匹配
+TRACKING_THRESHOLD: float = 0.6  # 根据运动模型跟踪坐标时 模板匹配的阈值
+
 
 def get_mini_map_scale_list(running: bool, real_move_time: float = 0, is_debug: bool = False):
     """
@@ -121,6 +127,20 @@ class VerifyPosInfo:
         return yml
 
 
+class CalPosRecord:
+
+    def __init__(self):
+        """
+        一次计算坐标的过程记录 用于评估不同匹配方式的效果
+        """
+        self.scale_list: List[float] = []  # 尝试的缩放比例
+        self.tried_strategy_list: List[str] = []  # 尝试过的匹配方式
+        self.strategy: Optional[str] = None  # 最终采用结果的匹配方式
+
+    def try_strategy(self, strategy: str) -> None:
+        self.tried_strategy_list.append(strategy)
+
+
 def similar_result(result_list: List[MatchResult], least_result_cnt: int = 2) -> Optional[MatchResult]:
     """
     使用不同的匹配方法时 只有较小几率会出现多个相同的错误结果
@@ -151,7 +171,9 @@ def cal_character_pos(ctx: SrContext,
                       retry_without_rect: bool = False,
                       running: bool = False,
                       real_move_time: float = 0,
-                      verify: Optional[VerifyPosInfo] = None) -> Optional[MatchResult]:
+                      verify: Optional[VerifyPosInfo] = None,
+                      pyramid: bool = False,
+                      record: Optional[CalPosRecord] = None) -> Optional[MatchResult]:
     """
     根据小地图 匹配大地图 判断当前的坐标
     :param ctx: 上下文
@@ -163,46 +185,73 @@ def cal_character_pos(ctx: SrContext,
     :param running: 角色是否在移动 移动时候小地图会缩小
     :param real_move_time: 真实移动时间
     :param verify: 校验结果需要的信息
+    :param pyramid: 是否先使用金字塔匹配 移动中需要更快地计算坐标
+    :param record: 记录计算过程 用于评估
     :return:
     """
     # 匹配结果 是缩放后的 offset 和宽高
     result: Optional[MatchResult] = None
 
     scale_list = get_mini_map_scale_list(running, real_move_time, is_debug=ctx.env_config.is_debug)
+    if record is not None:
+        record.scale_list.extend(scale_list)
     r1 = None
     r2 = None
     r3 = None
     r4 = None
 
     if result is None:  # 使用模板匹配 用道路掩码的
-        r1 = cal_character_pos_by_road_mask(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
+        if record is not None:
+            record.try_strategy('road_mask')
+        r1 = cal_character_pos_by_road_mask(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show,
+                                            pyramid=pyramid)
         if is_valid_result(r1, verify):
             result = r1
+            if record is not None:
+                record.strategy = 'road_mask'
 
     if result is None:  # 看看有没有特殊点 使用特殊点倒推位置
+        if record is not None:
+            record.try_strategy('sp')
         r2 = cal_character_pos_by_sp_result(ctx, lm_info, mm_info, lm_rect=lm_rect)
         if r2 is not None and (r2.template_scale > 1.3 or r2.template_scale < 0.9):  # 不应该有这样的缩放 放弃这个结果
             log.debug('特殊点定位使用的缩放比例不符合预期')
             pass
         else:
             result = r2
+            if record is not None and result is not None:
+                record.strategy = 'sp'
 
     if result is None:  # 使用模板匹配 用灰度图的
-        r3 = cal_character_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
+        if record is not None:
+            record.try_strategy('gray')
+        r3 = cal_character_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show,
+                                       pyramid=pyramid)
         if is_valid_result(r3, verify):
             result = r3
+            if record is not None:
+                record.strategy = 'gray'
 
     if result is None:  # 使用模板匹配 用原图的
-        r4 = cal_character_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
+        if record is not None:
+            record.try_strategy('raw')
+        r4 = cal_character_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show,
+                                      pyramid=pyramid)
         if is_valid_result(r4, verify):
             result = r4
+            if record is not None:
+                record.strategy = 'raw'
 
     if result is None:
         result = similar_result([r1, r2, r3, r4])
+        if record is not None and result is not None:
+            record.strategy = 'similar'
 
     if result is None:
         if lm_rect is not None and retry_without_rect:  # 整张大地图试试
-            return cal_character_pos(ctx, lm_info, mm_info, running=False, show=show)
+            if record is not None:
+                record.try_strategy('without_rect')
+            return cal_character_pos(ctx, lm_info, mm_info, running=False, show=show, record=record)
         else:
             return None
 
@@ -222,7 +271,8 @@ def cal_character_pos_by_gray(ctx: SrContext,
                               lm_info: LargeMapInfo, mm_info: MiniMapInfo,
                               lm_rect: Rect = None,
                               scale_list: List[float] = None,
-                              show: bool = False) -> Optional[MatchResult]:
+                              show: bool = False,
+                              pyramid: bool = False) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用灰度图进行匹配
@@ -232,19 +282,24 @@ def cal_character_pos_by_gray(ctx: SrContext,
     :param lm_rect: 圈定的大地图区域 传入后更准确
     :param scale_list: 缩放比例
     :param show: 是否显示调试结果
+    :param pyramid: 是否先使用金字塔匹配
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
     source = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
     # 使用道路掩码
     mm_del_radio = mm_info.raw_del_radio
-    template = cv2.cvtColor(mm_del_radio, cv2.COLOR_BGR2GRAY)
+    template = mm_info.gray_del_radio
 
     mini_map_utils.init_road_mask_for_world_patrol(mm_info, another_floor=lm_info.region.another_floor)
     template_mask = mm_info.road_mask_with_edge
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
-                                                                   scale_list, 0.3)
+                                                                   scale_list, 0.3,
+                                                                   pyramid=pyramid,
+                                                                   scale_bank=mm_info.scale_bank,
+                                                                   template_kind='gray', mask_kind='road_mask_with_edge',
+                                                                   lm_info=lm_info, source_kind='gray', source_rect=lm_rect)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -269,7 +324,8 @@ def cal_character_pos_by_raw(ctx: SrContext,
                              lm_rect: Rect = None,
                              show: bool = False,
                              scale_list: List[float] = None,
-                             match_threshold: float = 0.3) -> Optional[MatchResult]:
+                             match_threshold: float = 0.3,
+                             pyramid: bool = False) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用小地图原图 - 需要到这一步 说明背景比较杂乱 因此道路掩码只使用中心点包含的连通块
@@ -280,6 +336,7 @@ def cal_character_pos_by_raw(ctx: SrContext,
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
     :param match_threshold: 模板匹配的阈值
+    :param pyramid: 是否先使用金字塔匹配
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
@@ -289,7 +346,11 @@ def cal_character_pos_by_raw(ctx: SrContext,
     template_mask = mm_info.road_mask_with_edge
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
-                                                                   scale_list, match_threshold)
+                                                                   scale_list, match_threshold,
+                                                                   pyramid=pyramid,
+                                                                   scale_bank=mm_info.scale_bank,
+                                                                   template_kind='raw', mask_kind='road_mask_with_edge',
+                                                                   lm_info=lm_info, source_kind='raw', source_rect=lm_rect)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -384,7 +445,8 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
                                    lm_info: LargeMapInfo, mm_info: MiniMapInfo,
                                    lm_rect: Rect = None,
                                    show: bool = False,
-                                   scale_list: List[float] = None) -> Optional[MatchResult]:
+                                   scale_list: List[float] = None,
+                                   pyramid: bool = False) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用处理过后的道路掩码图
@@ -394,6 +456,7 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
     :param lm_rect: 圈定的大地图区域 传入后更准确
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
+    :param pyramid: 是否先使用金字塔匹配
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.mask, lm_rect)
@@ -404,7 +467,11 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
                                                                    scale_list,
-                                                                   0.4)
+                                                                   0.4,
+                                                                   pyramid=pyramid,
+                                                                   scale_bank=mm_info.scale_bank,
+                                                                   template_kind='road_mask', mask_kind='circle_mask',
+                                                                   lm_info=lm_info, source_kind='mask', source_rect=lm_rect)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -424,6 +491,59 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
         return None
 
 
+def cal_character_pos_by_tracking(ctx: SrContext,
+                                  lm_info: LargeMapInfo, mm_info: MiniMapInfo,
+                                  predict_pos: Point, scale: float,
+                                  margin: int = 10,
+                                  sim_uni: bool = False,
+                                  match_threshold: float = TRACKING_THRESHOLD) -> Optional[MatchResult]:
+    """
+    根据运动模型预测的坐标和缩放比例 只在预测位置附近的小窗口内使用单个缩放比例进行模板匹配
+    小地图有圆形的掩码 相位相关无法使用掩码 因此使用带掩码的模板匹配 窗口很小时耗时也很少
+    :param ctx: 上下文
+    :param lm_info: 大地图信息
+    :param mm_info: 小地图信息
+    :param predict_pos: 预测的人物坐标
+    :param scale: 预测的小地图缩放比例
+    :param margin: 预测位置的误差范围
+    :param sim_uni: 是否模拟宇宙 模拟宇宙中使用灰度图匹配
+    :param match_threshold: 模板匹配的阈值 需要比全局搜索更严格 低于阈值时应该重新全局定位
+    :return:
+    """
+    if sim_uni:
+        source_img = lm_info.raw
+        mini_map_utils.init_road_mask_for_sim_uni(mm_info)
+        template_kind, template = 'gray', mm_info.gray_del_radio
+        mask_kind, template_mask = 'road_mask_with_edge', mm_info.road_mask_with_edge
+    else:
+        source_img = lm_info.mask
+        mini_map_utils.init_road_mask_for_world_patrol(mm_info, another_floor=lm_info.region.another_floor)
+        template_kind, template = 'road_mask', cv2.bitwise_or(mm_info.road_mask, mm_info.arrow_mask)
+        mask_kind, template_mask = 'circle_mask', mm_info.circle_mask
+
+    scale = round(scale, 2)
+    scaled = mm_info.scale_bank.get(template_kind, template, mask_kind, template_mask, scale)
+
+    # 预测的模板左上角
+    height, width = scaled.template.shape[:2]
+    x = predict_pos.x - scaled.scale_width // 2 + scaled.sx
+    y = predict_pos.y - scaled.scale_height // 2 + scaled.sy
+    window = Rect(x - margin, y - margin, x + width + margin, y + height + margin)
+    source, window = cv2_utils.crop_image(source_img, window)
+    if source.shape[0] < height or source.shape[1] < width:
+        return None
+    if sim_uni:
+        source = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
+
+    target = template_match_with_scale(ctx, source, scaled, match_threshold)
+    if target is None:
+        return None
+
+    target.x += window.x1
+    target.y += window.y1
+    return target
+
+
 def merge_road_mask(road_mask, edge_mask):
     mask = np.full(road_mask.shape, fill_value=127, dtype=np.uint8)
     mask[np.where(road_mask > 0)] = 0
@@ -434,7 +554,14 @@ def merge_road_mask(road_mask, edge_mask):
 def template_match_with_scale_list_parallely(ctx: SrContext,
                                              source: MatLike, template: MatLike, template_mask: MatLike,
                                              scale_list: List[float],
-                                             threshold: float) -> MatchResult:
+                                             threshold: float,
+                                             pyramid: bool = False,
+                                             scale_bank: Optional[MiniMapScaleBank] = None,
+                                             template_kind: str = 'template',
+                                             mask_kind: str = 'mask',
+                                             lm_info: Optional[LargeMapInfo] = None,
+                                             source_kind: Optional[str] = None,
+                                             source_rect: Optional[Rect] = None) -> MatchResult:
     """
     按一定缩放比例进行模板匹配，并行处理不同的缩放比例，返回置信度最高的结果
     :param ctx: 上下文
@@ -443,12 +570,35 @@ def template_match_with_scale_list_parallely(ctx: SrContext,
     :param template_mask: 模板掩码
     :param scale_list: 模板的缩放比例
     :param threshold: 匹配阈值
+    :param pyramid: 是否先使用金字塔匹配 置信度不够高时再使用全分辨率匹配
+    :param scale_bank: 小地图的缩放模板库 传入时复用已经缩放好的模板
+    :param template_kind: 模板在缩放模板库中的种类
+    :param mask_kind: 掩码在缩放模板库中的种类
+    :param lm_info: 原图所属的大地图 传入时金字塔匹配使用大地图缓存的缩小图
+    :param source_kind: 原图在大地图中的种类 raw / gray / mask
+    :param source_rect: 原图在大地图中的裁剪区域
     :return: 置信度最高的结果
     """
+    if scale_bank is None:
+        scale_bank = MiniMapScaleBank()
+    scaled_list: List[ScaledTemplate] = [
+        scale_bank.get(template_kind, template, mask_kind, template_mask, scale)
+        for scale in scale_list
+    ]
+
+    if pyramid:
+        target = template_match_with_scale_list_pyramid(ctx, source, scaled_list, threshold,
+                                                        lm_info=lm_info, source_kind=source_kind,
+                                                        source_rect=source_rect)
+        # 粗匹配只保留了少数候选 置信度不够高时 可能漏掉了更好的位置
+        if target is not None and target.confidence >= max(threshold, PYRAMID_ACCEPT_THRESHOLD):
+            return target
+
     future_list: List[Future] = []
-    for scale in scale_list:
-        f = cal_pos_executor.submit(template_match_with_scale, ctx, source, template, template_mask, scale, threshold)
+    for scaled in scaled_list:
+        f = cal_pos_executor.submit(template_match_with_scale, ctx, source, scaled, threshold)
         thread_utils.handle_future_result(f)
+        scale_bank.track_future(f)  # 超时后任务仍会读取缓冲区 归还时需要等待
         future_list.append(f)
 
     target: Optional[MatchResult] = None
@@ -466,48 +616,105 @@ def template_match_with_scale_list_parallely(ctx: SrContext,
 
 
 def template_match_with_scale(ctx: SrContext,
-                              source: MatLike, template: MatLike, template_mask: MatLike, scale: float,
+                              source: MatLike, scaled: ScaledTemplate,
                               threshold: float) -> MatchResult:
     """
     按一定缩放比例进行模板匹配，返回置信度最高的结果
     :param ctx: 上下文
     :param source: 原图
-    :param template: 模板图
-    :param template_mask: 模板掩码
-    :param scale: 模板的缩放比例
+    :param scaled: 缩放后截取中心部分的模板
     :param threshold: 匹配阈值
     :return:
     """
-    template_scale = cv2_utils.scale_image(template, scale, copy=False)
-    template_mask_scale = cv2_utils.scale_image(template_mask, scale, copy=False)
+    result: MatchResultList = cv2_utils.match_template(source, scaled.template,
+                                                       mask=scaled.mask, threshold=threshold,
+                                                       only_best=True, ignore_inf=True)
+    if result.max is not None:
+        result.max.x -= scaled.sx
+        result.max.y -= scaled.sy
+        result.max.w = scaled.scale_width
+        result.max.h = scaled.scale_height
+        result.max.template_scale = scaled.scale
 
-    # 放大后 截取中心部分来匹配 防止放大后的图片超过了原图的范围
-    template_usage = np.zeros_like(template, dtype=np.uint8)
-    template_mask_usage = np.zeros_like(template_mask, dtype=np.uint8)
+    return result.max
 
-    height, width = template.shape[:2]
-    scale_height, scale_width = template_scale.shape[:2]
-    cx = scale_width // 2
-    cy = scale_height // 2
-    sx = cx - width // 2
-    ex = sx + width
-    sy = cy - width // 2
-    ey = sy + height
 
-    template_usage[:, :] = template_scale[sy:ey, sx:ex]
-    template_mask_usage[:, :] = template_mask_scale[sy:ey, sx:ex]
+def template_match_with_scale_list_pyramid(ctx: SrContext,
+                                           source: MatLike, scaled_list: List[ScaledTemplate],
+                                           threshold: float,
+                                           pyramid_factor: float = PYRAMID_FACTOR,
+                                           top_k: int = PYRAMID_TOP_K,
+                                           lm_info: Optional[LargeMapInfo] = None,
+                                           source_kind: Optional[str] = None,
+                                           source_rect: Optional[Rect] = None) -> Optional[MatchResult]:
+    """
+    金字塔匹配 先在缩小后的原图上尝试所有缩放比例 再只对最好的几个候选在原图的小窗口内精确匹配
+    :param ctx: 上下文
+    :param source: 原图
+    :param scaled_list: 各个缩放比例的模板
+    :param threshold: 精确匹配的阈值
+    :param pyramid_factor: 粗匹配时的缩小比例
+    :param top_k: 进行精确匹配的候选数量
+    :param lm_info: 原图所属的大地图 传入时使用大地图缓存的缩小图 不需要每次缩小原图
+    :param source_kind: 原图在大地图中的种类 raw / gray / mask
+    :param source_rect: 原图在大地图中的裁剪区域
+    :return: 置信度最高的结果 找不到时返回None
+    """
+    if len(scaled_list) == 0:
+        return None
+    height, width = scaled_list[0].template.shape[:2]
+    if int(width * pyramid_factor) < PYRAMID_MIN_TEMPLATE_SIZE or int(height * pyramid_factor) < PYRAMID_MIN_TEMPLATE_SIZE:
+        return None
 
-    result: MatchResultList = cv2_utils.match_template(source, template_usage,
-                                                       mask=template_mask_usage, threshold=threshold,
-                                                       only_best=True, ignore_inf=True)
-    if result.max is not None:
-        result.max.x -= sx
-        result.max.y -= sy
-        result.max.w = scale_width
-        result.max.h = scale_height
-        result.max.template_scale = scale
+    # 缩小图左上角 在原图中的坐标
+    offset_x, offset_y = 0, 0
+    small_lm = None if lm_info is None or source_kind is None else lm_info.get_pyramid_image(source_kind, pyramid_factor)
+    if small_lm is None:
+        small_source = cv2.resize(source, None, fx=pyramid_factor, fy=pyramid_factor, interpolation=cv2.INTER_AREA)
+    elif source_rect is None:
+        small_source = small_lm
+    else:
+        small_rect = Rect(int(source_rect.x1 * pyramid_factor), int(source_rect.y1 * pyramid_factor),
+                          int(math.ceil(source_rect.x2 * pyramid_factor)), int(math.ceil(source_rect.y2 * pyramid_factor)))
+        small_source, small_rect = cv2_utils.crop_image(small_lm, small_rect)
+        offset_x = int(small_rect.x1 / pyramid_factor) - source_rect.x1
+        offset_y = int(small_rect.y1 / pyramid_factor) - source_rect.y1
+    small_h, small_w = small_source.shape[:2]
+    small_template_size = (int(width * pyramid_factor), int(height * pyramid_factor))
+    if small_template_size[0] > small_w or small_template_size[1] > small_h:
+        return None
 
-    return result.max
+    # 粗匹配 每个缩放比例只保留最好的位置
+    candidate_list: List[Tuple[float, ScaledTemplate, int, int]] = []
+    for scaled in scaled_list:
+        small_template = cv2.resize(scaled.template, small_template_size, interpolation=cv2.INTER_AREA)
+        small_mask = cv2.resize(scaled.mask, small_template_size, interpolation=cv2.INTER_NEAREST)
+        result = cv2.matchTemplate(small_source, small_template, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+        result[~np.isfinite(result)] = -1
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        candidate_list.append((max_val, scaled, max_loc[0], max_loc[1]))
+
+    candidate_list.sort(key=lambda i: i[0], reverse=True)
+
+    # 精确匹配 只在候选位置附近的小窗口内进行
+    margin = int(math.ceil(1 / pyramid_factor)) * 2 + 2
+    target: Optional[MatchResult] = None
+    for _, scaled, small_x, small_y in candidate_list[:top_k]:
+        x = int(small_x / pyramid_factor) + offset_x
+        y = int(small_y / pyramid_factor) + offset_y
+        window = Rect(x - margin, y - margin, x + width + margin, y + height + margin)
+        window_source, window = cv2_utils.crop_image(source, window)
+        if window_source.shape[0] < height or window_source.shape[1] < width:
+            continue
+        result = template_match_with_scale(ctx, window_source, scaled, threshold)
+        if result is None:
+            continue
+        result.x += window.x1
+        result.y += window.y1
+        if target is None or result.confidence > target.confidence:
+            target = result
+
+    return target
 
 
 def sim_uni_cal_pos(
@@ -515,7 +722,9 @@ def sim_uni_cal_pos(
         lm_info: LargeMapInfo, mm_info: MiniMapInfo,
         lm_rect: Rect = None, show: bool = False,
         running: bool = False, real_move_time: float = 0,
-        verify: Optional[VerifyPosInfo] = None) -> Optional[MatchResult]:
+        verify: Optional[VerifyPosInfo] = None,
+        pyramid: bool = False,
+        record: Optional[CalPosRecord] = None) -> Optional[MatchResult]:
     """
     根据小地图 匹配大地图 判断当前的坐标。模拟宇宙中使用
     :param ctx: 上下文
@@ -526,12 +735,16 @@ def sim_uni_cal_pos(
     :param running: 角色是否在移动 移动时候小地图会缩小
     :param real_move_time: 真正按住移动的时间
     :param verify: 校验结果需要的信息
+    :param pyramid: 是否先使用金字塔匹配 移动中需要更快地计算坐标
+    :param record: 记录计算过程 用于评估
     :return:
     """
     # 匹配结果 是缩放后的 offset 和宽高
     result: Optional[MatchResult] = None
 
     scale_list = get_mini_map_scale_list(running, real_move_time, is_debug=ctx.env_config.is_debug)
+    if record is not None:
+        record.scale_list.extend(scale_list)
     r1 = None
     r2 = None
     r3 = None
@@ -540,17 +753,29 @@ def sim_uni_cal_pos(
     # 模拟宇宙中 由于地图都是裁剪的 小地图缺块 不能直接使用道路掩码匹配（误报率非常高）
 
     if result is None:  # 使用模板匹配 灰度图
-        r1 = sim_uni_cal_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
+        if record is not None:
+            record.try_strategy('gray')
+        r1 = sim_uni_cal_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show,
+                                     pyramid=pyramid)
         if is_valid_result(r1, verify):
             result = r1
+            if record is not None:
+                record.strategy = 'gray'
 
     if result is None:  # 使用模板匹配 原图
-        r2 = sim_uni_cal_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
+        if record is not None:
+            record.try_strategy('raw')
+        r2 = sim_uni_cal_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show,
+                                    pyramid=pyramid)
         if is_valid_result(r2, verify):
             result = r2
+            if record is not None:
+                record.strategy = 'raw'
 
     if result is None:  # 如果两个结果相似 直接采纳
         result = similar_result([r1, r2])
+        if record is not None and result is not None:
+            record.strategy = 'similar'
 
     if result is None:
         return None
@@ -575,7 +800,8 @@ def sim_uni_cal_pos_by_gray(ctx: SrContext,
                             lm_rect: Rect = None,
                             show: bool = False,
                             scale_list: List[float] = None,
-                            match_threshold: float = 0.3) -> Optional[MatchResult]:
+                            match_threshold: float = 0.3,
+                            pyramid: bool = False) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用模拟宇宙专用的道路掩码图 + 灰度图
@@ -586,17 +812,22 @@ def sim_uni_cal_pos_by_gray(ctx: SrContext,
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
     :param match_threshold: 模板匹配的阈值
+    :param pyramid: 是否先使用金字塔匹配
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
     source = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
     # 使用道路掩码
-    template = cv2.cvtColor(mm_info.raw_del_radio, cv2.COLOR_BGR2GRAY)
+    template = mm_info.gray_del_radio
     mini_map_utils.init_road_mask_for_sim_uni(mm_info)
     template_mask = mm_info.road_mask_with_edge  # 把白色边缘包括进来
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask, scale_list,
-                                                                   match_threshold)
+                                                                   match_threshold,
+                                                                   pyramid=pyramid,
+                                                                   scale_bank=mm_info.scale_bank,
+                                                                   template_kind='gray', mask_kind='road_mask_with_edge',
+                                                                   lm_info=lm_info, source_kind='gray', source_rect=lm_rect)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -622,7 +853,8 @@ def sim_uni_cal_pos_by_raw(ctx: SrContext,
                            lm_rect: Rect = None,
                            show: bool = False,
                            scale_list: List[float] = None,
-                           match_threshold: float = 0.3) -> Optional[MatchResult]:
+                           match_threshold: float = 0.3,
+                           pyramid: bool = False) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用模拟宇宙专用的道路掩码图 + 原图
@@ -632,6 +864,7 @@ def sim_uni_cal_pos_by_raw(ctx: SrContext,
     :param lm_rect: 圈定的大地图区域 传入后更准确
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
+    :param pyramid: 是否先使用金字塔匹配
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
@@ -642,7 +875,11 @@ def sim_uni_cal_pos_by_raw(ctx: SrContext,
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
                                                                    scale_list,
-                                                                   threshold=match_threshold)
+                                                                   threshold=match_threshold,
+                                                                   pyramid=pyramid,
+                                                                   scale_bank=mm_info.scale_bank,
+                                                                   template_kind='raw', mask_kind='road_mask_with_edge',
+                                                                   lm_info=lm_info, source_kind='raw', source_rect=lm_rect)
 
     if show:
         scale = target.template_scale if target is not None else 1
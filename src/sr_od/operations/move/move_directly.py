@@ -18,6 +18,7 @@ from sr_od.context.sr_context import SrContext
 from sr_od.operations.move import cal_pos_utils, record_pos_utils
 from sr_od.operations.move.cal_pos_utils import VerifyPosInfo
 from sr_od.operations.move.get_rid_of_stuck import GetRidOfStuck
+from sr_od.operations.move.pos_tracker import PosTracker
 from sr_od.operations.sr_operation import SrOperation
 from sr_od.operations.technique import UseTechnique
 from sr_od.screen_state import common_screen_state, battle_screen_state
@@ -76,6 +77,7 @@ class MoveDirectly(SrOperation):
         self.no_battle: bool = no_battle  # 本次移动是否保证没有战斗
         self.technique_fight: bool = technique_fight  # 是否使用秘技进入战斗
         self.technique_only: bool = technique_only  # 是否只使用秘技进入战斗
+        self.pos_tracker: PosTracker = PosTracker()  # 坐标的运动模型 可信时只在预测位置附近匹配
 
     def handle_init(self):
         """
@@ -94,6 +96,7 @@ class MoveDirectly(SrOperation):
         if self.ctx.controller.is_moving:  # 连续移动的时候 使用开始点作为一个起始点
             self.pos.append(self.start_pos)
         self.stop_move_time = None
+        self.pos_tracker.reset()
 
         return None
 
@@ -294,6 +297,7 @@ class MoveDirectly(SrOperation):
         mm_info = mini_map_utils.analyse_mini_map(mm)
 
         if len(self.pos) == 0:  # 第一个可以直接使用开始点 不进行计算
+            self.pos_tracker.update(self.start_pos, now_time)
             return self.start_pos, mm_info
 
         # 正确移动时 人物不应该偏离直线太远
@@ -309,7 +313,15 @@ class MoveDirectly(SrOperation):
                                max_line_distance=max_line_distance
                                )
 
-        next_pos = self.do_cal_pos(mm_info, lm_rect, verify)
+        next_pos = self.track_pos(mm_info, now_time, verify)
+        if next_pos is None:
+            next_pos = self.do_cal_pos(mm_info, lm_rect, verify)
+        mm_info.release_scale_bank()  # 缩放后的模板只在计算坐标时使用 缓冲区留给下一帧
+
+        if next_pos is not None:
+            self.pos_tracker.update(next_pos.center, now_time, next_pos.template_scale,
+                                    moving=self.ctx.controller.is_moving, angle=mm_info.angle,
+                                    speed=self.ctx.controller.cal_move_distance_by_time(1))
 
         if next_pos is None:
             log.error('无法判断当前人物坐标')
@@ -321,6 +333,55 @@ class MoveDirectly(SrOperation):
                 pass
         return next_pos.center if next_pos is not None else None, mm_info
 
+    def track_pos(self, mm_info: MiniMapInfo, now_time: float,
+                  verify: VerifyPosInfo) -> Optional[MatchResult]:
+        """
+        使用运动模型预测坐标 只在预测位置附近匹配
+        战斗后、脱困中 人物会有预测不到的位移 这时候不使用
+        :param mm_info: 当前的小地图信息
+        :param now_time: 当前时间
+        :param verify: 用于验证坐标的信息
+        :return: 跟踪失败时返回None 需要重新全局定位
+        """
+        if (not self.pos_tracker.ready
+                or self.ctx.pos_info.pos_first_cal_pos_after_fight
+                or self.stuck_times > 0):
+            return None
+
+        predict_pos, scale, uncertainty = self.pos_tracker.predict(
+            now_time,
+            moving=self.ctx.controller.is_moving, angle=mm_info.angle,
+            speed=self.ctx.controller.cal_move_distance_by_time(1))
+        margin = int(min(max(uncertainty, 6), 30))
+
+        try:
+            next_pos = self.do_track_pos(mm_info, predict_pos, scale, margin)
+        except Exception:
+            next_pos = None
+            log.error('跟踪坐标失败', exc_info=True)
+
+        if not cal_pos_utils.is_valid_result(next_pos, verify):
+            self.pos_tracker.mark_fail()
+            return None
+
+        log.debug('跟踪坐标为 %s 预测坐标 %s 使用缩放 %.2f 置信度 %.2f',
+                  next_pos.center, predict_pos, next_pos.template_scale, next_pos.confidence)
+        return next_pos
+
+    def do_track_pos(self, mm_info: MiniMapInfo,
+                     predict_pos: Point, scale: float, margin: int) -> Optional[MatchResult]:
+        """
+        真正的跟踪坐标
+        :param mm_info: 当前的小地图信息
+        :param predict_pos: 预测的坐标
+        :param scale: 预测的小地图缩放比例
+        :param margin: 预测坐标的误差范围
+        :return:
+        """
+        return cal_pos_utils.cal_character_pos_by_tracking(
+            self.ctx, self.lm_info, mm_info,
+            predict_pos=predict_pos, scale=scale, margin=margin)
+
     def do_cal_pos(self, mm_info: MiniMapInfo,
                    lm_rect: Rect, verify: VerifyPosInfo) -> Optional[MatchResult]:
         """
@@ -337,14 +398,16 @@ class MoveDirectly(SrOperation):
                 lm_rect=lm_rect, retry_without_rect=False,
                 running=self.ctx.controller.is_moving,
                 real_move_time=real_move_time,
-                verify=verify)
+                verify=verify,
+                pyramid=self.ctx.controller.is_moving)
             if next_pos is None and self.next_lm_info is not None:
                 next_pos = cal_pos_utils.cal_character_pos(
                     self.ctx, self.next_lm_info, mm_info,
                     lm_rect=lm_rect, retry_without_rect=False,
                     running=self.ctx.controller.is_moving,
                     real_move_time=real_move_time,
-                    verify=verify)
+                    verify=verify,
+                    pyramid=self.ctx.controller.is_moving)
         except Exception:
             next_pos = None
             log.error('识别坐标失败', exc_info=True)
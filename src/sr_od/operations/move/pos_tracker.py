@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+from typing import Optional, Tuple
+
+from one_dragon.base.geometry.point import Point
+
+
+class PosTracker:
+
+    def __init__(self,
+                 pos_noise: float = 2,
+                 acc_noise: float = 15,
+                 scale_alpha: float = 0.5,
+                 max_fail_times: int = 1):
+        """
+        人物坐标的运动模型 匀速模型的卡尔曼滤波
+        用上一次的坐标、速度和人物朝向预测当前坐标和小地图缩放比例
+        预测可信时 只需要在预测位置附近的小窗口内用单个缩放比例匹配 不需要全局搜索
+
+        :param pos_noise: 坐标识别的误差 像素
+        :param acc_noise: 加速度的噪声 像素/秒^2 人物转向、停止时速度会突变
+        :param scale_alpha: 缩放比例平滑的权重 越大越相信最新的结果
+        :param max_fail_times: 连续跟踪失败多少次后 需要重新全局定位
+        """
+        self.pos_noise: float = pos_noise
+        self.acc_noise: float = acc_noise
+        self.scale_alpha: float = scale_alpha
+        self.max_fail_times: int = max_fail_times
+
+        self.state: Optional[np.ndarray] = None  # [x, y, vx, vy]
+        self.cov: Optional[np.ndarray] = None  # 状态的协方差
+        self.scale: Optional[float] = None  # 小地图的缩放比例
+        self.last_time: float = 0  # 上一次更新的时间
+        self.update_times: int = 0  # 累计更新次数 至少两次后速度才可信
+        self.fail_times: int = 0  # 连续跟踪失败的次数
+
+    def reset(self) -> None:
+        """
+        清空跟踪状态 之后需要重新全局定位
+        :return:
+        """
+        self.state = None
+        self.cov = None
+        self.scale = None
+        self.last_time = 0
+        self.update_times = 0
+        self.fail_times = 0
+
+    @property
+    def ready(self) -> bool:
+        """
+        是否可以使用跟踪结果
+        :return:
+        """
+        return (self.state is not None
+                and self.scale is not None
+                and self.update_times >= 2
+                and self.fail_times < self.max_fail_times)
+
+    def predict(self, now: float,
+                moving: bool = False,
+                angle: Optional[float] = None,
+                speed: float = 0) -> Tuple[Point, float, float]:
+        """
+        预测当前的坐标 不会修改跟踪状态
+        :param now: 当前时间
+        :param moving: 人物是否在移动
+        :param angle: 人物朝向 正右方为0 顺时针为正
+        :param speed: 人物移动速度 像素/秒
+        :return: 预测坐标、预测缩放比例、坐标的不确定范围(像素)
+        """
+        dt = max(now - self.last_time, 0)
+        state, cov = self._predict(dt, moving, angle, speed)
+        uncertainty = 3 * math.sqrt(max(cov[0, 0], cov[1, 1]))
+        return Point(int(round(state[0])), int(round(state[1]))), self.scale, uncertainty
+
+    def _predict(self, dt: float,
+                 moving: bool, angle: Optional[float], speed: float) -> Tuple[np.ndarray, np.ndarray]:
+        state = self.state.copy()
+        if not moving:  # 没有在移动的话 认为速度为0
+            state[2:] = 0
+        elif self.update_times < 2 and angle is not None:  # 速度还没有估计出来 使用人物朝向
+            state[2] = speed * math.cos(math.radians(angle))
+            state[3] = speed * math.sin(math.radians(angle))
+
+        f = np.eye(4)
+        f[0, 2] = dt
+        f[1, 3] = dt
+        q = self._process_noise(dt)
+
+        return f @ state, f @ self.cov @ f.T + q
+
+    def _process_noise(self, dt: float) -> np.ndarray:
+        q = np.zeros((4, 4))
+        a = self.acc_noise ** 2
+        q[0, 0] = q[1, 1] = a * dt ** 4 / 4
+        q[0, 2] = q[2, 0] = q[1, 3] = q[3, 1] = a * dt ** 3 / 2
+        q[2, 2] = q[3, 3] = a * dt ** 2
+        return q
+
+    def update(self, pos: Point, now: float, scale: Optional[float] = None,
+               moving: bool = False, angle: Optional[float] = None, speed: float = 0) -> None:
+        """
+        使用识别到的坐标更新跟踪状态
+        :param pos: 识别到的坐标
+        :param now: 当前时间
+        :param scale: 识别到的小地图缩放比例
+        :param moving: 人物是否在移动
+        :param angle: 人物朝向
+        :param speed: 人物移动速度
+        :return:
+        """
+        if scale is not None:
+            self.scale = scale if self.scale is None else round(
+                self.scale_alpha * scale + (1 - self.scale_alpha) * self.scale, 2)
+        self.fail_times = 0
+
+        if self.state is None:
+            self.state = np.array([pos.x, pos.y, 0, 0], dtype=np.float64)
+            self.cov = np.diag([self.pos_noise ** 2, self.pos_noise ** 2, speed ** 2 + 1, speed ** 2 + 1])
+            self.last_time = now
+            self.update_times = 1
+            return
+
+        dt = max(now - self.last_time, 0)
+        state, cov = self._predict(dt, moving, angle, speed)
+
+        h = np.zeros((2, 4))
+        h[0, 0] = h[1, 1] = 1
+        r = np.eye(2) * self.pos_noise ** 2
+        z = np.array([pos.x, pos.y], dtype=np.float64)
+
+        y = z - h @ state
+        s = h @ cov @ h.T + r
+        k = cov @ h.T @ np.linalg.inv(s)
+        self.state = state + k @ y
+        self.cov = (np.eye(4) - k @ h) @ cov
+        self.last_time = now
+        self.update_times += 1
+
+    def mark_fail(self) -> None:
+        """
+        跟踪失败 连续失败过多之后需要重新全局定位
+        :return:
+        """
+        self.fail_times += 1
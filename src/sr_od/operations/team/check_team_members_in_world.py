@@ -44,14 +44,12 @@ class CheckTeamMembersInWorld(SrOperation):
         :param screen:
         :return:
         """
-        for i in range(4):
-            if self.character_list[i] is not None:
-                continue
-            area = self.ctx.screen_loader.get_area('大世界', ('队伍-角色名称-%d' % (i + 1)))
-
-            part = cv2_utils.crop_image_only(screen, area.rect)
+        idx_list = [i for i in range(4) if self.character_list[i] is None]
+        rect_list = [self.ctx.screen_loader.get_area('大世界', ('队伍-角色名称-%d' % (i + 1))).rect
+                     for i in idx_list]
+        name_list = self.ctx.ocr_service.get_single_line_text_by_rects(screen, rect_list)
 
-            character_name = self.ctx.ocr.run_ocr_single_line(part)
+        for i, character_name in zip(idx_list, name_list):
             best_character: Optional[Character] = None
             best_lcs: Optional[int] = None
             for character in CHARACTER_LIST:
@@ -63,9 +63,7 @@ def get_ui_titles(ctx: SrContext, screen: MatLike,
     :return:
     """
     area = ctx.screen_loader.get_area(screen_name, area_name)
-    part = cv2_utils.crop_image_only(screen, area.rect)
-    # cv2_utils.show_image(part, wait=0)
-    ocr_result_map = ctx.ocr.run_ocr(part)
+    ocr_result_map = screen_utils.ocr_in_rect(ctx, screen, area.rect)
     return list(ocr_result_map.keys())
 
 
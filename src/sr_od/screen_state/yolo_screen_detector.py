@@ -1,12 +1,15 @@
 import concurrent.futures
 import os
 import re
+import numpy as np
 from cv2.typing import MatLike
 from typing import Optional, Tuple, List
 
 from one_dragon.base.config.yaml_operator import YamlOperator
-from one_dragon.utils import yolo_config_utils, os_utils
-from one_dragon.yolo.detect_utils import DetectFrameResult
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.inference.inference_scheduler import InferencePriority
+from one_dragon.utils import yolo_config_utils, os_utils, cv2_utils
+from one_dragon.yolo.detect_utils import DetectFrameResult, DetectObjectResult, multiclass_nms
 from one_dragon.yolo.yolo_utils import get_github_model_download_url
 from one_dragon.yolo.yolov8_onnx_det import Yolov8Detector
 from sr_od.config.model_config import YOLO_RELEASE_TAG
@@ -30,11 +33,20 @@ class YoloScreenDetector:
                  sim_uni_model_name: Optional[str] = None,
                  world_patrol_model_name: Optional[str] = None,
                  standard_resolution_w: int = 1920,
-                 standard_resolution_h: int = 1080
+                 standard_resolution_h: int = 1080,
+                 attack_roi_list: Optional[List[Rect]] = None,
+                 attack_roi_tile_cnt: int = 1,
                  ):
+        """
+        :param attack_roi_list: 识别攻击提示的区域 不传入时使用整个画面
+        :param attack_roi_tile_cnt: 每个区域横向切成多少块分别识别 切块后小图标的分辨率更高 但需要推理多次
+        """
         self.standard_resolution_w: int = standard_resolution_w
         self.standard_resolution_h: int = standard_resolution_h
 
+        self.attack_roi_list: List[Rect] = [] if attack_roi_list is None else attack_roi_list  # 攻击提示出现的区域 为空时使用整个画面
+        self.attack_roi_tile_cnt: int = max(1, attack_roi_tile_cnt)
+
         self.sim_uni_yolo: Optional[Yolov8Detector] = None  # 模拟宇宙用的模型
         self.sim_uni_model_name: str = sim_uni_model_name
         if sim_uni_model_name is not None:
@@ -42,6 +54,7 @@ class YoloScreenDetector:
                 model_download_url=get_github_model_download_url(YOLO_RELEASE_TAG),
                 model_parent_dir_path=yolo_config_utils.get_model_category_dir('sim_uni'),
                 model_name=sim_uni_model_name,
+                priority=InferencePriority.CRITICAL,
             )
 
         self.world_patrol_yolo: Optional[Yolov8Detector] = None  # 锄大地用的模型
@@ -50,7 +63,8 @@ class YoloScreenDetector:
             self.world_patrol_yolo = Yolov8Detector(
                 model_download_url=get_github_model_download_url(YOLO_RELEASE_TAG),
                 model_parent_dir_path=yolo_config_utils.get_model_category_dir('world_patrol'),
-                model_name=world_patrol_model_name
+                model_name=world_patrol_model_name,
+                priority=InferencePriority.CRITICAL,
             )
 
         self.last_async_future: Optional[concurrent.futures.Future] = None  # 上一次异步回调
@@ -73,7 +87,8 @@ class YoloScreenDetector:
             model_download_url=get_github_model_download_url(YOLO_RELEASE_TAG),
             model_parent_dir_path=yolo_config_utils.get_model_category_dir('world_patrol'),
             model_name=model_name,
-            gpu=gpu
+            gpu=gpu,
+            priority=InferencePriority.CRITICAL,
         )
 
     def init_sim_uni_model(self, model_name: str, gpu: bool = False) -> None:
@@ -87,7 +102,8 @@ class YoloScreenDetector:
             model_download_url=get_github_model_download_url(YOLO_RELEASE_TAG),
             model_parent_dir_path=yolo_config_utils.get_model_category_dir('sim_uni'),
             model_name=model_name,
-            gpu=gpu
+            gpu=gpu,
+            priority=InferencePriority.CRITICAL,
         )
 
     def detect_should_attack_in_world(self, screen: MatLike, detect_time: float) -> DetectFrameResult:
@@ -106,13 +122,83 @@ class YoloScreenDetector:
             yolo = self.sim_uni_yolo
 
         if yolo is not None:
-            self.last_detect_result = yolo.run(screen, conf=0.85, run_time=detect_time,
-                                               category_list=['界面提示被锁定', '界面提示可攻击'])
+            self.last_detect_result = self.run_in_roi(yolo, screen, self._get_attack_tile_list(),
+                                                      conf=0.85, run_time=detect_time,
+                                                      category_list=['界面提示被锁定', '界面提示可攻击'])
         else:
             self.last_detect_result = DetectFrameResult(raw_image=screen, run_time=detect_time, results=[])
 
         return self.last_detect_result
 
+    def _get_attack_tile_list(self) -> List[Rect]:
+        """
+        攻击提示需要识别的区域 切块时相邻的块重叠一小部分 防止图标被切开
+        :return:
+        """
+        roi_list = self.attack_roi_list
+        if len(roi_list) == 0:
+            if self.attack_roi_tile_cnt == 1:
+                return []  # 识别整个画面
+            roi_list = [Rect(0, 0, self.standard_resolution_w, self.standard_resolution_h)]
+
+        tile_list: List[Rect] = []
+        for roi in roi_list:
+            if self.attack_roi_tile_cnt == 1:
+                tile_list.append(roi)
+                continue
+            tile_width = roi.width // self.attack_roi_tile_cnt
+            overlap = tile_width // 10
+            for i in range(self.attack_roi_tile_cnt):
+                x1 = max(roi.x1, roi.x1 + i * tile_width - overlap)
+                x2 = min(roi.x2, roi.x1 + (i + 1) * tile_width + overlap)
+                tile_list.append(Rect(x1, roi.y1, x2, roi.y2))
+        return tile_list
+
+    @staticmethod
+    def run_in_roi(yolo: Yolov8Detector, screen: MatLike, roi_list: List[Rect],
+                   conf: float = 0.6, iou: float = 0.5,
+                   run_time: Optional[float] = None,
+                   category_list: Optional[List[str]] = None) -> DetectFrameResult:
+        """
+        只在特定区域内识别 结果转换回整个画面的坐标
+        :param yolo: 模型
+        :param screen: 游戏画面
+        :param roi_list: 识别区域 为空时识别整个画面
+        :param conf: 置信度阈值
+        :param iou: iou阈值
+        :param run_time: 识别时间
+        :param category_list: 限定识别的标签分类
+        :return: 识别结果
+        """
+        if roi_list is None or len(roi_list) == 0:
+            return yolo.run(screen, conf=conf, iou=iou, run_time=run_time, category_list=category_list)
+
+        bus = getattr(yolo, 'overlay_debug_bus', None)
+        results: List[DetectObjectResult] = []
+        for roi in roi_list:
+            part = cv2_utils.crop_image_only(screen, roi)
+            if bus is not None:
+                bus.set_crop_offset(roi.x1, roi.y1)
+            try:
+                part_result = yolo.run(part, conf=conf, iou=iou, run_time=run_time, category_list=category_list)
+            finally:
+                if bus is not None:
+                    bus.reset_crop_offset()
+            for result in part_result.results:
+                result.x1 += roi.x1
+                result.x2 += roi.x1
+                result.y1 += roi.y1
+                result.y2 += roi.y1
+                results.append(result)
+
+        if len(roi_list) > 1 and len(results) > 1:  # 重叠部分可能重复识别
+            boxes = np.array([[i.x1, i.y1, i.x2, i.y2] for i in results], dtype=np.float32)
+            scores = np.array([i.score for i in results], dtype=np.float32)
+            class_ids = np.array([i.detect_class.class_id for i in results])
+            results = [results[i] for i in multiclass_nms(boxes, scores, class_ids, iou)]
+
+        return DetectFrameResult(raw_image=screen, results=results, run_time=run_time)
+
     def should_attack_in_world(self, screen: MatLike, detect_time: float) -> bool:
         """
         同步阻塞的方法
@@ -1,4 +1,4 @@
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 
 import cv2
 from cv2.typing import MatLike
@@ -6,6 +6,8 @@ from cv2.typing import MatLike
 from one_dragon.utils import cv2_utils
 from sr_od.sr_map.sr_map_def import Region
 
+PYRAMID_FACTOR: float = 0.5  # 金字塔粗匹配时 原图和模板的缩小比例
+
 
 class LargeMapInfo:
 
@@ -16,6 +18,7 @@ class LargeMapInfo:
         self.mask: MatLike = None  # 主体掩码 用于特征匹配
         self._kps = None  # 特征点 用于特征匹配
         self._desc = None  # 描述子 用于特征匹配
+        self._pyramid_images: Dict[Tuple[str, float], MatLike] = {}  # 金字塔粗匹配使用的缩小图 key=(图片种类, 缩小比例)
 
     @property
     def gray(self) -> MatLike:
@@ -33,3 +36,44 @@ class LargeMapInfo:
         if self.raw is not None:
             self._kps, self._desc = cv2_utils.feature_detect_and_compute(self.raw, self.mask)
         return self._kps, self._desc
+
+    def get_pyramid_image(self, kind: str, factor: float) -> Optional[MatLike]:
+        """
+        金字塔粗匹配使用的缩小图 第一次使用时缩小并缓存
+        :param kind: 图片种类 raw / gray / mask
+        :param factor: 缩小比例
+        :return:
+        """
+        key = (kind, factor)
+        small = self._pyramid_images.get(key)
+        if small is not None:
+            return small
+
+        if kind == 'raw':
+            source = self.raw
+        elif kind == 'gray':
+            source = self.gray
+        elif kind == 'mask':
+            source = self.mask
+        else:
+            source = None
+        if source is None:
+            return None
+
+        small = cv2.resize(source, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        self._pyramid_images[key] = small
+        return small
+
+    @property
+    def memory_size(self) -> int:
+        """
+        估算占用的内存 字节
+        :return:
+        """
+        size = 0
+        for img in [self.raw, self._gray, self.mask, self._desc, *self._pyramid_images.values()]:
+            if img is not None:
+                size += img.nbytes
+        if self._kps is not None:
+            size += len(self._kps) * 64  # cv2.KeyPoint 对象 粗略估算
+        return size
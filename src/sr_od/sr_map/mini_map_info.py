@@ -1,6 +1,9 @@
+import cv2
 from cv2.typing import MatLike
 from typing import Optional
 
+from sr_od.sr_map.mini_map_scale_bank import MiniMapScaleBank
+
 
 class MiniMapInfo:
 
@@ -15,3 +18,29 @@ class MiniMapInfo:
         self.sp_result: Optional[dict] = None  # 匹配到的特殊点结果
         self.road_mask: Optional[MatLike] = None  # 道路掩码 不包含中间的小箭头 以及特殊点
         self.road_mask_with_edge: Optional[MatLike] = None  # 有边缘道路掩码 不包含中间的小箭头 以及特殊点 适用于灰度图和原图匹配
+        self._gray_del_radio: Optional[MatLike] = None  # 原图减掉雷达后的灰度图
+        self._scale_bank: Optional[MiniMapScaleBank] = None  # 各个缩放比例的模板
+
+    @property
+    def gray_del_radio(self) -> Optional[MatLike]:
+        if self._gray_del_radio is not None:
+            return self._gray_del_radio
+        if self.raw_del_radio is None:
+            return None
+        self._gray_del_radio = cv2.cvtColor(self.raw_del_radio, cv2.COLOR_BGR2GRAY)
+        return self._gray_del_radio
+
+    @property
+    def scale_bank(self) -> MiniMapScaleBank:
+        if self._scale_bank is None:
+            self._scale_bank = MiniMapScaleBank()
+        return self._scale_bank
+
+    def release_scale_bank(self) -> None:
+        """
+        计算坐标结束后 归还缩放模板使用的缓冲区 给下一帧使用
+        :return:
+        """
+        if self._scale_bank is not None:
+            self._scale_bank.release()
+            self._scale_bank = None
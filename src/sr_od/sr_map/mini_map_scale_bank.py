@@ -0,0 +1,187 @@
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+
+class ScaledTemplate:
+
+    def __init__(self, template: MatLike, mask: MatLike,
+                 sx: int, sy: int, scale_width: int, scale_height: int, scale: float):
+        """
+        按比例缩放后 截取了中心部分的小地图模板
+        """
+        self.template: MatLike = template  # 截取后的模板 和原模板一样的大小
+        self.mask: MatLike = mask  # 截取后的掩码 和原掩码一样的大小
+        self.sx: int = sx  # 截取部分在缩放后图片上的左上角 x
+        self.sy: int = sy  # 截取部分在缩放后图片上的左上角 y
+        self.scale_width: int = scale_width  # 缩放后的宽度
+        self.scale_height: int = scale_height  # 缩放后的高度
+        self.scale: float = scale  # 缩放比例
+
+
+class ScaleBufferPool:
+
+    def __init__(self):
+        """
+        缩放模板使用的缓冲区池 按 (形状, 类型) 复用
+        每一帧小地图用完后归还 下一帧可以直接拿来使用 避免每一帧每个缩放比例都重新申请内存
+        """
+        self._lock = threading.Lock()
+        self._free: Dict[Tuple[Tuple[int, ...], str], List[np.ndarray]] = {}
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        获取一个缓冲区 内容不做保证
+        :param shape: 形状
+        :param dtype: 类型
+        :return:
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free_list = self._free.get(key)
+            if free_list:
+                return free_list.pop()
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer_list: List[np.ndarray]) -> None:
+        """
+        归还缓冲区
+        :param buffer_list: 缓冲区列表
+        :return:
+        """
+        with self._lock:
+            for buffer in buffer_list:
+                key = (tuple(buffer.shape), buffer.dtype.str)
+                self._free.setdefault(key, []).append(buffer)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free.clear()
+
+
+_BUFFER_POOL = ScaleBufferPool()
+
+
+class MiniMapScaleBank:
+
+    def __init__(self, pool: Optional[ScaleBufferPool] = None):
+        """
+        一帧小地图的缩放模板库 每种图片每个缩放比例只缩放一次
+        道路掩码、灰度图、原图几种匹配方式依次尝试时 可以复用之前已经缩放好的模板和掩码
+        """
+        self._pool: ScaleBufferPool = _BUFFER_POOL if pool is None else pool
+        self._lock = threading.Lock()
+        self._template_map: Dict[Tuple[str, float], Tuple[MatLike, int, int, int, int]] = {}
+        self._mask_map: Dict[Tuple[str, float], MatLike] = {}
+        self._buffer_list: List[np.ndarray] = []
+        self._future_list: List[Future] = []  # 使用了缩放模板的异步任务
+
+    def track_future(self, future: Future) -> None:
+        """
+        记录使用了缩放模板的异步任务 归还缓冲区时 需要等这些任务都完成
+        :param future: 异步任务
+        :return:
+        """
+        with self._lock:
+            self._future_list.append(future)
+
+    def get(self, template_kind: str, template: MatLike,
+            mask_kind: str, mask: MatLike,
+            scale: float) -> ScaledTemplate:
+        """
+        获取缩放后的模板 第一次获取时才进行缩放
+        :param template_kind: 模板种类 相同种类的模板需要是同一张图片
+        :param template: 模板
+        :param mask_kind: 掩码种类 相同种类的掩码需要是同一张图片
+        :param mask: 掩码
+        :param scale: 缩放比例
+        :return:
+        """
+        template_key = (template_kind, scale)
+        mask_key = (mask_kind, scale)
+        with self._lock:
+            template_item = self._template_map.get(template_key)
+            mask_usage = self._mask_map.get(mask_key)
+
+        if template_item is None:
+            template_item = self._scale_and_crop(template, scale)
+            with self._lock:
+                self._template_map[template_key] = template_item
+
+        if mask_usage is None:
+            mask_usage = self._scale_and_crop(mask, scale)[0]
+            with self._lock:
+                self._mask_map[mask_key] = mask_usage
+
+        template_usage, sx, sy, scale_width, scale_height = template_item
+        return ScaledTemplate(template_usage, mask_usage, sx, sy, scale_width, scale_height, scale)
+
+    def _scale_and_crop(self, img: MatLike, scale: float) -> Tuple[MatLike, int, int, int, int]:
+        """
+        按比例缩放图片 放大后截取中心部分 保持和原图一样的大小 防止放大后的图片超过了原图的范围
+        :param img: 原图
+        :param scale: 缩放比例
+        :return: 截取后的图片、截取的左上角偏移 x y、缩放后的宽、缩放后的高
+        """
+        height, width = img.shape[:2]
+        usage = self._pool.acquire(img.shape, img.dtype)
+        with self._lock:
+            self._buffer_list.append(usage)
+
+        if scale == 1:
+            usage[:] = img
+            return usage, 0, 0, width, height
+
+        img_scale = cv2.resize(img, (int(height * scale), int(width * scale)))
+        scale_height, scale_width = img_scale.shape[:2]
+        cx = scale_width // 2
+        cy = scale_height // 2
+        sx = cx - width // 2
+        ex = sx + width
+        sy = cy - width // 2
+        ey = sy + height
+
+        if sx >= 0 and sy >= 0 and ex <= scale_width and ey <= scale_height:
+            usage[:] = img_scale[sy:ey, sx:ex]
+        else:  # 缩小时 周围补0
+            usage.fill(0)
+            usage[max(0, -sy):max(0, -sy) + min(ey, scale_height) - max(sy, 0),
+                  max(0, -sx):max(0, -sx) + min(ex, scale_width) - max(sx, 0)] = \
+                img_scale[max(sy, 0):min(ey, scale_height), max(sx, 0):min(ex, scale_width)]
+
+        return usage, sx, sy, scale_width, scale_height
+
+    def release(self) -> None:
+        """
+        归还所有缓冲区 调用后不能再使用之前获取的模板
+        还有异步任务没完成时(例如模板匹配超时) 等任务都完成后再归还 防止下一帧覆盖正在使用的缓冲区
+        :return:
+        """
+        with self._lock:
+            buffer_list = self._buffer_list
+            self._buffer_list = []
+            future_list = [f for f in self._future_list if not f.done()]
+            self._future_list = []
+            self._template_map.clear()
+            self._mask_map.clear()
+
+        if len(future_list) == 0:
+            self._pool.release(buffer_list)
+            return
+
+        pending_lock = threading.Lock()
+        pending_cnt = [len(future_list)]
+
+        def on_done(_: Future) -> None:
+            with pending_lock:
+                pending_cnt[0] -= 1
+                all_done = pending_cnt[0] == 0
+            if all_done:
+                self._pool.release(buffer_list)
+
+        for future in future_list:
+            future.add_done_callback(on_done)
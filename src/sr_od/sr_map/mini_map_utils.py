@@ -155,65 +155,62 @@ def init_sp_mask_by_feature_match(ctx: SrContext, mm_info: MiniMapInfo,
     source = mm_info.raw_del_radio
     source_mask = mm_info.circle_mask
     source_kps, source_desc = cv2_utils.feature_detect_and_compute(source, mask=source_mask)
-    for prefix in ['mm_tp', 'mm_sp', 'mm_boss', 'mm_sub']:
-        for i in range(100):
-            if i == 0:
-                continue
-
-            template_id = '%s_%02d' % (prefix, i)
-            t: TemplateInfo = ctx.template_loader.get_template('mm_icon', template_id)
-            if t is None:
-                break
-            if sp_types is not None and template_id not in sp_types:
-                continue
-
-            match_result_list = MatchResultList()
-            template = t.raw
-            template_mask = t.mask
-
-            template_kps, template_desc = t.features
-
-            good_matches, offset_x, offset_y, scale = cv2_utils.feature_match(
-                source_kps, source_desc,
-                template_kps, template_desc,
-                source_mask=source_mask)
+    # 所有图标合并成一次匹配
+    icon_index = ctx.mm_icon_feature_index
+    knn_matches_map = icon_index.knn_match(source_desc, template_id_set=set(sp_types)) if len(source_kps) > 0 else {}
+    for template_id in icon_index.template_id_list:
+        if template_id not in sp_types:
+            continue
+        t: TemplateInfo = icon_index.template_map[template_id]
+
+        match_result_list = MatchResultList()
+        template = t.raw
+        template_mask = t.mask
+
+        template_kps = icon_index.get_keypoints(template_id)
+
+        knn_matches, query_idx_offset = knn_matches_map.get(template_id, ([], 0))
+        good_matches, offset_x, offset_y, scale = cv2_utils.feature_match_by_knn(
+            source_kps, template_kps, knn_matches,
+            source_mask=source_mask, query_idx_offset=query_idx_offset)
+
+        if offset_x is not None:
+            mr = MatchResult(1, offset_x, offset_y, template.shape[1], template.shape[0], template_scale=scale)  #
+            match_result_list.append(mr, auto_merge=False)
+            sp_match_result[template_id] = match_result_list
+
+            # 缩放后的宽度和高度
+            sw = int(template.shape[1] * scale)
+            sh = int(template.shape[0] * scale)
+            # one_sp_mask = cv2.resize(template_mask, (sh, sw))
+            one_sp_mask = np.zeros((sh, sw))
+
+            rect1, rect2 = cv2_utils.get_overlap_rect(sp_mask, one_sp_mask, mr.x, mr.y)
+            sx_start, sy_start, sx_end, sy_end = rect1
+            tx_start, ty_start, tx_end, ty_end = rect2
+            # sp_mask[sy_start:sy_end, sx_start:sx_end] = cv2.bitwise_or(
+            #     sp_mask[sy_start:sy_end, sx_start:sx_end],
+            #     one_sp_mask[ty_start:ty_end, tx_start:tx_end]
+            # )
+            sp_mask[sy_start:sy_end, sx_start:sx_end] = 255
+
+        if show:
+            cv2_utils.show_image(source, win_name='source')
+            cv2_utils.show_image(source_mask, win_name='source_mask')
+            source_with_keypoints = cv2.drawKeypoints(source, source_kps, None)
+            cv2_utils.show_image(source_with_keypoints, win_name='source_with_keypoints_%s' % template_id)
+            template_with_keypoints = cv2.drawKeypoints(template, template_kps, None)
+            cv2_utils.show_image(
+                cv2.bitwise_and(template_with_keypoints, template_with_keypoints, mask=template_mask),
+                win_name='template_with_keypoints_%s' % template_id)
+            draw_matches = [cv2.DMatch(m.queryIdx - query_idx_offset, m.trainIdx, m.distance) for m in good_matches]
+            all_result = cv2.drawMatches(template, template_kps, source, source_kps, draw_matches, None, flags=2)
+            cv2_utils.show_image(all_result, win_name='all_match_%s' % template_id)
 
             if offset_x is not None:
-                mr = MatchResult(1, offset_x, offset_y, template.shape[1], template.shape[0], template_scale=scale)  #
-                match_result_list.append(mr, auto_merge=False)
-                sp_match_result[template_id] = match_result_list
-
-                # 缩放后的宽度和高度
-                sw = int(template.shape[1] * scale)
-                sh = int(template.shape[0] * scale)
-                # one_sp_mask = cv2.resize(template_mask, (sh, sw))
-                one_sp_mask = np.zeros((sh, sw))
-
-                rect1, rect2 = cv2_utils.get_overlap_rect(sp_mask, one_sp_mask, mr.x, mr.y)
-                sx_start, sy_start, sx_end, sy_end = rect1
-                tx_start, ty_start, tx_end, ty_end = rect2
-                # sp_mask[sy_start:sy_end, sx_start:sx_end] = cv2.bitwise_or(
-                #     sp_mask[sy_start:sy_end, sx_start:sx_end],
-                #     one_sp_mask[ty_start:ty_end, tx_start:tx_end]
-                # )
-                sp_mask[sy_start:sy_end, sx_start:sx_end] = 255
-
-            if show:
-                cv2_utils.show_image(source, win_name='source')
-                cv2_utils.show_image(source_mask, win_name='source_mask')
-                source_with_keypoints = cv2.drawKeypoints(source, source_kps, None)
-                cv2_utils.show_image(source_with_keypoints, win_name='source_with_keypoints_%s' % template_id)
-                template_with_keypoints = cv2.drawKeypoints(template, template_kps, None)
-                cv2_utils.show_image(
-                    cv2.bitwise_and(template_with_keypoints, template_with_keypoints, mask=template_mask),
-                    win_name='template_with_keypoints_%s' % template_id)
-                all_result = cv2.drawMatches(template, template_kps, source, source_kps, good_matches, None, flags=2)
-                cv2_utils.show_image(all_result, win_name='all_match_%s' % template_id)
-
-                if offset_x is not None:
-                    cv2_utils.show_overlap(source, template, offset_x, offset_y, template_scale=scale, win_name='overlap_%s' % template_id)
-                cv2.waitKey(0)
-                cv2.destroyAllWindows()
+                cv2_utils.show_overlap(source, template, offset_x, offset_y, template_scale=scale, win_name='overlap_%s' % template_id)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
 
     mm_info.sp_mask = sp_mask
     mm_info.sp_result = sp_match_result
@@ -0,0 +1,120 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from one_dragon.base.screen.template_info import TemplateInfo
+from one_dragon.base.screen.template_loader import TemplateLoader
+
+MM_ICON_PREFIX_LIST: List[str] = ['mm_tp', 'mm_sp', 'mm_boss', 'mm_sub']  # 小地图上的特殊点图标
+
+
+class MmIconFeatureIndex:
+
+    def __init__(self, template_loader: TemplateLoader):
+        """
+        小地图特殊点图标的特征索引
+        - 所有图标的描述子合并成一个矩阵 记录每个图标所在的行范围
+        - 每帧只需要一次 knnMatch 就能得到所有图标和小地图的匹配 再按图标拆分
+        - 图标的描述子作为 query 小地图的描述子作为 train 比值测试的结果和每个图标单独匹配一致
+
+        :param template_loader: 模板加载器
+        """
+        self.template_loader: TemplateLoader = template_loader
+
+        self._lock = threading.Lock()
+        self._built: bool = False
+        self.template_id_list: List[str] = []  # 有特征的图标 按原来逐个匹配的顺序
+        self.template_map: Dict[str, TemplateInfo] = {}
+        self._kps_map: Dict[str, List[cv2.KeyPoint]] = {}
+        self._row_range_map: Dict[str, tuple[int, int]] = {}  # 图标在合并矩阵中的行范围 [start, end)
+        self._stacked_desc: Optional[np.ndarray] = None  # 所有图标的描述子
+
+        self._matcher = cv2.BFMatcher()
+
+    def build(self) -> None:
+        """
+        读取所有图标的特征 建立索引 可以在预热时调用
+        """
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+
+            template_id_list: List[str] = []
+            template_map: Dict[str, TemplateInfo] = {}
+            kps_map: Dict[str, List[cv2.KeyPoint]] = {}
+            row_range_map: Dict[str, tuple[int, int]] = {}
+            desc_list: List[np.ndarray] = []
+            row_cnt: int = 0
+            all_template_id_list: List[str] = self.template_loader.list_template_id('mm_icon')
+            for prefix in MM_ICON_PREFIX_LIST:
+                for template_id in all_template_id_list:
+                    if not template_id.startswith(prefix + '_'):
+                        continue
+                    t: TemplateInfo = self.template_loader.get_template('mm_icon', template_id)
+                    if t is None:
+                        continue
+                    kps, desc = t.features
+                    if kps is None or desc is None or len(kps) == 0:
+                        continue
+
+                    template_id_list.append(template_id)
+                    template_map[template_id] = t
+                    kps_map[template_id] = kps
+                    row_range_map[template_id] = (row_cnt, row_cnt + len(desc))
+                    desc_list.append(np.asarray(desc, dtype=np.float32))
+                    row_cnt += len(desc)
+
+            self.template_id_list = template_id_list
+            self.template_map = template_map
+            self._kps_map = kps_map
+            self._row_range_map = row_range_map
+            if len(desc_list) > 0:
+                self._stacked_desc = np.ascontiguousarray(np.vstack(desc_list))
+            self._built = True
+
+    def get_keypoints(self, template_id: str) -> List[cv2.KeyPoint]:
+        """
+        图标的关键点
+        """
+        self.build()
+        return self._kps_map.get(template_id, [])
+
+    def knn_match(self, source_desc: np.ndarray,
+                  template_id_set: Optional[Set[str]] = None) -> Dict[str, Tuple[List[List[cv2.DMatch]], int]]:
+        """
+        一次匹配所有图标
+        :param source_desc: 小地图的描述子
+        :param template_id_set: 只匹配这些图标 为空时匹配所有图标
+        :return: 每个图标的 knnMatch(k=2) 结果 和 queryIdx 的偏移量
+            queryIdx 减去偏移量 才是图标自身关键点的下标
+        """
+        self.build()
+        result: Dict[str, Tuple[List[List[cv2.DMatch]], int]] = {}
+        if self._stacked_desc is None or source_desc is None or len(source_desc) == 0:
+            return result
+
+        if template_id_set is None:
+            chosen_id_list = self.template_id_list
+            query_desc = self._stacked_desc
+        else:
+            chosen_id_list = [i for i in self.template_id_list if i in template_id_set]
+            if len(chosen_id_list) == 0:
+                return result
+            row_idx = np.concatenate([np.arange(*self._row_range_map[i]) for i in chosen_id_list])
+            query_desc = self._stacked_desc[row_idx]
+
+        matches = self._matcher.knnMatch(query_desc, np.asarray(source_desc, dtype=np.float32), k=2)
+
+        # 选中的图标在 query 中是连续的 按顺序切分即可
+        offset: int = 0
+        for template_id in chosen_id_list:
+            start, end = self._row_range_map[template_id]
+            row_cnt = end - start
+            result[template_id] = (matches[offset:offset + row_cnt], offset)
+            offset += row_cnt
+
+        return result
@@ -1,23 +1,47 @@
 import os
 import shutil
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
 
 from cv2.typing import MatLike
 
 from one_dragon.base.config.yaml_operator import YamlOperator
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
-from one_dragon.utils import os_utils, str_utils, cv2_utils, cal_utils
+from one_dragon.utils import os_utils, cv2_utils, cal_utils
+from one_dragon.utils.fuzzy_index import FuzzyIndex
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 from sr_od.application.world_patrol import world_patrol_route_utils
-from sr_od.sr_map.large_map_info import LargeMapInfo
+from sr_od.sr_map.large_map_info import LargeMapInfo, PYRAMID_FACTOR
 from sr_od.sr_map.sr_map_def import Planet, Region, RegionSet, SpecialPoint
 
+_LARGE_MAP_PREFETCH_EXECUTOR = ThreadPoolExecutor(thread_name_prefix='sr_od_large_map_prefetch', max_workers=1)
+_LARGE_MAP_PREFETCH_PYRAMID_KIND_LIST: List[str] = ['mask', 'gray']  # 预加载时计算的金字塔缩小图 道路掩码和灰度图匹配使用
+
+
+@dataclass
+class LargeMapCacheStats:
+    """大地图缓存统计"""
+    hit: int = 0  # 命中次数
+    miss: int = 0  # 未命中 需要在当前线程加载的次数
+    prefetch: int = 0  # 预加载的次数
+    evict: int = 0  # 超出内存预算被移除的次数
+    entry_cnt: int = 0  # 当前缓存的地图数量
+    total_bytes: int = 0  # 当前估算占用的字节数
+    max_bytes: int = 0  # 内存预算
+
 
 class SrMapData:
 
-    def __init__(self):
+    def __init__(self, large_map_max_bytes: int = 512 * 1024 * 1024):
+        """
+        地图数据
+        :param large_map_max_bytes: 大地图缓存的内存预算 超过时移除最久没使用的地图
+        """
         self.planet_list: List[Planet] = []
         self.region_list: List[Region] = []
         self.planet_2_region: dict[str, List[Region]] = {}  # key=np_id
@@ -28,9 +52,16 @@ class SrMapData:
         self.sp_list: List[SpecialPoint] = []
         self.region_2_sp: dict[str, List[SpecialPoint]] = {}
 
+        self._fuzzy_index_map: dict[str, tuple[tuple[int, int], FuzzyIndex]] = {}  # 名称匹配使用的索引
+
         self.load_map_data()
 
-        self.large_map_info_map: dict[str, LargeMapInfo] = {}
+        self.large_map_max_bytes: int = large_map_max_bytes
+        self.large_map_info_map: OrderedDict[str, LargeMapInfo] = OrderedDict()  # 按最近使用排序
+        self._large_map_lock = threading.Lock()
+        self._large_map_loading: dict[str, Future] = {}  # 正在预加载的地图
+        self._large_map_in_use: Optional[str] = None  # 最近一次获取的地图 即当前路线正在使用的 超出预算时也不移除
+        self._large_map_stats: LargeMapCacheStats = LargeMapCacheStats()
 
     def load_map_data(self) -> None:
         """
@@ -429,12 +460,23 @@ class SrMapData:
         :param ocr_word: OCR结果
         :return:
         """
-        planet_names = [gt(p.cn, 'ocr') for p in self.planet_list]
-        idx = str_utils.find_best_match_by_difflib(ocr_word, target_word_list=planet_names)
-        if idx is None:
-            return None
-        else:
-            return self.planet_list[idx]
+        index = self._get_fuzzy_index('planet', self.planet_list, lambda p: gt(p.cn, 'ocr'))
+        return index.find_best_by_difflib(ocr_word)
+
+    def _get_fuzzy_index(self, key: str, item_list: list, key_func: Callable[[object], str]) -> FuzzyIndex:
+        """
+        获取名称匹配使用的索引 列表重新加载或者增加后重新建立
+        :param key: 索引的唯一标识
+        :param item_list: 目录
+        :param key_func: 匹配使用的文本
+        :return:
+        """
+        src = (id(item_list), len(item_list))
+        cached = self._fuzzy_index_map.get(key)
+        if cached is None or cached[0] != src:
+            cached = (src, FuzzyIndex(item_list, key_func))
+            self._fuzzy_index_map[key] = cached
+        return cached[1]
 
     def get_region_by_cn(self, planet_name: str, region_name: str, floor: int = 0) -> Region | None:
         """
@@ -467,24 +509,15 @@ class SrMapData:
         if ocr_word is None or len(ocr_word) == 0:
             return None
 
-        to_check_region_list: List[Region] = []
-        to_check_region_name_list: List[str] = []
-
-        for region in self.region_list:
+        def region_filter(region: Region) -> bool:
             if planet is not None and planet.np_id != region.planet.np_id:
-                continue
-
+                return False
             if target_floor is not None and target_floor != region.floor:
-                continue
-
-            to_check_region_list.append(region)
-            to_check_region_name_list.append(gt(region.cn, 'ocr'))
+                return False
+            return True
 
-        idx = str_utils.find_best_match_by_difflib(ocr_word, to_check_region_name_list)
-        if idx is None:
-            return None
-        else:
-            return to_check_region_list[idx]
+        index = self._get_fuzzy_index('region', self.region_list, lambda r: gt(r.cn, 'ocr'))
+        return index.find_best_by_difflib(ocr_word, item_filter=region_filter)
 
     def region_with_another_floor(self, region: Region, floor: int) -> Optional[Region]:
         """
@@ -537,13 +570,8 @@ class SrMapData:
             return None
 
         to_check_sp_list: List[SpecialPoint] = self.region_2_sp.get(region.pr_id, [])
-        to_check_sp_name_list: List[str] = [gt(i.cn, 'ocr') for i in to_check_sp_list]
-
-        idx = str_utils.find_best_match_by_difflib(ocr_word, to_check_sp_name_list)
-        if idx is None:
-            return None
-        else:
-            return to_check_sp_list[idx]
+        index = self._get_fuzzy_index('sp_%s' % region.pr_id, to_check_sp_list, lambda sp: gt(sp.cn, 'ocr'))
+        return index.find_best_by_difflib(ocr_word)
 
     def best_match_sp_by_all_name(self, planet_name: str, region_name: str, sp_name: str, region_floor: int = 0) -> Optional[
         SpecialPoint]:
@@ -592,25 +620,121 @@ class SrMapData:
         :param region: 对应区域
         :return: 地图图片
         """
+        info = SrMapData.read_large_map_info(region)
+        self._put_large_map_info(info)
+        return info
+
+    @staticmethod
+    def read_large_map_info(region: Region) -> LargeMapInfo:
+        """
+        读取某张大地图 不放入缓存
+        :param region: 对应区域
+        :return: 地图图片
+        """
         dir_path = SrMapData.get_large_map_dir_path(region)
         info = LargeMapInfo()
         info.region = region
         info.raw = cv2_utils.read_image(os.path.join(dir_path, 'raw.webp'))
         info.mask = cv2_utils.read_image(os.path.join(dir_path, 'mask.png'))
-        self.large_map_info_map[region.prl_id] = info
         return info
 
     def get_large_map_info(self, region: Region) -> LargeMapInfo:
         """
         获取某张大地图
+        正在预加载时 等待预加载完成 不重复加载
         :param region: 区域
         :return: 地图图片
         """
-        if region.prl_id not in self.large_map_info_map:
-            # 尝试加载一次
-            return self.load_large_map_info(region)
-        else:
-            return self.large_map_info_map[region.prl_id]
+        with self._large_map_lock:
+            self._large_map_in_use = region.prl_id
+            info = self.large_map_info_map.get(region.prl_id)
+            if info is not None:
+                self.large_map_info_map.move_to_end(region.prl_id)
+                self._large_map_stats.hit += 1
+                return info
+            future = self._large_map_loading.get(region.prl_id)
+            if future is None:
+                self._large_map_stats.miss += 1
+
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                log.error('预加载大地图失败 %s', region.prl_id, exc_info=True)
+
+        # 尝试加载一次
+        return self.load_large_map_info(region)
+
+    def prefetch_large_map_info(self, region: Optional[Region]) -> None:
+        """
+        在后台加载某张大地图 并提前计算定位时使用的灰度图和金字塔缩小图 切换区域时不需要等待
+        特征点只有录制地图时使用 不提前计算
+        :param region: 区域
+        :return:
+        """
+        if region is None:
+            return
+        with self._large_map_lock:
+            if region.prl_id in self.large_map_info_map or region.prl_id in self._large_map_loading:
+                return
+            future = _LARGE_MAP_PREFETCH_EXECUTOR.submit(self._prefetch_large_map_info, region)
+            self._large_map_loading[region.prl_id] = future
+            self._large_map_stats.prefetch += 1
+
+    def _prefetch_large_map_info(self, region: Region) -> LargeMapInfo:
+        try:
+            # 全部计算好再放入缓存 获取时要么等待预加载完成 要么拿到完整的地图
+            info = SrMapData.read_large_map_info(region)
+            _ = info.gray
+            for kind in _LARGE_MAP_PREFETCH_PYRAMID_KIND_LIST:
+                info.get_pyramid_image(kind, PYRAMID_FACTOR)
+            self._put_large_map_info(info)
+            log.debug('预加载大地图完成 %s', region.prl_id)
+            return info
+        finally:
+            with self._large_map_lock:
+                self._large_map_loading.pop(region.prl_id, None)
+
+    def _put_large_map_info(self, info: LargeMapInfo) -> None:
+        """
+        放入缓存 并移除超出内存预算的地图
+        :param info: 大地图
+        :return:
+        """
+        with self._large_map_lock:
+            self.large_map_info_map[info.region.prl_id] = info
+            self.large_map_info_map.move_to_end(info.region.prl_id)
+        self._evict_large_map_info()
+
+    def _evict_large_map_info(self) -> None:
+        """
+        超出内存预算时 移除最久没使用的地图
+        最近放入的一张 和当前正在使用的一张总会保留 预加载下一个区域时不会移除当前区域
+        :return:
+        """
+        with self._large_map_lock:
+            total = sum(i.memory_size for i in self.large_map_info_map.values())
+            for prl_id in list(self.large_map_info_map.keys())[:-1]:
+                if total <= self.large_map_max_bytes:
+                    break
+                if prl_id == self._large_map_in_use:
+                    continue
+                info = self.large_map_info_map.pop(prl_id)
+                total -= info.memory_size
+                self._large_map_stats.evict += 1
+                log.debug('大地图缓存超出预算 移除 %s', prl_id)
+
+    def get_large_map_cache_stats(self) -> LargeMapCacheStats:
+        """
+        大地图缓存的统计 包括估算的内存占用
+        :return:
+        """
+        with self._large_map_lock:
+            stats = LargeMapCacheStats(**self._large_map_stats.__dict__)
+            stats.entry_cnt = len(self.large_map_info_map)
+            stats.total_bytes = sum(i.memory_size for i in self.large_map_info_map.values())
+            stats.max_bytes = self.large_map_max_bytes
+        return stats
 
     @staticmethod
     def get_large_map_dir_path(region: Region):